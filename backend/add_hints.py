@@ -1,3 +1,4 @@
+from sqlalchemy import func, insert
 from sqlalchemy.orm import Session
 from database import SessionLocal
 from models import Assignment, Hint
@@ -60,32 +61,28 @@ def add_hints():
         
         # Получаем все задания
         all_assignments = db.query(Assignment).all()
+        # Число уже существующих подсказок по заданиям одним запросом
+        existing_counts = dict(db.query(Hint.assignment_id, func.count(Hint.id)).group_by(Hint.assignment_id).all())
         
-        added_count = 0
+        rows = []
         for assignment in all_assignments:
             if assignment.title in hints_by_title:
                 # Проверяем, есть ли уже подсказки для этого задания
-                existing_hints_count = db.query(Hint).filter(Hint.assignment_id == assignment.id).count()
+                existing_hints_count = existing_counts.get(assignment.id, 0)
                 
                 if existing_hints_count > 0:
                     print(f"Задание '{assignment.title}' уже имеет {existing_hints_count} подсказок, пропускаем...")
                     continue
                 
                 hints_data = hints_by_title[assignment.title]
-                for hint_data in hints_data:
-                    hint = Hint(
-                        assignment_id=assignment.id,
-                        order_index=hint_data["order_index"],
-                        text=hint_data["text"],
-                        penalty=hint_data["penalty"]
-                    )
-                    db.add(hint)
-                    added_count += 1
+                rows.extend({"assignment_id": assignment.id, **hint_data} for hint_data in hints_data)
                 
                 print(f"Добавлено {len(hints_data)} подсказок для задания '{assignment.title}'")
         
+        if rows:
+            db.execute(insert(Hint), rows)
         db.commit()
-        print(f"\nВсего добавлено {added_count} новых подсказок!")
+        print(f"\nВсего добавлено {len(rows)} новых подсказок!")
         
     except Exception as e:
         print(f"Ошибка при добавлении подсказок: {e}")
@@ -0,0 +1,30 @@
+"""add course snapshots table
+
+Revision ID: 20261018_01_add_course_snapshots
+Revises: 20250916_01_add_hints_table
+Create Date: 2026-10-18 00:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_01_add_course_snapshots'
+down_revision = '20250916_01_add_hints_table'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'course_snapshots',
+        sa.Column('course_id', sa.Integer(), sa.ForeignKey('courses.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('version', sa.Integer(), nullable=False, server_default='1'),
+        sa.Column('payload', sa.LargeBinary(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.text('(CURRENT_TIMESTAMP)')),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('course_snapshots')
@@ -0,0 +1,33 @@
+"""add foreign key indexes for topics and assignments
+
+Revision ID: 20261018_02_add_foreign_key_indexes
+Revises: 20261018_01_add_course_snapshots
+Create Date: 2026-10-18 00:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_02_add_foreign_key_indexes'
+down_revision = '20261018_01_add_course_snapshots'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # На новой базе courses/topics/assignments создает init_db (create_all)
+    # уже с этими индексами, поэтому отсутствующие таблицы пропускаем
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+    if 'topics' in tables:
+        op.create_index('ix_topics_course_order', 'topics', ['course_id', 'order_index'], if_not_exists=True)
+    if 'assignments' in tables:
+        op.create_index('ix_assignments_topic_updated', 'assignments', ['topic_id', 'updated_at'], if_not_exists=True)
+    # Таблица hints могла быть создана через create_all без уникального индекса
+    op.create_index('ix_hints_assignment_order', 'hints', ['assignment_id', 'order_index'], unique=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_assignments_topic_updated', table_name='assignments', if_exists=True)
+    op.drop_index('ix_topics_course_order', table_name='topics', if_exists=True)
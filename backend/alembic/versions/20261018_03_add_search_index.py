@@ -0,0 +1,35 @@
+"""add fts5 search index with sync triggers
+
+Revision ID: 20261018_03_add_search_index
+Revises: 20261018_02_add_foreign_key_indexes
+Create Date: 2026-10-18 00:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from search import create_search_index
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_03_add_search_index'
+down_revision = '20261018_02_add_foreign_key_indexes'
+branch_labels = None
+depends_on = None
+
+TABLES = ('topics', 'assignments', 'hints')
+
+
+def upgrade() -> None:
+    # Триггеры ссылаются на все три таблицы; на новой базе индекс
+    # создаст create_all вместе с ними
+    bind = op.get_bind()
+    if set(TABLES) <= set(sa.inspect(bind).get_table_names()):
+        create_search_index(None, bind)
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        for action in ('insert', 'update', 'delete'):
+            op.execute(f'DROP TRIGGER IF EXISTS {table}_search_{action}')
+    op.execute('DROP TABLE IF EXISTS search_index')
@@ -0,0 +1,25 @@
+"""add source etag to course snapshots
+
+Revision ID: 20261018_04_add_snapshot_source_etag
+Revises: 20261018_03_add_search_index
+Create Date: 2026-10-18 00:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_04_add_snapshot_source_etag'
+down_revision = '20261018_03_add_search_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Существующие снимки остаются с NULL и перестраиваются при первом чтении
+    op.add_column('course_snapshots', sa.Column('source_etag', sa.String(length=42), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('course_snapshots', 'source_etag')
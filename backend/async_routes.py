@@ -0,0 +1,80 @@
+from fastapi import APIRouter, Depends
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.util import await_only
+from database import get_db, get_async_db
+from serialization import FastJSONRoute
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable
+import inspect
+
+"""Асинхронный стек маршрутов (USE_ASYNC_DB=1) из синхронных обработчиков.
+
+Обработчики пишутся один раз, в `routers/*.py`, для синхронной сессии.
+`async_router` строит из роутера его асинхронную версию с теми же
+путями, схемами ответов и кодами: обработчик с зависимостью `get_db`
+становится `async def`, получает `AsyncSession` и выполняет то же тело
+через `AsyncSession.run_sync`. Тело идет в цикле событий, а запросы к
+базе ждут aiosqlite, не занимая потоков threadpool. Обработчики без
+базы остаются синхронными, как в обычном стеке.
+
+Блокирующая работа без базы внутри тела (сжатие ответа) уходит в
+threadpool через `run_blocking`. Потоковые ответы читают строки через
+`AsyncSession`, стоящую за синхронной сессией (`pagination.py`).
+"""
+
+# Выполняется ли код в теле асинхронного обработчика (внутри run_sync)
+_in_async_handler: ContextVar[bool] = ContextVar("in_async_handler", default=False)
+
+def run_blocking(func: Callable, *args):
+    """Вызвать `func`; в теле асинхронного обработчика — в threadpool, не блокируя цикл событий"""
+    if _in_async_handler.get():
+        return await_only(run_in_threadpool(func, *args))
+    return func(*args)
+
+def _uses_db(endpoint: Callable) -> bool:
+    parameter = inspect.signature(endpoint).parameters.get("db")
+    return parameter is not None and getattr(parameter.default, "dependency", None) is get_db
+
+def async_endpoint(endpoint: Callable) -> Callable:
+    """Обработчик с `db: Session = Depends(get_db)` как `async def` поверх AsyncSession"""
+    signature = inspect.signature(endpoint)
+    parameters = [
+        parameter.replace(annotation=AsyncSession, default=Depends(get_async_db)) if name == "db" else parameter
+        for name, parameter in signature.parameters.items()
+    ]
+
+    @wraps(endpoint)
+    async def run(**values):
+        db = values.pop("db")
+        token = _in_async_handler.set(True)
+        try:
+            return await db.run_sync(lambda session: endpoint(db=session, **values))
+        finally:
+            _in_async_handler.reset(token)
+
+    run.__signature__ = signature.replace(parameters=parameters)
+    return run
+
+def async_router(router: APIRouter) -> APIRouter:
+    """Асинхронная версия роутера: те же пути, схемы ответов и коды"""
+    result = APIRouter(route_class=FastJSONRoute)
+    for route in router.routes:
+        # FastJSONRoute оборачивает обработчик сериализацией; новый маршрут обернет его сам
+        endpoint = inspect.unwrap(route.endpoint)
+        result.add_api_route(
+            route.path,
+            async_endpoint(endpoint) if _uses_db(endpoint) else endpoint,
+            methods=list(route.methods),
+            response_model=route.response_model,
+            status_code=route.status_code,
+            name=route.name,
+            summary=route.summary,
+            description=route.description,
+            responses=route.responses,
+            response_class=route.response_class,
+            dependencies=route.dependencies,
+            include_in_schema=route.include_in_schema,
+        )
+    return result
@@ -0,0 +1,114 @@
+"""Сравнение синхронного (Session + threadpool) и асинхронного
+(AsyncSession + aiosqlite) стеков под высокой конкурентностью.
+
+Для каждого режима поднимается отдельный процесс uvicorn на временной
+копии базы с тестовыми данными, после чего httpx-клиент выполняет
+заданное число запросов к читающим endpoint-ам с фиксированной
+конкурентностью. Печатается пропускная способность и p50/p99.
+
+Запуск из каталога backend:
+    python benchmarks/async_db.py --requests 5000 --concurrency 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+ENDPOINTS = [
+    "/api/courses/1",
+    "/api/topics/course/1",
+    "/api/assignments/",
+    "/api/assignments/1/hints",
+    "/api/hints/1",
+]
+
+def percentile(values, q):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+async def wait_ready(base_url, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/api/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("Сервер не запустился")
+
+async def run_load(base_url, total, concurrency):
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(ENDPOINTS[i % len(ENDPOINTS)])
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    errors += 1
+        
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return latencies, elapsed, errors
+
+def bench_mode(use_async, args, port):
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", USE_ASYNC_DB="1" if use_async else "0")
+    subprocess.run([sys.executable, "init_db.py"], cwd=BACKEND_DIR, env=env, check=True, stdout=subprocess.DEVNULL)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        asyncio.run(wait_ready(base_url))
+        asyncio.run(run_load(base_url, min(args.requests, 500), args.concurrency))  # прогрев
+        latencies, elapsed, errors = asyncio.run(run_load(base_url, args.requests, args.concurrency))
+    finally:
+        server.terminate()
+        server.wait()
+    return {
+        "mode": "async" if use_async else "sync",
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "errors": errors,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--mode", choices=["sync", "async", "both"], default="both")
+    args = parser.parse_args()
+    
+    modes = {"sync": [False], "async": [True], "both": [False, True]}[args.mode]
+    print(f"{'mode':<6} {'req/s':>9} {'p50, ms':>9} {'p99, ms':>9} {'errors':>7}")
+    for use_async in modes:
+        result = bench_mode(use_async, args, args.port)
+        print(f"{result['mode']:<6} {result['rps']:>9.1f} {result['p50_ms']:>9.1f} {result['p99_ms']:>9.1f} {result['errors']:>7}")
+
+if __name__ == "__main__":
+    main()
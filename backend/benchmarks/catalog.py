@@ -0,0 +1,69 @@
+"""Выгрузка и загрузка каталога: скорость и пиковая память.
+
+Для каждого масштаба на временной базе генерируется каталог
+(`generate_data.py`: N курсов по 100 тем, 10 заданий на тему,
+4 подсказки на задание — 5101 строка на курс). Затем отдельными
+процессами выполняются `catalog.py export` в файл и `catalog.py import`
+этого файла в новую пустую базу. Для каждого процесса печатается число
+строк, время, строк/с и пиковый RSS (из `wait4`). Память не должна
+расти вместе с числом строк.
+
+Запуск из каталога backend (200 курсов — около миллиона строк):
+    python benchmarks/catalog.py --courses 10 50 200
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+def run(command, env):
+    """(вывод stderr, секунды, пиковый RSS в МБ) процесса"""
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    stderr = process.stderr.read().decode("utf-8")
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    elapsed = time.perf_counter() - started
+    if process.returncode:
+        raise RuntimeError(f"{' '.join(command)}: {stderr}")
+    # ru_maxrss в Linux — в КиБ
+    return stderr, elapsed, usage.ru_maxrss / 1024
+
+def rows_in(output):
+    return int(re.search(r"(\d+) строк", output).group(1))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--courses", type=int, nargs="+", default=[10, 50])
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    print(f"{'курсов':>7} {'операция':<9} {'строк':>9} {'с':>7} {'строк/с':>9} {'RSS, МБ':>8}")
+    for courses in args.courses:
+        source = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(directory, f'source_{courses}.db')}")
+        target = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(directory, f'target_{courses}.db')}")
+        dump = os.path.join(directory, f"catalog_{courses}.ndjson")
+        generate = [
+            sys.executable, "generate_data.py", "--courses", str(courses), "--topics", "100",
+            "--assignments", "10", "--hints", "4", "--skip-search-index",
+        ]
+        subprocess.run(generate, cwd=BACKEND_DIR, env=source, check=True, stdout=subprocess.DEVNULL)
+        subprocess.run([sys.executable, "-c", "import startup; startup.create_schema()"], cwd=BACKEND_DIR, env=target, check=True)
+
+        steps = [
+            ("export", [sys.executable, "catalog.py", "export", dump], source),
+            ("import", [sys.executable, "catalog.py", "import", dump], target),
+        ]
+        for label, command, env in steps:
+            output, elapsed, rss = run(command, env)
+            rows = rows_in(output)
+            print(f"{courses:>7} {label:<9} {rows:>9} {elapsed:>7.1f} {rows / elapsed:>9.0f} {rss:>8.1f}")
+        print(f"{'':>7} файл: {os.path.getsize(dump) / 1024 / 1024:.1f} МБ")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Сжатие дерева курса: кэш готовых тел против сжатия на каждый запрос.
+
+На временной базе генерируется курс (`generate_data`), затем через
+ASGITransport запрашивается GET /api/courses/1 с разными Accept-Encoding.
+Для каждого варианта печатаются байты на проводе (до распаковки) и
+процессорное время на запрос (`time.process_time`, все потоки процесса):
+
+- identity, gzip, br (если установлен brotli) — приложение с кэшем
+  сжатых тел, прогрев одним запросом, дальше только попадания в кэш;
+- gzip на лету — то же тело из минимального ASGI-приложения под
+  GZipMiddleware Starlette, т.е. сжатие при каждом ответе.
+
+Запуск из каталога backend:
+    python benchmarks/compression.py --topics 50 --assignments 10 --requests 200
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, BACKEND_DIR)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'compression.db')}"
+
+import httpx
+from starlette.middleware.gzip import GZipMiddleware
+
+from compression import COMPRESSORS, GZIP_LEVEL
+from database import engine, Base
+from generate_data import generate_data
+from main import app
+
+def payload_app(body):
+    async def asgi(scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+    return asgi
+
+async def measure(asgi_app, encoding, requests):
+    """(байт на проводе, мкс CPU на запрос, распакованное тело)"""
+    headers = {"Accept-Encoding": encoding}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi_app), base_url="http://bench") as client:
+        warm = await client.get("/api/courses/1", headers=headers)
+        # Тело читается без распаковки: CPU клиента на разжатие в замер не попадает
+        started = time.process_time()
+        for _ in range(requests):
+            async with client.stream("GET", "/api/courses/1", headers=headers) as response:
+                async for _ in response.aiter_raw():
+                    pass
+        cpu = (time.process_time() - started) / requests * 1e6
+        return response.num_bytes_downloaded, cpu, warm.content
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--topics", type=int, default=50, help="тем в курсе")
+    parser.add_argument("--assignments", type=int, default=10, help="заданий на тему")
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        generate_data(connection, 1, args.topics, args.assignments, 0, search_index=False)
+
+    _, _, body = asyncio.run(measure(app, "identity", 1))
+    print(f"Дерево курса: {len(body) / 1024:.0f} КиБ JSON\n")
+    print(f"{'вариант':<16} {'на проводе, КиБ':>16} {'CPU, мкс/запрос':>16}")
+    variants = [(encoding, app, encoding) for encoding in ("identity", *sorted(COMPRESSORS))]
+    variants.append(("gzip на лету", GZipMiddleware(payload_app(body), compresslevel=GZIP_LEVEL), "gzip"))
+    for label, asgi_app, encoding in variants:
+        wire, cpu, decoded = asyncio.run(measure(asgi_app, encoding, args.requests))
+        if decoded != body:
+            print(f"{label}: тело после распаковки отличается")
+            sys.exit(1)
+        print(f"{label:<16} {wire / 1024:16.1f} {cpu:16.0f}")
+    if "br" not in COMPRESSORS:
+        print("\nbr пропущен: пакет brotli не установлен")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,426 @@
+"""Нагрузочный прогон всех роутеров API внутри процесса.
+
+Приложение `main.app` вызывается напрямую через `httpx.ASGITransport`,
+без сети и отдельного сервера, на временной базе с тестовыми данными (`--scale` добавляет к ним
+синтетические данные generate_data.py).
+Воркеры (их число задает `--concurrency`) выполняют смесь операций:
+чтения всех GET-маршрутов и сценарии записи (создание, изменение,
+удаление своих же сущностей, пакетные вставки и импорт курса). Доля
+записи задается `--write-ratio`.
+
+Перед замером каждая операция выполняется один раз последовательно:
+это прогрев и подсчет SQL-запросов на каждый маршрут. Маршрут без
+операции в сценарии считается ошибкой, как и в tests/test_query_plans.py.
+
+Для каждого маршрута печатаются число вызовов, p50/p95/p99 и запросы к
+БД на вызов, в конце общая пропускная способность. `--save-baseline`
+сохраняет результат в JSON, `--baseline` сравнивает с сохраненным и
+завершается с кодом 1 при регрессии: рост p50 больше чем на
+`--threshold` (и больше `--min-delta-ms`) для маршрутов, вызванных не
+реже `--min-samples` раз, падение пропускной способности больше чем на
+`--threshold` или рост числа запросов к БД на любом маршруте. Хвост
+распределения под конкурентной нагрузкой заметно шумнее медианы
+(p95 записи между одинаковыми прогонами расходится почти вдвое), поэтому
+p95 проверяется только с явным `--tail-threshold` (с теми же
+`--min-delta-ms` и `--min-samples`). Сравнивать
+имеет смысл прогоны с одинаковыми режимом, конкурентностью и долей записи
+на одной машине.
+
+Запуск из каталога backend:
+    python benchmarks/load.py --requests 3000 --concurrency 20 --save-baseline benchmarks/load_baseline.json
+    python benchmarks/load.py --requests 3000 --concurrency 20 --baseline benchmarks/load_baseline.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, BACKEND_DIR)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=3000, help="число операций в замере")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    parser.add_argument("--mode", choices=["sync", "async"], default="sync")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--scale", metavar="N,M,K,H",
+        help="добавить синтетические данные generate_data.py: курсы, темы на курс, задания на тему, подсказки на задание",
+    )
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--baseline", metavar="PATH")
+    parser.add_argument("--threshold", type=float, default=0.2, help="допустимая относительная регрессия")
+    parser.add_argument("--tail-threshold", type=float, help="допустимая относительная регрессия p95")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="абсолютный порог роста p50 (и p95 при --tail-threshold)")
+    parser.add_argument("--min-samples", type=int, default=50, help="минимум вызовов маршрута для сравнения p50 и p95")
+    return parser.parse_args()
+
+ARGS = parse_args()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'load.db')}"
+os.environ["USE_ASYNC_DB"] = "1" if ARGS.mode == "async" else "0"
+
+import httpx
+from fastapi.routing import APIRoute
+from sqlalchemy import select
+
+import add_hints
+import init_db
+from generate_data import generate_data
+from database import engine, SessionLocal
+from main import app
+from models import Topic, Assignment, Hint
+from query_stats import query_budget
+from reveals import REVEAL_LOG, reveal_event, write_events
+
+class Recorder:
+    """Задержки и число SQL-запросов по маршрутам"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.queries = {}
+        self.errors = defaultdict(int)
+        self.calibrating = False
+
+    async def call(self, client, route, method, url, json_body=None, files=None):
+        key = f"{method} {route}"
+        if self.calibrating:
+            with query_budget() as budget:
+                response = await client.request(method, url, json=json_body, files=files)
+            self.queries[key] = budget.count
+        else:
+            started = time.perf_counter()
+            response = await client.request(method, url, json=json_body, files=files)
+            self.latencies[key].append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            self.errors[key] += 1
+            return None
+        if response.headers.get("content-type", "").startswith("application/json"):
+            return response.json()
+        return response.text
+
+# Учащиеся, открывающие подсказки в сценарии
+LEARNERS = 50
+
+class Workload:
+    """Операции чтения и записи над тестовыми данными"""
+
+    def __init__(self, recorder, rng):
+        self.recorder = recorder
+        self.rng = rng
+        self.unique = itertools.count(10_000)
+        db = SessionLocal()
+        try:
+            self.topic_ids = db.scalars(select(Topic.id)).all()
+            self.assignment_ids = db.scalars(select(Assignment.id)).all()
+            self.hint_ids = db.scalars(select(Hint.id)).all()
+            hint = db.execute(select(Hint.id, Hint.assignment_id, Hint.penalty)).first()
+        finally:
+            db.close()
+        # У каждого учащегося сценария уже есть открытие: его место в рейтинге читается с первого вызова
+        REVEAL_LOG.start()
+        write_events(REVEAL_LOG.engine, [reveal_event(f"load-{i}", hint) for i in range(LEARNERS)])
+        self.reads = [getattr(self, name) for name in dir(self) if name.startswith("read_")]
+        self.writes = [getattr(self, name) for name in dir(self) if name.startswith("write_")]
+
+    def topic(self):
+        return self.rng.choice(self.topic_ids)
+
+    def assignment(self):
+        return self.rng.choice(self.assignment_ids)
+
+    def topic_body(self):
+        return {"title": "Нагрузочная тема", "description": "Описание", "content": "Содержание " * 50, "course_id": 1}
+
+    def assignment_body(self):
+        return {"title": "Нагрузочное задание", "description": "Описание", "instructions": "Шаги " * 30, "topic_id": self.topic()}
+
+    def hint_body(self, assignment_id):
+        return {"assignment_id": assignment_id, "order_index": next(self.unique), "text": "Подсказка"}
+
+    async def read_health(self, client):
+        await self.recorder.call(client, "/api/health", "GET", "/api/health")
+
+    async def read_metrics(self, client):
+        await self.recorder.call(client, "/api/metrics", "GET", "/api/metrics")
+
+    async def read_cache_stats(self, client):
+        await self.recorder.call(client, "/api/cache/stats", "GET", "/api/cache/stats")
+
+    async def read_courses(self, client):
+        await self.recorder.call(client, "/api/courses/", "GET", "/api/courses/?limit=20")
+
+    async def read_course(self, client):
+        await self.recorder.call(client, "/api/courses/{course_id}", "GET", "/api/courses/1")
+
+    async def read_topics(self, client):
+        await self.recorder.call(client, "/api/topics/", "GET", "/api/topics/?limit=20")
+
+    async def read_course_topics(self, client):
+        await self.recorder.call(client, "/api/topics/course/{course_id}", "GET", "/api/topics/course/1")
+
+    async def read_course_topics_fields(self, client):
+        # Проекция считается отдельным рядом: ее задержка и число запросов другие
+        url = "/api/topics/course/1?fields=title,order_index,duration_minutes"
+        await self.recorder.call(client, "/api/topics/course/{course_id}?fields", "GET", url)
+
+    async def read_topic(self, client):
+        await self.recorder.call(client, "/api/topics/{topic_id}", "GET", f"/api/topics/{self.topic()}")
+
+    async def read_assignments(self, client):
+        await self.recorder.call(client, "/api/assignments/", "GET", "/api/assignments/?limit=20")
+
+    async def read_assignments_fields(self, client):
+        url = "/api/assignments/?limit=20&fields=title,difficulty_level,estimated_hours"
+        await self.recorder.call(client, "/api/assignments/?fields", "GET", url)
+
+    async def read_topic_assignments(self, client):
+        await self.recorder.call(client, "/api/assignments/topic/{topic_id}", "GET", f"/api/assignments/topic/{self.topic()}")
+
+    async def read_assignment(self, client):
+        await self.recorder.call(client, "/api/assignments/{assignment_id}", "GET", f"/api/assignments/{self.assignment()}")
+
+    async def read_assignment_hints(self, client):
+        await self.recorder.call(client, "/api/assignments/{assignment_id}/hints", "GET", f"/api/assignments/{self.assignment()}/hints")
+
+    async def read_assignment_hint(self, client):
+        route = "/api/assignments/{assignment_id}/hints/{order_index}"
+        await self.recorder.call(client, route, "GET", f"/api/assignments/{self.assignment()}/hints/0")
+
+    async def read_hints_for_assignment(self, client):
+        await self.recorder.call(client, "/api/hints/assignment/{assignment_id}", "GET", f"/api/hints/assignment/{self.assignment()}")
+
+    async def read_hints_batch(self, client):
+        ids = "&".join(f"assignment_ids={assignment_id}" for assignment_id in self.rng.sample(self.assignment_ids, 3))
+        await self.recorder.call(client, "/api/hints/batch", "GET", f"/api/hints/batch?{ids}&up_to=2")
+
+    async def read_hint(self, client):
+        await self.recorder.call(client, "/api/hints/{hint_id}", "GET", f"/api/hints/{self.rng.choice(self.hint_ids)}")
+
+    async def read_search(self, client):
+        term = self.rng.choice(["FastAPI", "React", "данных", "компонент", "деплой"])
+        await self.recorder.call(client, "/api/search/", "GET", f"/api/search/?q={term}")
+
+    async def read_query(self, client):
+        selection = {"fields": ["title"], "include": {"assignments": {"fields": ["title"], "include": {"hints": {}}}}}
+        body = {"entity": "topics", "ids": self.rng.sample(self.topic_ids, 3), **selection}
+        await self.recorder.call(client, "/api/query/", "POST", "/api/query/", body)
+
+    async def read_catalog_export(self, client):
+        await self.recorder.call(client, "/api/catalog/export", "GET", "/api/catalog/export")
+
+    async def read_learner_reveals(self, client):
+        route = "/api/reveals/learner/{learner_id}"
+        await self.recorder.call(client, route, "GET", f"/api/reveals/learner/load-{self.rng.randrange(LEARNERS)}")
+
+    async def read_leaderboard(self, client):
+        await self.recorder.call(client, "/api/leaderboard/", "GET", f"/api/leaderboard/?assignment_id={self.rng.choice([0, *self.assignment_ids])}")
+
+    async def read_learner_standing(self, client):
+        route = "/api/leaderboard/learner/{learner_id}"
+        await self.recorder.call(client, route, "GET", f"/api/leaderboard/learner/load-{self.rng.randrange(LEARNERS)}")
+
+    async def read_assignment_totals(self, client):
+        await self.recorder.call(client, "/api/leaderboard/totals", "GET", f"/api/leaderboard/totals?assignment_id={self.assignment()}")
+
+    async def write_course(self, client):
+        course = await self.recorder.call(client, "/api/courses/", "POST", "/api/courses/", {"title": "Курс", "description": "Описание"})
+        if course:
+            await self.recorder.call(client, "/api/courses/{course_id}", "PUT", f"/api/courses/{course['id']}", {"title": "Курс 2"})
+            await self.recorder.call(client, "/api/courses/{course_id}", "DELETE", f"/api/courses/{course['id']}")
+
+    async def write_course_import(self, client):
+        topic = {**self.topic_body(), "assignments": [{**self.assignment_body(), "hints": [{"text": "Подсказка"}]}]}
+        document = {"title": "Импорт", "description": "Описание", "topics": [topic, topic]}
+        course = await self.recorder.call(client, "/api/courses/import", "POST", "/api/courses/import", document)
+        if course:
+            await self.recorder.call(client, "/api/courses/{course_id}", "DELETE", f"/api/courses/{course['id']}")
+
+    async def write_catalog_import(self, client):
+        # Импорт создает новые записи без id в ответе, поэтому копия курса остается в базе
+        lines = [
+            {"format": "vibe-catalog", "version": 1},
+            {"table": "courses", "row": {"id": 1, "title": "Импорт каталога", "description": "Описание"}},
+            {"table": "topics", "row": {**self.topic_body(), "id": 1, "course_id": 1, "order_index": 0}},
+            {"table": "assignments", "row": {**self.assignment_body(), "id": 1, "topic_id": 1}},
+            {"table": "hints", "row": {**self.hint_body(1), "id": 1}},
+        ]
+        body = "\n".join(json.dumps(line, ensure_ascii=False) for line in lines).encode("utf-8")
+        files = {"file": ("catalog.ndjson", body)}
+        await self.recorder.call(client, "/api/catalog/import", "POST", "/api/catalog/import", files=files)
+
+    async def write_reveal(self, client):
+        body = {"learner_id": f"load-{self.rng.randrange(LEARNERS)}", "hint_id": self.rng.choice(self.hint_ids)}
+        await self.recorder.call(client, "/api/reveals/", "POST", "/api/reveals/", body)
+
+    async def write_topic(self, client):
+        topic = await self.recorder.call(client, "/api/topics/", "POST", "/api/topics/", self.topic_body())
+        if topic:
+            await self.recorder.call(client, "/api/topics/{topic_id}", "PUT", f"/api/topics/{topic['id']}", {"title": "Тема 2"})
+            await self.recorder.call(client, "/api/topics/{topic_id}", "DELETE", f"/api/topics/{topic['id']}")
+
+    async def write_topics_bulk(self, client):
+        topics = await self.recorder.call(client, "/api/topics/bulk", "POST", "/api/topics/bulk", [self.topic_body() for _ in range(5)])
+        for topic in topics or []:
+            await self.recorder.call(client, "/api/topics/{topic_id}", "DELETE", f"/api/topics/{topic['id']}")
+
+    async def write_assignment(self, client):
+        assignment = await self.recorder.call(client, "/api/assignments/", "POST", "/api/assignments/", self.assignment_body())
+        if assignment:
+            route = "/api/assignments/{assignment_id}"
+            await self.recorder.call(client, route, "PUT", f"/api/assignments/{assignment['id']}", {"estimated_hours": 3})
+            await self.recorder.call(client, route, "DELETE", f"/api/assignments/{assignment['id']}")
+
+    async def write_assignments_bulk(self, client):
+        body = [self.assignment_body() for _ in range(5)]
+        assignments = await self.recorder.call(client, "/api/assignments/bulk", "POST", "/api/assignments/bulk", body)
+        for assignment in assignments or []:
+            await self.recorder.call(client, "/api/assignments/{assignment_id}", "DELETE", f"/api/assignments/{assignment['id']}")
+
+    async def write_hint(self, client):
+        hint = await self.recorder.call(client, "/api/hints/", "POST", "/api/hints/", self.hint_body(self.assignment()))
+        if hint:
+            await self.recorder.call(client, "/api/hints/{hint_id}", "PUT", f"/api/hints/{hint['id']}", {"penalty": 5})
+            await self.recorder.call(client, "/api/hints/{hint_id}", "DELETE", f"/api/hints/{hint['id']}")
+
+    async def write_hints_bulk(self, client):
+        assignment_id = self.assignment()
+        body = [self.hint_body(assignment_id) for _ in range(5)]
+        hints = await self.recorder.call(client, "/api/hints/bulk", "POST", "/api/hints/bulk?upsert=true", body)
+        for hint in hints or []:
+            await self.recorder.call(client, "/api/hints/{hint_id}", "DELETE", f"/api/hints/{hint['id']}")
+
+    def pick(self):
+        operations = self.writes if self.rng.random() < ARGS.write_ratio else self.reads
+        return self.rng.choice(operations)
+
+def percentile(values, q):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+async def run(recorder, workload):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load") as client:
+        # Прогрев и подсчет запросов: каждая операция один раз, последовательно
+        recorder.calibrating = True
+        for operation in workload.reads + workload.writes:
+            await operation(client)
+        recorder.calibrating = False
+
+        remaining = iter(range(ARGS.requests))
+
+        async def worker():
+            for _ in remaining:
+                await workload.pick()(client)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(ARGS.concurrency)))
+        return time.perf_counter() - started
+
+def summarize(recorder, elapsed):
+    routes = {}
+    for key, samples in sorted(recorder.latencies.items()):
+        routes[key] = {
+            "count": len(samples),
+            "p50_ms": statistics.median(samples) * 1000,
+            "p95_ms": percentile(samples, 0.95) * 1000,
+            "p99_ms": percentile(samples, 0.99) * 1000,
+            "queries": recorder.queries.get(key),
+            "errors": recorder.errors.get(key, 0),
+        }
+    total = sum(route["count"] for route in routes.values())
+    return {
+        "mode": ARGS.mode,
+        "concurrency": ARGS.concurrency,
+        "write_ratio": ARGS.write_ratio,
+        "scale": ARGS.scale,
+        "requests": total,
+        "rps": total / elapsed,
+        "routes": routes,
+    }
+
+def print_report(result):
+    print(f"{'маршрут':<60} {'вызовы':>7} {'p50, мс':>8} {'p95, мс':>8} {'p99, мс':>8} {'SQL':>4} {'ошибки':>7}")
+    for key, route in result["routes"].items():
+        print(
+            f"{key:<60} {route['count']:>7} {route['p50_ms']:>8.2f} {route['p95_ms']:>8.2f} "
+            f"{route['p99_ms']:>8.2f} {route['queries'] if route['queries'] is not None else '-':>4} {route['errors']:>7}"
+        )
+    print(f"\nРежим {result['mode']}, конкурентность {result['concurrency']}: "
+          f"{result['requests']} запросов, {result['rps']:.1f} запросов/с")
+
+def compare(result, baseline):
+    settings = ("mode", "concurrency", "write_ratio", "scale")
+    if any(result[name] != baseline[name] for name in settings):
+        return [f"базовый прогон снят с другими параметрами: {', '.join(f'{name}={baseline[name]}' for name in settings)}"]
+    regressions = []
+    if result["rps"] < baseline["rps"] * (1 - ARGS.threshold):
+        regressions.append(f"пропускная способность {baseline['rps']:.1f} -> {result['rps']:.1f} запросов/с")
+    for key, old in baseline["routes"].items():
+        new = result["routes"].get(key)
+        if new is None:
+            continue
+        if min(old["count"], new["count"]) >= ARGS.min_samples:
+            for metric, threshold in (("p50_ms", ARGS.threshold), ("p95_ms", ARGS.tail_threshold)):
+                if threshold is None:
+                    continue
+                delta = new[metric] - old[metric]
+                if delta > ARGS.min_delta_ms and new[metric] > old[metric] * (1 + threshold):
+                    regressions.append(f"{key}: {metric[:3]} {old[metric]:.2f} -> {new[metric]:.2f} мс")
+        if old["queries"] is not None and new["queries"] is not None and new["queries"] > old["queries"]:
+            regressions.append(f"{key}: SQL-запросов {old['queries']} -> {new['queries']}")
+    return regressions
+
+def main():
+    init_db.init_data()
+    add_hints.add_hints()
+    if ARGS.scale:
+        with engine.begin() as connection:
+            counts = generate_data(connection, *map(int, ARGS.scale.split(",")), seed=ARGS.seed)
+        print(f"Синтетические данные: {counts}")
+
+    recorder = Recorder()
+    workload = Workload(recorder, random.Random(ARGS.seed))
+
+    elapsed = asyncio.run(run(recorder, workload))
+    result = summarize(recorder, elapsed)
+    print_report(result)
+
+    failed = False
+    missing = [
+        f"{method} {route.path}"
+        for route in app.routes if isinstance(route, APIRoute) and route.path.startswith("/api/")
+        for method in route.methods if f"{method} {route.path}" not in recorder.queries
+    ]
+    if missing:
+        print("\nМаршруты без операции в сценарии:\n  " + "\n  ".join(sorted(missing)))
+        failed = True
+    if any(route["errors"] for route in result["routes"].values()):
+        print("\nЕсть ответы с ошибкой (статус >= 400)")
+        failed = True
+    if ARGS.save_baseline:
+        with open(ARGS.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"Базовый результат сохранен в {ARGS.save_baseline}")
+    if ARGS.baseline:
+        with open(ARGS.baseline, encoding="utf-8") as f:
+            regressions = compare(result, json.load(f))
+        if regressions:
+            print(f"\nРегрессии относительно {ARGS.baseline}:\n  " + "\n  ".join(regressions))
+            failed = True
+        else:
+            print(f"Регрессий относительно {ARGS.baseline} нет")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Накладные расходы MetricsMiddleware и проверка потокобезопасности реестра.
+
+1. Минимальное ASGI-приложение (ответ без тела) вызывается напрямую
+   с middleware и без него; разница делится на число запросов, это
+   стоимость записи метрик на один запрос.
+2. То же для полного приложения: GET /api/health через ASGITransport
+   с включенным и снятым middleware.
+3. Несколько потоков одновременно записывают наблюдения в один реестр;
+   итоговые счетчики должны совпасть с числом записей.
+
+Запуск из каталога backend:
+    python benchmarks/metrics_overhead.py --requests 50000 --threads 8
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, BACKEND_DIR)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'metrics.db')}"
+
+import httpx
+
+from main import app
+from metrics import Metrics, MetricsMiddleware
+
+SCOPE = {"type": "http", "method": "GET", "path": "/bench", "headers": []}
+
+async def bare_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+async def receive():
+    return {"type": "http.request", "body": b""}
+
+async def send(message):
+    pass
+
+async def per_request_us(asgi_app, requests):
+    started = time.perf_counter()
+    for _ in range(requests):
+        await asgi_app(dict(SCOPE), receive, send)
+    return (time.perf_counter() - started) / requests * 1e6
+
+async def per_http_request_us(asgi_app, requests):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi_app), base_url="http://bench") as client:
+        started = time.perf_counter()
+        for _ in range(requests):
+            await client.get("/api/health")
+        return (time.perf_counter() - started) / requests * 1e6
+
+def without_metrics():
+    """Стек middleware приложения без MetricsMiddleware"""
+    stack = app.build_middleware_stack()
+    assert isinstance(stack.app, MetricsMiddleware), "MetricsMiddleware должен быть внешним пользовательским слоем"
+    stack.app = stack.app.app
+    return stack
+
+def check_threads(threads, per_thread):
+    registry = Metrics()
+    barrier = threading.Barrier(threads)
+
+    def writer():
+        barrier.wait()
+        for _ in range(per_thread):
+            registry.started()
+            registry.finished("GET", "/race", 200, 0.001, 100)
+
+    workers = [threading.Thread(target=writer) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    histogram = registry.latency[("GET", "/race", "200")]
+    expected = threads * per_thread
+    return histogram.count == expected and sum(histogram.counts) == expected and registry.in_flight == 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50_000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    bare = asyncio.run(per_request_us(bare_app, args.requests))
+    wrapped = asyncio.run(per_request_us(MetricsMiddleware(bare_app, Metrics()), args.requests))
+    print(f"ASGI-приложение без тела: {bare:.2f} мкс -> {wrapped:.2f} мкс, метрики {wrapped - bare:.2f} мкс/запрос")
+
+    http_requests = max(args.requests // 10, 1)
+    plain = asyncio.run(per_http_request_us(without_metrics(), http_requests))
+    full = asyncio.run(per_http_request_us(app, http_requests))
+    print(f"GET /api/health: {plain:.1f} мкс -> {full:.1f} мкс ({(full - plain) / plain * 100:+.1f}%)")
+
+    if not check_threads(args.threads, args.requests // args.threads):
+        print("Счетчики реестра разошлись при записи из нескольких потоков")
+        sys.exit(1)
+    print(f"Запись из {args.threads} потоков: счетчики согласованы")
+
+if __name__ == "__main__":
+    main()
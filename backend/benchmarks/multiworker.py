@@ -0,0 +1,129 @@
+"""Согласованность кэшей между воркерами.
+
+Два процесса uvicorn (как два воркера `--workers 2`, но на разных
+портах, чтобы запросы шли в заданный воркер) работают с одной базой
+в профиле production (WAL). Проверяется:
+
+1. повторное чтение без записей не обращается к базе: условный GET
+   (If-None-Match) каждого адреса на воркере B отдает 304, а полный
+   GET — 200 из кэша ответов, оба с `X-DB-Query-Count: 0`;
+2. запись на воркере A видна на воркере B: после каждого
+   PUT /api/courses/1 через A воркер B опрашивается, пока не вернет
+   новое название. Печатаются задержки распространения (ожидаемо не
+   больше `CACHE_POLL_MS`) и число чтений, заставших старые данные.
+
+Запуск из каталога backend:
+    python benchmarks/multiworker.py --writes 50
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+READS = [
+    "/api/courses/1",
+    "/api/topics/course/1",
+    "/api/topics/1",
+    "/api/assignments/1",
+    "/api/assignments/?limit=20",
+]
+
+def wait_ready(client, server, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("Сервер завершился при запуске")
+        try:
+            if client.get("/api/health").status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.05)
+    raise RuntimeError("Сервер не запустился")
+
+def check_cached_reads(client):
+    """Адреса, повторное чтение которых все еще обращается к базе"""
+    failed = []
+    # Первое чтение дерева строит снимок (это запись): кэши прогреваются вторым проходом
+    for _ in range(2):
+        etags = {url: client.get(url).headers["ETag"] for url in READS}
+    checks = [(url, {"If-None-Match": etag}, 304) for url, etag in etags.items()]
+    checks += [(url, {}, 200) for url in READS]
+    for url, headers, status in checks:
+        response = client.get(url, headers=headers)
+        queries = int(response.headers["X-DB-Query-Count"])
+        print(f"  GET {url:<28} {response.status_code}: {queries} запросов к БД")
+        if response.status_code != status or queries:
+            failed.append(f"{url} ({response.status_code})")
+    return failed
+
+def check_coherence(writer, reader, writes, timeout=5.0):
+    """(задержки распространения в мс, число устаревших чтений)"""
+    delays = []
+    stale = 0
+    reader.get("/api/courses/1").raise_for_status()
+    for i in range(writes):
+        title = f"Курс, версия {i}"
+        writer.put("/api/courses/1", json={"title": title}).raise_for_status()
+        written = time.perf_counter()
+        while True:
+            if reader.get("/api/courses/1").json()["title"] == title:
+                delays.append((time.perf_counter() - written) * 1000)
+                break
+            stale += 1
+            if time.perf_counter() - written > timeout:
+                raise RuntimeError(f"Воркер B не увидел запись {i} за {timeout} с")
+            time.sleep(0.002)
+    return delays, stale
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writes", type=int, default=50)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "multiworker.db")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", DB_PROFILE="production", SQL_DEBUG="1")
+    generate = [sys.executable, "generate_data.py", "--courses", "2", "--topics", "20", "--assignments", "5", "--hints", "2"]
+    subprocess.run(generate, cwd=BACKEND_DIR, env=env, check=True, stdout=subprocess.DEVNULL)
+
+    ports = [args.port, args.port + 1]
+    servers = [
+        subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=BACKEND_DIR,
+            env=env,
+        )
+        for port in ports
+    ]
+    try:
+        writer, reader = [httpx.Client(base_url=f"http://127.0.0.1:{port}") for port in ports]
+        for client, server in zip((writer, reader), servers):
+            wait_ready(client, server)
+
+        print("Чтения из кэша воркера B:")
+        failed = check_cached_reads(reader)
+
+        delays, stale = check_coherence(writer, reader, args.writes)
+        print(f"\nЗапись через A -> чтение через B, {args.writes} записей:")
+        print(f"  задержка: медиана {statistics.median(delays):.1f} мс, максимум {max(delays):.1f} мс")
+        print(f"  устаревших чтений: {stale}")
+        print(f"  CACHE_POLL_MS = {os.getenv('CACHE_POLL_MS', '50')}")
+    finally:
+        for server in servers:
+            server.terminate()
+            server.wait()
+
+    if failed:
+        print(f"\nПовторные чтения обращаются к БД: {', '.join(failed)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Сборка страницы курса: цепочка REST-вызовов против POST /api/query.
+
+Для каждого размера курса база заполняется заново (`generate_data`), и
+одно и то же дерево (курс -> темы -> задания -> подсказки) собирается
+двумя способами с холодными кэшами:
+
+1. как сейчас делает фронтенд: GET /api/courses/1, GET /api/topics/course/1
+   и GET /api/assignments/{id}/hints на каждое задание;
+2. одним POST /api/query с вложенной выборкой.
+
+Печатаются число HTTP-вызовов, SQL-запросов и время. У /api/query число
+SQL-запросов равно глубине выборки и не растет с размером курса.
+
+Запуск из каталога backend:
+    python benchmarks/nested_query.py --topics 10 50 200 --assignments 5 --hints 3
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, BACKEND_DIR)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'nested_query.db')}"
+
+from fastapi.testclient import TestClient
+
+from compression import RESPONSE_CACHE
+from database import engine, Base
+from generate_data import generate_data
+from invalidation import DATA_VERSION
+from main import app
+from query_stats import query_budget
+
+QUERY = {
+    "entity": "courses",
+    "ids": [1],
+    "include": {"topics": {"include": {"assignments": {"include": {"hints": {}}}}}},
+}
+
+def reset(topics, assignments, hints):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        generate_data(connection, 1, topics, assignments, hints, search_index=False)
+
+def cold():
+    RESPONSE_CACHE.clear()
+    DATA_VERSION.bump()
+
+def stitched(client):
+    """Дерево из отдельных вызовов; возвращает число HTTP-вызовов"""
+    client.get("/api/courses/1").raise_for_status()
+    topics = client.get("/api/topics/course/1").json()
+    calls = 2
+    for topic in topics:
+        for assignment in topic["assignments"]:
+            client.get(f"/api/assignments/{assignment['id']}/hints").raise_for_status()
+            calls += 1
+    return calls
+
+def single(client):
+    client.post("/api/query/", json=QUERY).raise_for_status()
+    return 1
+
+def measure(client, build):
+    cold()
+    started = time.perf_counter()
+    with query_budget() as budget:
+        calls = build(client)
+    return calls, budget.count, (time.perf_counter() - started) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--topics", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--assignments", type=int, default=5, help="заданий на тему")
+    parser.add_argument("--hints", type=int, default=3, help="подсказок на задание")
+    args = parser.parse_args()
+
+    print(f"{'тем':>5} {'способ':<16} {'HTTP':>6} {'SQL':>6} {'мс':>9}")
+    with TestClient(app) as client:
+        for topics in args.topics:
+            reset(topics, args.assignments, args.hints)
+            for label, build in (("цепочка вызовов", stitched), ("/api/query", single)):
+                calls, queries, elapsed = measure(client, build)
+                print(f"{topics:>5} {label:<16} {calls:>6} {queries:>6} {elapsed:>9.1f}")
+
+if __name__ == "__main__":
+    main()
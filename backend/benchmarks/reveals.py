@@ -0,0 +1,116 @@
+"""Журнал открытий подсказок: задержка записи.
+
+Замеряется задержка POST /api/reveals/ под конкурентной нагрузкой
+(`--concurrency` клиентов через ASGI), а отдельно — сам путь записи
+запроса (`RevealLog.append`) в сравнении с записью каждого события
+отдельной транзакцией (synchronous=FULL, как если бы запрос ждал fsync;
+на tmpfs fsync почти бесплатен, разница видна на диске).
+
+Надежность журнала (падение процесса, оборванная строка, повтор сегмента,
+ошибка базы) проверяют тесты: `python -m pytest tests/test_reveals.py`.
+
+Запуск из каталога backend:
+    python benchmarks/reveals.py --requests 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, BACKEND_DIR)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'reveals.db')}"
+
+from sqlalchemy import create_engine, select
+
+from database import EventsBase
+from models import HintReveal
+from reveals import RevealLog
+
+def event(learner, hint_id):
+    return {"learner_id": learner, "hint_id": hint_id, "assignment_id": 1, "penalty": 10, "revealed_at": datetime.utcnow()}
+
+async def measure(requests, concurrency):
+    import httpx
+    import init_db
+    from database import engine
+    from main import app
+    from models import Hint
+    init_db.init_data()
+    with engine.connect() as connection:
+        hint_ids = connection.scalars(select(Hint.id)).all()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        latencies = []
+        queue = asyncio.Queue()
+        for i in range(requests):
+            queue.put_nowait(i)
+
+        async def worker():
+            while not queue.empty():
+                i = queue.get_nowait()
+                body = {"learner_id": f"bench-{i // len(hint_ids)}", "hint_id": hint_ids[i % len(hint_ids)]}
+                started = time.perf_counter()
+                response = await client.post("/api/reveals/", json=body)
+                latencies.append(time.perf_counter() - started)
+                assert response.status_code == 202, response.text
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return latencies, elapsed
+
+def measure_append(requests):
+    """Путь записи запроса: строка в сегмент и очередь (база пишется в фоне)"""
+    log = RevealLog(directory=tempfile.mkdtemp())
+    log.start()
+    latencies = []
+    for i in range(requests):
+        item = event("append", i)
+        started = time.perf_counter()
+        log.append(item)
+        latencies.append(time.perf_counter() - started)
+    log.stop()
+    return latencies
+
+def measure_sync_commits(requests):
+    """Запись каждого события своей транзакцией с fsync (synchronous=FULL)"""
+    path = os.path.join(tempfile.mkdtemp(), "sync_events.db")
+    engine = create_engine(f"sqlite:///{path}")
+    EventsBase.metadata.create_all(bind=engine)
+    latencies = []
+    with engine.connect() as connection:
+        connection.exec_driver_sql("PRAGMA journal_mode=WAL")
+        connection.exec_driver_sql("PRAGMA synchronous=FULL")
+        connection.commit()
+        for i in range(requests):
+            started = time.perf_counter()
+            connection.execute(HintReveal.__table__.insert(), event("sync", i))
+            connection.commit()
+            latencies.append(time.perf_counter() - started)
+    return latencies
+
+def report(label, latencies, elapsed=None):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    rate = f", {len(latencies) / elapsed:.0f} событий/с" if elapsed else ""
+    print(f"  {label:<34} p50 {statistics.median(latencies) * 1000:7.2f} мс, p99 {p99 * 1000:7.2f} мс{rate}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"Задержка записи ({args.requests} событий):")
+    latencies, elapsed = asyncio.run(measure(args.requests, args.concurrency))
+    report(f"POST /api/reveals/ x{args.concurrency}", latencies, elapsed)
+    report("RevealLog.append", measure_append(args.requests))
+    report("INSERT + COMMIT на событие", measure_sync_commits(args.requests))
+
+if __name__ == "__main__":
+    main()
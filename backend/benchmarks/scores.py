@@ -0,0 +1,141 @@
+"""Итоги открытий подсказок: инкрементальные агрегаты против GROUP BY.
+
+На временной базе событий пачками `write_events` (как их пишет журнал
+открытий) записываются `--events` случайных открытий `--learners`
+учащихся по `--assignments` заданиям. Печатается скорость записи с
+обновлением итогов, затем сверяются итоги с полным пересчетом
+(`rebuild_scores`) — код возврата 1 при расхождении.
+
+Затем сравниваются задержки чтения:
+- место и итоги учащегося: `learner_standing` (первичный ключ +
+  гистограмма штрафов) против GROUP BY по событиям с оконной функцией
+  `RANK()`;
+- страница рейтинга: `leaderboard` по индексу против GROUP BY с ORDER BY.
+
+Запуск из каталога backend:
+    python benchmarks/scores.py --events 1000000 --learners 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, BACKEND_DIR)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'scores.db')}"
+
+from sqlalchemy import text
+
+from database import events_engine, EventsBase, EventsSessionLocal
+from reveals import write_events
+from scores import rebuild_scores, learner_standing, leaderboard
+
+BATCH_SIZE = 1000
+PENALTIES = [5, 10, 10, 10, 15, 20]
+
+RAW_STANDING = text("""
+    SELECT * FROM (
+        SELECT learner_id, count(*) AS hints_used, sum(penalty) AS penalty_sum,
+               RANK() OVER (ORDER BY sum(penalty)) AS rank
+        FROM hint_reveals GROUP BY learner_id
+    ) WHERE learner_id = :learner_id
+""")
+RAW_PAGE = text("""
+    SELECT learner_id, count(*) AS hints_used, sum(penalty) AS penalty_sum
+    FROM hint_reveals GROUP BY learner_id
+    ORDER BY penalty_sum, hints_used, learner_id LIMIT 100
+""")
+
+def generate(events, learners, assignments, seed):
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    for _ in range(events):
+        assignment_id = rng.randrange(1, assignments + 1)
+        yield {
+            "learner_id": f"learner-{rng.randrange(learners)}",
+            # 5 подсказок на задание: повторы отбрасывает уникальный ключ
+            "hint_id": assignment_id * 10 + rng.randrange(5),
+            "assignment_id": assignment_id,
+            "penalty": rng.choice(PENALTIES),
+            "revealed_at": now,
+        }
+
+def write(args):
+    EventsBase.metadata.create_all(bind=events_engine)
+    started = time.perf_counter()
+    batch = []
+    for event in generate(args.events, args.learners, args.assignments, args.seed):
+        batch.append(event)
+        if len(batch) >= BATCH_SIZE:
+            write_events(events_engine, batch)
+            batch = []
+    if batch:
+        write_events(events_engine, batch)
+    return time.perf_counter() - started
+
+def snapshot(connection):
+    tables = {
+        "learner_scores": "learner_id, assignment_id, hints_used, penalty_sum, score, assignments",
+        "penalty_histogram": "*",
+        "assignment_totals": "*",
+    }
+    return {
+        table: connection.exec_driver_sql(f"SELECT {columns} FROM {table} ORDER BY 1, 2").all()
+        for table, columns in tables.items()
+    }
+
+def timed(function, runs):
+    latencies = []
+    for i in range(runs):
+        started = time.perf_counter()
+        function(i)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return statistics.median(latencies), max(latencies)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=200_000)
+    parser.add_argument("--learners", type=int, default=20_000)
+    parser.add_argument("--assignments", type=int, default=30)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    elapsed = write(args)
+    with events_engine.connect() as connection:
+        stored = connection.exec_driver_sql("SELECT count(*) FROM hint_reveals").scalar()
+    print(f"Записано {stored} открытий ({args.events} событий с повторами) за {elapsed:.1f} с: "
+          f"{args.events / elapsed:.0f} событий/с с обновлением итогов")
+
+    with events_engine.begin() as connection:
+        incremental = snapshot(connection)
+        rebuild_scores(connection)
+        rebuilt = snapshot(connection)
+    mismatched = [table for table in incremental if incremental[table] != rebuilt[table]]
+    print("Итоги совпадают с пересчетом" if not mismatched else f"Расхождение с пересчетом: {', '.join(mismatched)}")
+
+    rng = random.Random(args.seed)
+    learners = [f"learner-{rng.randrange(args.learners)}" for _ in range(args.runs)]
+    db = EventsSessionLocal()
+    try:
+        with events_engine.connect() as connection:
+            results = [
+                ("место учащегося, агрегаты", timed(lambda i: learner_standing(db, learners[i]), args.runs)),
+                ("место учащегося, GROUP BY", timed(lambda i: connection.execute(RAW_STANDING, {"learner_id": learners[i]}).all(), args.runs)),
+                ("страница рейтинга, агрегаты", timed(lambda i: leaderboard(db), args.runs)),
+                ("страница рейтинга, GROUP BY", timed(lambda i: connection.execute(RAW_PAGE).all(), args.runs)),
+            ]
+    finally:
+        db.close()
+    print(f"\n{'чтение':<30} {'p50, мс':>9} {'max, мс':>9}")
+    for label, (p50, worst) in results:
+        print(f"{label:<30} {p50:>9.2f} {worst:>9.2f}")
+    if mismatched:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Полнотекстовый поиск FTS5 против LIKE на корпусе из 100k документов.
+
+На временной базе создается схема приложения (вместе с индексом и
+триггерами), затем одной транзакцией вставляются темы, задания и
+подсказки со случайным текстом: половина слов берется из небольшого
+набора частых слов, половина из словаря редких терминов. Замеряются:
+вставка с инкрементальной индексацией триггерами, полное перестроение
+индекса и задержка запросов через `search()` в сравнении с эквивалентным
+`LIKE '%слово%'` по тем же колонкам отдельно для редких и частых слов.
+LIKE выбирает все совпадения: без индекса ранжировать их иначе нельзя.
+
+Запуск из каталога backend:
+    python benchmarks/search.py --documents 100000 --queries 50
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, BACKEND_DIR)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'search.db')}"
+
+from sqlalchemy import insert, text
+
+from database import engine, SessionLocal, Base
+from models import Course, Topic, Assignment, Hint
+from search import search, rebuild_search_index
+
+WORDS = (
+    "функция класс модуль запрос ответ сервер клиент база данных индекс таблица "
+    "компонент состояние хук маршрут шаблон тест ошибка исключение валидация схема "
+    "api fastapi react sqlalchemy pydantic docker deploy cache async python javascript "
+    "очередь поток процесс память диск сеть протокол заголовок токен сессия"
+).split()
+RARE_WORDS = [f"термин{n}" for n in range(20_000)]
+LIKE_SQL = text(
+    "SELECT id FROM topics WHERE description LIKE :pattern OR content LIKE :pattern "
+    "UNION ALL SELECT id FROM assignments WHERE description LIKE :pattern OR instructions LIKE :pattern "
+    "UNION ALL SELECT id FROM hints WHERE text LIKE :pattern"
+)
+
+def sentence(rng, length):
+    return " ".join(rng.choice(WORDS if rng.random() < 0.5 else RARE_WORDS) for _ in range(length))
+
+def seed(documents, seed_value):
+    """Темы : задания : подсказки = 1 : 2 : 2, всего `documents` документов"""
+    rng = random.Random(seed_value)
+    topics = documents // 5
+    assignments = topics * 2
+    hints = documents - topics - assignments
+    with engine.begin() as connection:
+        connection.execute(insert(Course), [{"title": "c", "description": "d"}])
+        connection.execute(insert(Topic), [
+            {"title": sentence(rng, 3), "description": sentence(rng, 10), "content": sentence(rng, 60), "course_id": 1}
+            for _ in range(topics)
+        ])
+        connection.execute(insert(Assignment), [
+            {"title": sentence(rng, 3), "description": sentence(rng, 10), "instructions": sentence(rng, 30),
+             "topic_id": i // 2 + 1}
+            for i in range(assignments)
+        ])
+        connection.execute(insert(Hint), [
+            {"text": sentence(rng, 12), "assignment_id": i % assignments + 1, "order_index": i // assignments}
+            for i in range(hints)
+        ])
+
+def timed(function):
+    started = time.perf_counter()
+    result = function()
+    return result, (time.perf_counter() - started) * 1000
+
+def report(name, samples):
+    samples = sorted(samples)
+    p95 = samples[max(int(len(samples) * 0.95) - 1, 0)]
+    print(f"{name:<16} p50 {statistics.median(samples):8.2f} мс   p95 {p95:8.2f} мс")
+
+def measure(db, terms):
+    fts, like = [], []
+    for term in terms:
+        fts.append(timed(lambda: search(db, term))[1])
+        like.append(timed(lambda: db.execute(LIKE_SQL, {"pattern": f"%{term}%"}).all())[1])
+    return fts, like
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    _, elapsed = timed(lambda: seed(args.documents, args.seed))
+    print(f"Вставка {args.documents} документов с индексацией триггерами: {elapsed / 1000:.2f} с")
+    with engine.begin() as connection:
+        count, elapsed = timed(lambda: rebuild_search_index(connection))
+    print(f"Перестроение индекса ({count} документов): {elapsed / 1000:.2f} с\n")
+
+    rng = random.Random(args.seed)
+    db = SessionLocal()
+    try:
+        for label, words in (("редкие", RARE_WORDS), ("частые", WORDS)):
+            fts, like = measure(db, [rng.choice(words) for _ in range(args.queries)])
+            report(f"FTS5, {label}", fts)
+            report(f"LIKE, {label}", like)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
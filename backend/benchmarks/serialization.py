@@ -0,0 +1,125 @@
+"""Сериализация ответов: штатный путь FastAPI против FastJSONRoute.
+
+На временной базе генерируется курс (`generate_data`), из нее один раз
+загружаются ORM-объекты: страница тем, страница заданий и дерево курса.
+Дальше база не участвует, замеряется только сериализация:
+
+1. Без HTTP: `serialize_response` + `JSONResponse` (что FastAPI делает
+   с `response_model`) против `serialization.dump_json`.
+2. Через ASGITransport: два приложения с одинаковыми обработчиками,
+   возвращающими загруженные объекты, с обычным `APIRouter` и с
+   `APIRouter(route_class=FastJSONRoute)`. Тела ответов сравниваются.
+
+Запуск из каталога backend:
+    python benchmarks/serialization.py --topics 100 --assignments 10 --repeat 300
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, BACKEND_DIR)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'serialization.db')}"
+
+import httpx
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from typing import List
+
+from database import engine, SessionLocal, Base
+from generate_data import generate_data
+from loaders import course_tree_options, with_text
+from models import Course, Topic, Assignment
+from schemas import Topic as TopicSchema, Assignment as AssignmentSchema, CourseWithTopics
+from serialization import FastJSONRoute, dump_json
+
+def load_cases(topics, assignments):
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        generate_data(connection, 1, topics, assignments, 0, search_index=False)
+    db = SessionLocal()
+    try:
+        course = db.query(Course).options(course_tree_options()).first()
+        return {
+            "/topics": (List[TopicSchema], db.query(Topic).options(with_text()).order_by(Topic.id).limit(100).all()),
+            "/assignments": (List[AssignmentSchema], db.query(Assignment).options(with_text()).order_by(Assignment.id).limit(500).all()),
+            "/course": (CourseWithTopics, course),
+        }
+    finally:
+        db.close()
+
+def fastapi_body(field, value) -> bytes:
+    content = asyncio.run(serialize_response(field=field, response_content=value))
+    return JSONResponse(content).body
+
+def per_call_us(function, repeat):
+    function()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - started) * 1e6)
+    return statistics.median(samples)
+
+def returning(value):
+    # Через замыкание, а не значение по умолчанию: FastAPI копирует умолчания на каждый запрос
+    async def endpoint():
+        return value
+    return endpoint
+
+def build_app(cases, route_class=None) -> FastAPI:
+    router = APIRouter(route_class=route_class) if route_class else APIRouter()
+    for path, (schema, value) in cases.items():
+        router.add_api_route(path, returning(value), response_model=schema)
+    app = FastAPI()
+    app.include_router(router)
+    return app
+
+async def per_request_us(app, path, repeat):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        body = (await client.get(path)).content
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            await client.get(path)
+            samples.append((time.perf_counter() - started) * 1e6)
+        return statistics.median(samples), body
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--topics", type=int, default=100, help="тем в курсе")
+    parser.add_argument("--assignments", type=int, default=10, help="заданий на тему")
+    parser.add_argument("--repeat", type=int, default=300)
+    args = parser.parse_args()
+
+    cases = load_cases(args.topics, args.assignments)
+    print("Сериализация без HTTP (медиана):")
+    for path, (schema, value) in cases.items():
+        field = create_response_field(name=f"Response{path.strip('/')}", type_=schema, mode="serialization")
+        standard = per_call_us(lambda: fastapi_body(field, value), args.repeat)
+        fast = per_call_us(lambda: dump_json(schema, value), args.repeat)
+        print(f"  {path:<13} {len(dump_json(schema, value)) / 1024:8.1f} КиБ  {standard:9.0f} мкс -> {fast:7.0f} мкс  (x{standard / fast:.1f})")
+
+    print("Через ASGI (медиана):")
+    standard_app = build_app(cases)
+    fast_app = build_app(cases, FastJSONRoute)
+    mismatched = []
+    for path in cases:
+        standard, standard_body = asyncio.run(per_request_us(standard_app, path, args.repeat))
+        fast, fast_body = asyncio.run(per_request_us(fast_app, path, args.repeat))
+        if standard_body != fast_body:
+            mismatched.append(path)
+        print(f"  GET {path:<13} {standard:9.0f} мкс -> {fast:7.0f} мкс  (x{standard / fast:.1f})")
+
+    if mismatched:
+        print(f"Тела ответов различаются: {', '.join(mismatched)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Конкурентность чтения/записи для профилей подключения default и production.
+
+На временной базе с тестовыми данными одновременно работают несколько
+потоков-читателей (выборка дерева тем с заданиями) и потоки-писатели
+(обновление заданий отдельными транзакциями). В режиме rollback-journal
+писатель блокирует читателей, в WAL они работают параллельно.
+
+Запуск из каталога backend:
+    python benchmarks/sqlite_profile.py --readers 8 --writers 2 --seconds 5
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, BACKEND_DIR)
+
+from database import create_db_engine
+
+READ_SQL = text(
+    "SELECT t.id, t.title, a.id, a.title, a.instructions "
+    "FROM topics t JOIN assignments a ON a.topic_id = t.id "
+    "WHERE t.course_id = 1 ORDER BY t.order_index"
+)
+WRITE_SQL = text("UPDATE assignments SET estimated_hours = estimated_hours + 1 WHERE id = :id")
+
+def seed_database():
+    db_path = os.path.join(tempfile.mkdtemp(), "seed.db")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}")
+    subprocess.run([sys.executable, "init_db.py"], cwd=BACKEND_DIR, env=env, check=True, stdout=subprocess.DEVNULL)
+    return db_path
+
+def run_profile(profile, seed_path, args):
+    db_path = os.path.join(tempfile.mkdtemp(), f"{profile}.db")
+    shutil.copy(seed_path, db_path)
+    engine = create_db_engine(f"sqlite:///{db_path}", profile)
+    counters = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+    stop = threading.Event()
+    
+    def bump(name):
+        with lock:
+            counters[name] += 1
+    
+    def reader():
+        while not stop.is_set():
+            try:
+                with engine.connect() as connection:
+                    connection.execute(READ_SQL).all()
+                bump("reads")
+            except OperationalError:
+                bump("errors")
+    
+    def writer(offset):
+        i = offset
+        while not stop.is_set():
+            try:
+                with engine.begin() as connection:
+                    connection.execute(WRITE_SQL, {"id": i % 8 + 1})
+                bump("writes")
+            except OperationalError:
+                bump("errors")
+            i += 1
+    
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(n,)) for n in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+    return {name: value / args.seconds for name, value in counters.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+    
+    seed_path = seed_database()
+    print(f"{'profile':<11} {'reads/s':>9} {'writes/s':>9} {'errors/s':>9}")
+    for profile in ("default", "production"):
+        result = run_profile(profile, seed_path, args)
+        print(f"{profile:<11} {result['reads']:>9.1f} {result['writes']:>9.1f} {result['errors']:>9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Время запуска: от старта процесса uvicorn до первого ответа.
+
+На временной базе генерируется курс (`generate_data.py`), база
+отмечается головой миграций (`startup.py init`). Для каждого сценария
+несколько раз поднимается отдельный процесс uvicorn и замеряется:
+
+- готовность — от запуска процесса до первого 200 от /api/health
+  (импорт приложения, lifespan с подготовкой схемы и прогревом);
+- первый запрос — время первого GET /api/courses/1 (снимок, сжатие,
+  построение сериализаторов, если их не сделал прогрев).
+
+Печатаются медианы и строки лога lifespan («Запуск: ...») последнего
+прогона. С `--importtime N` дополнительно выводятся N самых дорогих
+модулей при `import main` (`python -X importtime`).
+
+Запуск из каталога backend:
+    python benchmarks/startup.py --runs 5 --importtime 15
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+SCENARIOS = [
+    ("create", {"SCHEMA_MODE": "create"}),
+    ("alembic", {"SCHEMA_MODE": "alembic"}),
+    ("alembic+прогрев", {"SCHEMA_MODE": "alembic", "STARTUP_PREWARM": "1", "PREWARM_URLS": "/api/courses/1"}),
+]
+
+def prepare_database(args):
+    db_path = os.path.join(tempfile.mkdtemp(), "startup.db")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}")
+    generate = [
+        sys.executable, "generate_data.py", "--courses", "1", "--topics", str(args.topics),
+        "--assignments", str(args.assignments), "--hints", "2",
+    ]
+    subprocess.run(generate, cwd=BACKEND_DIR, env=env, check=True, stdout=subprocess.DEVNULL)
+    subprocess.run([sys.executable, "startup.py", "init"], cwd=BACKEND_DIR, env=env, check=True, capture_output=True)
+    return env
+
+def wait_ready(client, server, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("Сервер завершился при запуске")
+        try:
+            if client.get("/api/health").status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.005)
+    raise RuntimeError("Сервер не запустился")
+
+def run_once(env, port):
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--no-access-log"],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    started = time.perf_counter()
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}") as client:
+            wait_ready(client, server)
+            ready = time.perf_counter() - started
+            first_started = time.perf_counter()
+            response = client.get("/api/courses/1", headers={"Accept-Encoding": "gzip"})
+            first = time.perf_counter() - first_started
+            response.raise_for_status()
+    finally:
+        server.terminate()
+        _, log = server.communicate()
+    phases = [line.split("Запуск: ", 1)[1] for line in log.splitlines() if "Запуск: " in line]
+    return ready * 1000, first * 1000, phases
+
+def import_profile(env, top):
+    """Самые дорогие модули при `import main` по собственному времени импорта"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(self_us), int(cumulative_us), name.rstrip()))
+    total = next(cumulative for _, cumulative, name in rows if name.strip() == "main")
+    print(f"\nimport main: {total / 1000:.0f} мс, самые дорогие модули (собственное время):")
+    for self_us, cumulative_us, name in sorted(rows, reverse=True)[:top]:
+        print(f"  {self_us / 1000:7.1f} мс  (с зависимостями {cumulative_us / 1000:7.1f})  {name.strip()}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--topics", type=int, default=50, help="тем в курсе")
+    parser.add_argument("--assignments", type=int, default=10, help="заданий на тему")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--importtime", type=int, default=0, metavar="N", help="показать N самых дорогих импортов")
+    args = parser.parse_args()
+
+    env = prepare_database(args)
+    print(f"{'сценарий':<18} {'готовность, мс':>15} {'первый запрос, мс':>18}")
+    for label, overrides in SCENARIOS:
+        scenario_env = dict(env, **overrides)
+        results = [run_once(scenario_env, args.port) for _ in range(args.runs)]
+        ready = statistics.median(result[0] for result in results)
+        first = statistics.median(result[1] for result in results)
+        print(f"{label:<18} {ready:15.0f} {first:18.1f}")
+        for phase in results[-1][2]:
+            print(f"  {phase}")
+    if args.importtime:
+        import_profile(env, args.importtime)
+
+if __name__ == "__main__":
+    main()
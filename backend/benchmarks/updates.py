@@ -0,0 +1,126 @@
+"""PUT-обновления: UPDATE ... RETURNING против SELECT + setattr + refresh.
+
+Нагрузка администратора, правящего контент пачкой: на временной базе
+(`generate_data`) выполняется `--edits` правок случайных строк каждой
+таблицы, каждая своей сессией и транзакцией, как отдельный PUT. Правки
+сравниваются двумя путями записи:
+
+- ORM: SELECT строки, setattr переданных полей, UPDATE при commit и
+  `refresh` всех колонок (прежние обработчики PUT);
+- `update_entity`: один `UPDATE ... RETURNING` по переданным полям.
+
+Перестроение снимка курса, общее для обоих путей, не замеряется.
+Печатаются p50/p99 и число SQL-запросов на правку. Затем проверяется,
+что ответ `update_entity` совпадает со строкой в базе и что для
+несуществующего id возвращается None — код возврата 1 при ошибке.
+
+Запуск из каталога backend:
+    python benchmarks/updates.py --edits 2000 --courses 20
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, BACKEND_DIR)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'updates.db')}"
+
+from sqlalchemy import event, func, select
+
+from database import engine, SessionLocal, Base
+from models import Course, Topic, Assignment, Hint
+from schemas import Course as CourseSchema, Topic as TopicSchema, Assignment as AssignmentSchema, Hint as HintSchema
+from bulk import update_entity
+from loaders import column_names, with_text
+from generate_data import generate_data
+
+# Таблица и правка, которую вносит администратор
+EDITS = [
+    ("courses", Course, CourseSchema, lambda rng, n: {"title": f"Курс {n}", "duration_hours": rng.randint(10, 80)}),
+    ("topics", Topic, TopicSchema, lambda rng, n: {"title": f"Тема {n}", "duration_minutes": rng.choice([30, 45, 60])}),
+    ("assignments", Assignment, AssignmentSchema, lambda rng, n: {"estimated_hours": rng.randint(1, 12), "is_required": rng.random() < 0.5}),
+    ("hints", Hint, HintSchema, lambda rng, n: {"penalty": rng.choice([5, 10, 15, 20])}),
+]
+
+def orm_update(db, model, schema, row_id, values):
+    """Прежний путь обработчиков PUT"""
+    row = db.query(model).filter(model.id == row_id).first()
+    if row is None:
+        return None
+    for field, value in values.items():
+        setattr(row, field, value)
+    db.commit()
+    db.refresh(row, column_names(model))
+    return schema.model_validate(row)
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self.on_execute)
+
+    def on_execute(self, *args):
+        self.count += 1
+
+def run(function, model, schema, ids, make_values, counter, seed):
+    rng = random.Random(seed)
+    latencies = []
+    counter.count = 0
+    for n, row_id in enumerate(ids):
+        values = make_values(rng, n)
+        db = SessionLocal()
+        try:
+            started = time.perf_counter()
+            function(db, model, schema, row_id, values)
+            latencies.append((time.perf_counter() - started) * 1000)
+        finally:
+            db.close()
+    return latencies, counter.count / len(ids)
+
+def check(model, schema, row_id, make_values):
+    values = make_values(random.Random(0), row_id)
+    db = SessionLocal()
+    try:
+        returned = update_entity(db, model, schema, row_id, values)
+        stored = schema.model_validate(db.get(model, row_id, options=[with_text()]))
+        missing = update_entity(db, model, schema, 10**9, values)
+    finally:
+        db.close()
+    return returned == stored and all(getattr(stored, field) == value for field, value in values.items()) and missing is None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--edits", type=int, default=1000, help="правок на таблицу и путь записи")
+    parser.add_argument("--courses", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        generate_data(connection, args.courses, 10, 10, 5, search_index=False)
+    counter = StatementCounter()
+    rng = random.Random(args.seed)
+
+    failed = False
+    print(f"{'таблица':<12} {'путь':<16} {'p50, мс':>9} {'p99, мс':>9} {'SQL/правку':>11}")
+    for name, model, schema, make_values in EDITS:
+        with engine.connect() as connection:
+            total = connection.scalar(select(func.count()).select_from(model))
+        ids = [rng.randint(1, total) for _ in range(args.edits)]
+        for label, function in (("ORM", orm_update), ("update_entity", update_entity)):
+            latencies, statements = run(function, model, schema, ids, make_values, counter, args.seed)
+            latencies.sort()
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            print(f"{name:<12} {label:<16} {statistics.median(latencies):>9.3f} {p99:>9.3f} {statements:>11.1f}")
+        ok = check(model, schema, ids[0], make_values)
+        failed |= not ok
+        if not ok:
+            print(f"  FAIL {name}: ответ update_entity не совпадает со строкой в базе")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
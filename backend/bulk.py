@@ -0,0 +1,221 @@
+from fastapi import HTTPException
+from sqlalchemy import select, insert, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from models import Course, Topic, Assignment, Hint, CourseSnapshot
+from schemas import (
+    CourseDocument, TopicCreate, AssignmentCreate, HintCreate,
+    Topic as TopicSchema, Assignment as AssignmentSchema, Hint as HintSchema,
+)
+from snapshots import rebuild_course_snapshot
+from invalidation import track_writes
+from loaders import with_text
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Ограничение на число строк в одном multi-VALUES upsert (лимит переменных SQLite)
+UPSERT_BATCH_SIZE = 500
+# Колонки подсказки, которые upsert обновляет у существующей строки
+UPSERT_HINT_COLUMNS = {"text", "penalty"}
+
+"""Массовая загрузка контента.
+
+Вместо отдельного POST на каждую строку (проверка родителя, commit и
+refresh на каждый объект) родительские id проверяются одним запросом
+`IN (...)`, а строки вставляются одним `INSERT ... RETURNING` в общей
+транзакции. Ответ собирается из возвращенных строк до commit, чтобы не
+перечитывать объекты после истечения их состояния.
+
+PUT-обработчики так же обходятся одним `UPDATE ... RETURNING` по
+переданным полям (`update_entity`) вместо SELECT, UPDATE и `refresh`:
+отсутствие строки — пустой результат, то есть 404.
+
+DELETE-обработчики (`delete_entity`) читают строку и удаляют ее с
+дочерними каскадом ORM, поэтому блокировку записи берут до чтения
+(`begin_write`): иначе строка читается вне транзакции, и удаление,
+дождавшись чужого коммита, работает по устаревшему чтению.
+"""
+
+def check_parents(db: Session, model, ids: Iterable[int], detail: str) -> None:
+    """Проверить существование всех родительских записей одним запросом"""
+    wanted = set(ids)
+    found = set(db.scalars(select(model.id).where(model.id.in_(wanted))))
+    missing = sorted(wanted - found)
+    if missing:
+        raise HTTPException(status_code=404, detail=f"{detail}: {missing}")
+
+def insert_rows(db: Session, model, rows: List[dict]) -> list:
+    """Вставить строки пакетным INSERT ... RETURNING, сохранив порядок входных данных.
+    
+    sort_by_parameter_order на SQLite без AUTOINCREMENT откатывается к
+    построчной вставке, поэтому порядок восстанавливается по id: SQLite
+    выдает rowid по возрастанию в порядке вставки строк.
+    """
+    if not rows:
+        return []
+    inserted = sorted(db.scalars(insert(model).returning(model).options(with_text()), rows), key=lambda row: row.id)
+    # Пакетная вставка минует unit of work, поэтому теги кэша отмечаются явно
+    track_writes(db, inserted)
+    return inserted
+
+def update_entity(db: Session, model, schema, row_id: int, values: dict):
+    """Обновить строку одним UPDATE ... RETURNING и зафиксировать; None, если строки нет.
+
+    `updated_at` выставляет onupdate колонки. Без полей для обновления
+    строка только читается, как и раньше, когда commit ничего не менял.
+    """
+    if not values:
+        row = db.get(model, row_id, options=[with_text()])
+    else:
+        row = db.scalars(
+            update(model)
+            .where(model.id == row_id)
+            .values(**values)
+            .returning(model)
+            .options(with_text()),
+            execution_options={"synchronize_session": False, "populate_existing": True},
+        ).one_or_none()
+    if row is None:
+        return None
+    if values:
+        # UPDATE через execute минует unit of work, теги кэша отмечаются явно
+        track_writes(db, [row])
+    updated = schema.model_validate(row)
+    db.commit()
+    return updated
+
+def begin_write(db: Session) -> None:
+    """Начать транзакцию сессии с блокировкой записи (BEGIN IMMEDIATE).
+
+    pysqlite открывает транзакцию только перед первым изменением, поэтому
+    чтения до него идут вне транзакции. BEGIN IMMEDIATE ждет блокировку до
+    busy_timeout, и все последующие чтения видят уже зафиксированные данные.
+    """
+    db.connection().exec_driver_sql("BEGIN IMMEDIATE")
+
+def _snapshot_course(db: Session, row) -> Optional[int]:
+    """Курс, в снимок которого входит строка; подсказок в снимке нет"""
+    if isinstance(row, Course):
+        return row.id
+    if isinstance(row, Topic):
+        return row.course_id
+    if isinstance(row, Assignment):
+        return db.scalar(select(Topic.course_id).where(Topic.id == row.topic_id))
+    return None
+
+def delete_entity(db: Session, model, row_id: int) -> bool:
+    """Удалить строку с дочерними и перестроить снимок курса; False, если строки нет"""
+    begin_write(db)
+    row = db.get(model, row_id)
+    if row is None:
+        db.rollback()
+        return False
+    course_id = _snapshot_course(db, row)
+    db.delete(row)
+    db.commit()
+    if course_id is not None:
+        rebuild_course_snapshot(db, course_id)
+    return True
+
+def upsert_hints(db: Session, hints: List[HintCreate]) -> List[Hint]:
+    """Вставить подсказки или обновить существующие по (assignment_id, order_index).
+
+    Повторы пары в одном теле сливаются по порядку (побеждает последнее
+    значение поля), поэтому в ответе по строке на пару. У существующей
+    подсказки обновляются только переданные поля: пропущенный `penalty`
+    не сбрасывается к значению по умолчанию.
+    """
+    rows: Dict[Tuple[int, int], dict] = {}
+    provided: Dict[Tuple[int, int], set] = {}
+    for hint in hints:
+        key = (hint.assignment_id, hint.order_index)
+        fields = hint.dict(exclude_unset=True)
+        rows.setdefault(key, hint.dict()).update(fields)
+        provided.setdefault(key, set()).update(fields.keys() & UPSERT_HINT_COLUMNS)
+    # Один SET на набор переданных колонок
+    groups: Dict[frozenset, List[dict]] = {}
+    for key, row in rows.items():
+        groups.setdefault(frozenset(provided[key]), []).append(row)
+    upserted = []
+    for columns, group in groups.items():
+        for start in range(0, len(group), UPSERT_BATCH_SIZE):
+            statement = sqlite_insert(Hint).values(group[start:start + UPSERT_BATCH_SIZE])
+            statement = statement.on_conflict_do_update(
+                index_elements=[Hint.assignment_id, Hint.order_index],
+                set_={
+                    **{column: statement.excluded[column] for column in sorted(columns)},
+                    "updated_at": datetime.utcnow(),
+                },
+            )
+            upserted.extend(db.scalars(
+                statement.returning(Hint),
+                execution_options={"populate_existing": True},
+            ))
+    track_writes(db, upserted)
+    return sorted(upserted, key=lambda hint: (hint.assignment_id, hint.order_index))
+
+def _insert_course_document(db: Session, document: CourseDocument) -> int:
+    """Загрузить курс целиком: по одному INSERT на каждый уровень дерева"""
+    course = insert_rows(db, Course, [document.dict(exclude={"topics"})])[0]
+    
+    topics = insert_rows(db, Topic, [
+        {**topic.dict(exclude={"assignments"}), "course_id": course.id}
+        for topic in document.topics
+    ])
+    
+    assignment_documents = []
+    assignment_rows = []
+    for topic, topic_document in zip(topics, document.topics):
+        for assignment in topic_document.assignments:
+            assignment_documents.append(assignment)
+            assignment_rows.append({**assignment.dict(exclude={"hints"}), "topic_id": topic.id})
+    assignments = insert_rows(db, Assignment, assignment_rows)
+    
+    insert_rows(db, Hint, [
+        {**hint.dict(), "assignment_id": assignment.id}
+        for assignment, assignment_document in zip(assignments, assignment_documents)
+        for hint in assignment_document.hints
+    ])
+    return course.id
+
+def _rebuild_snapshots(db: Session, course_ids: Iterable[int]) -> None:
+    for course_id in sorted(set(course_ids)):
+        rebuild_course_snapshot(db, course_id)
+
+def create_topics(db: Session, topics: List[TopicCreate]) -> List[TopicSchema]:
+    """Создать темы одной транзакцией"""
+    check_parents(db, Course, [topic.course_id for topic in topics], "Курс не найден")
+    created = [TopicSchema.model_validate(topic) for topic in insert_rows(db, Topic, [topic.dict() for topic in topics])]
+    db.commit()
+    _rebuild_snapshots(db, [topic.course_id for topic in created])
+    return created
+
+def create_assignments(db: Session, assignments: List[AssignmentCreate]) -> List[AssignmentSchema]:
+    """Создать задания одной транзакцией"""
+    topic_ids = {assignment.topic_id for assignment in assignments}
+    check_parents(db, Topic, topic_ids, "Тема не найдена")
+    rows = [assignment.dict() for assignment in assignments]
+    created = [AssignmentSchema.model_validate(assignment) for assignment in insert_rows(db, Assignment, rows)]
+    course_ids = list(db.scalars(select(Topic.course_id).where(Topic.id.in_(topic_ids))))
+    db.commit()
+    _rebuild_snapshots(db, course_ids)
+    return created
+
+def create_hints(db: Session, hints: List[HintCreate], upsert: bool = False) -> List[HintSchema]:
+    """Создать подсказки одной транзакцией; при upsert - обновить совпавшие по порядковому номеру"""
+    check_parents(db, Assignment, [hint.assignment_id for hint in hints], "Задание не найдено")
+    try:
+        inserted = upsert_hints(db, hints) if upsert else insert_rows(db, Hint, [hint.dict() for hint in hints])
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Подсказка с таким порядковым номером уже существует")
+    created = [HintSchema.model_validate(hint) for hint in inserted]
+    db.commit()
+    return created
+
+def import_course(db: Session, document: CourseDocument) -> CourseSnapshot:
+    """Загрузить курс со всем деревом и вернуть его снимок"""
+    course_id = _insert_course_document(db, document)
+    db.commit()
+    return rebuild_course_snapshot(db, course_id)
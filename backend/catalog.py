@@ -0,0 +1,325 @@
+from sqlalchemy import DateTime, bindparam, delete, insert, select, text
+from sqlalchemy.engine import Connection
+from models import Course, Topic, Assignment, Hint, CourseSnapshot
+from invalidation import DATA_VERSION, invalidate
+from datetime import datetime
+from typing import AsyncIterator, BinaryIO, Dict, Iterable, Iterator, List, Optional
+import json
+import logging
+import sys
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+"""Выгрузка и загрузка всего каталога (курсы, темы, задания, подсказки).
+
+Формат — NDJSON: первая строка заголовок `{"format": "vibe-catalog",
+"version": 1}`, дальше по строке на запись `{"table": "topics", "row":
+{...}}` со всеми колонками. Таблицы идут от родителей к детям, строки
+каждой — по возрастанию id.
+
+Выгрузка читает таблицы одной транзакцией чтения (согласованный снимок;
+в профиле production с WAL она не мешает записи) через серверный курсор
+(`yield_per`), поэтому в памяти держится одна пачка строк.
+
+Загрузка идет пачками по `IMPORT_BATCH_SIZE` строк, каждая пачка —
+отдельная транзакция с одним `INSERT ... RETURNING`. Записи получают
+новые id, внешние ключи переводятся через временную таблицу
+соответствия старых и новых id; она хранится в файле SQLite, а не в
+памяти процесса, поэтому память не растет с числом строк. Повторная
+загрузка того же файла создает копию каталога; при ошибке уже
+загруженные пачки остаются.
+
+Между пачками каталог виден читателям частично: курс уже есть, его темы
+еще нет. Поэтому пачка тем или заданий в своей же транзакции удаляет
+снимки затронутых курсов (`course_snapshots`) и сбрасывает их записи в
+кэше ответов: снимок, построенный чтением между пачками, не переживет
+следующую пачку и будет построен заново при следующем чтении.
+
+Команды (из каталога backend):
+    python catalog.py export catalog.ndjson
+    python catalog.py import catalog.ndjson
+"""
+
+FORMAT = "vibe-catalog"
+FORMAT_VERSION = 1
+EXPORT_BATCH_SIZE = 1000
+IMPORT_BATCH_SIZE = 5000
+
+# Таблица -> (модель, колонка родителя, таблица родителя); порядок — от родителей к детям
+TABLES = {
+    "courses": (Course, None, None),
+    "topics": (Topic, "course_id", "courses"),
+    "assignments": (Assignment, "topic_id", "topics"),
+    "hints": (Hint, "assignment_id", "assignments"),
+}
+# Таблицы, на строки которых ссылаются дети: их id попадают в таблицу соответствия
+PARENTS = {parent for _, _, parent in TABLES.values() if parent}
+
+logger = logging.getLogger("uvicorn.error")
+
+class CatalogError(ValueError):
+    """Некорректный файл каталога"""
+
+def _encode(value: dict) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, default=datetime.isoformat).encode("utf-8")
+
+def _decode(line: bytes) -> dict:
+    try:
+        return orjson.loads(line) if orjson is not None else json.loads(line)
+    except ValueError as error:
+        raise CatalogError(f"Некорректный JSON: {error}")
+
+def _export_statements():
+    for name, (model, _, _) in TABLES.items():
+        table = model.__table__
+        yield name, select(table).order_by(table.c.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+def _header() -> bytes:
+    return _encode({"format": FORMAT, "version": FORMAT_VERSION}) + b"\n"
+
+def _log_throughput(action: str, rows: int, started: float) -> None:
+    elapsed = time.perf_counter() - started
+    logger.info("Каталог: %s %d строк за %.1f с (%.0f строк/с)", action, rows, elapsed, rows / elapsed if elapsed else 0)
+
+def export_catalog(connection: Connection) -> Iterator[bytes]:
+    """Строки NDJSON каталога пачками по EXPORT_BATCH_SIZE"""
+    started = time.perf_counter()
+    rows = 0
+    yield _header()
+    with connection.begin():
+        # pysqlite не начинает транзакцию перед SELECT: без явного BEGIN
+        # каждая таблица читалась бы из своего снимка
+        connection.exec_driver_sql("BEGIN")
+        for name, statement in _export_statements():
+            chunk = []
+            for row in connection.execute(statement).mappings():
+                chunk.append(_encode({"table": name, "row": dict(row)}))
+                if len(chunk) >= EXPORT_BATCH_SIZE:
+                    rows += len(chunk)
+                    yield b"\n".join(chunk) + b"\n"
+                    chunk = []
+            if chunk:
+                rows += len(chunk)
+                yield b"\n".join(chunk) + b"\n"
+    _log_throughput("выгружено", rows, started)
+
+async def async_export_catalog(connection) -> AsyncIterator[bytes]:
+    """То же, что export_catalog, для AsyncConnection"""
+    started = time.perf_counter()
+    rows = 0
+    yield _header()
+    async with connection.begin():
+        await connection.exec_driver_sql("BEGIN")
+        for name, statement in _export_statements():
+            chunk = []
+            async for row in (await connection.stream(statement)).mappings():
+                chunk.append(_encode({"table": name, "row": dict(row)}))
+                if len(chunk) >= EXPORT_BATCH_SIZE:
+                    rows += len(chunk)
+                    yield b"\n".join(chunk) + b"\n"
+                    chunk = []
+            if chunk:
+                rows += len(chunk)
+                yield b"\n".join(chunk) + b"\n"
+    _log_throughput("выгружено", rows, started)
+
+_PARENT_IDS = text(
+    "SELECT old_id, new_id FROM temp.catalog_ids WHERE tbl = :tbl AND old_id IN :ids"
+).bindparams(bindparam("ids", expanding=True))
+
+class CatalogImport:
+    """Загрузка каталога на одном соединении (временная таблица живет в нем)"""
+
+    def __init__(self, connection: Connection, batch_size: int = IMPORT_BATCH_SIZE):
+        self.connection = connection
+        self.batch_size = batch_size
+        self.counts: Dict[str, int] = {name: 0 for name in TABLES}
+        self.order = list(TABLES)
+        self.position = 0
+        self.converters = {
+            name: {
+                column.name: datetime.fromisoformat
+                for column in model.__table__.columns if isinstance(column.type, DateTime)
+            }
+            for name, (model, _, _) in TABLES.items()
+        }
+
+    def run(self, lines: Iterable[bytes]) -> dict:
+        started = time.perf_counter()
+        # Таблица соответствия id может быть большой: держим ее в файле, а не в памяти
+        self.connection.exec_driver_sql("PRAGMA temp_store = FILE")
+        self.connection.exec_driver_sql(
+            "CREATE TEMP TABLE IF NOT EXISTS catalog_ids "
+            "(tbl TEXT NOT NULL, old_id INTEGER NOT NULL, new_id INTEGER NOT NULL, PRIMARY KEY (tbl, old_id)) WITHOUT ROWID"
+        )
+        try:
+            self._load(lines)
+        finally:
+            self.connection.rollback()
+            # Соединение со смененным temp_store в пул не возвращается: после
+            # возврата прежнего значения его записи под чужой блокировкой
+            # получали "database is locked" сразу, не дожидаясь busy_timeout.
+            # Временная таблица закрывается вместе с соединением
+            self.connection.invalidate()
+        rows = sum(self.counts.values())
+        _log_throughput("загружено", rows, started)
+        elapsed = time.perf_counter() - started
+        return {
+            "tables": self.counts,
+            "rows": rows,
+            "seconds": round(elapsed, 3),
+            "rows_per_second": round(rows / elapsed, 1) if elapsed else 0.0,
+        }
+
+    def _load(self, lines: Iterable[bytes]) -> None:
+        number = 0
+        table: Optional[str] = None
+        chunk: List[dict] = []
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            record = _decode(line)
+            if number == 1:
+                if record.get("format") != FORMAT or record.get("version") != FORMAT_VERSION:
+                    raise CatalogError(f"Ожидался заголовок {FORMAT} версии {FORMAT_VERSION}")
+                continue
+            name, row = record.get("table"), record.get("row")
+            if not isinstance(row, dict) or name not in TABLES:
+                raise CatalogError(f"Строка {number}: неизвестная таблица {name!r}")
+            if name != table:
+                self._flush(table, chunk)
+                chunk = []
+                self._advance(name, number)
+                table = name
+            chunk.append(row)
+            if len(chunk) >= self.batch_size:
+                self._flush(table, chunk)
+                chunk = []
+        if number == 0:
+            raise CatalogError("Пустой файл каталога")
+        self._flush(table, chunk)
+
+    def _advance(self, name: str, number: int) -> None:
+        """Таблицы должны идти от родителей к детям, каждая один раз"""
+        index = self.order.index(name)
+        if index < self.position:
+            raise CatalogError(f"Строка {number}: таблица {name} после своих дочерних таблиц")
+        self.position = index + 1
+
+    def _flush(self, name: Optional[str], rows: List[dict]) -> None:
+        if not rows:
+            return
+        model, parent_column, parent = TABLES[name]
+        table = model.__table__
+        converters = self.converters[name]
+        values = []
+        for row in rows:
+            value = {
+                column.name: row[column.name]
+                for column in table.columns if column.name != "id" and column.name in row
+            }
+            for column, convert in converters.items():
+                if isinstance(value.get(column), str):
+                    value[column] = convert(value[column])
+            values.append(value)
+        if parent_column is not None:
+            self._remap(parent, parent_column, values)
+
+        new_ids = sorted(self.connection.scalars(insert(table).returning(table.c.id), values))
+        course_ids = self._drop_snapshots(name, values)
+        if name in PARENTS:
+            old_ids = [row.get("id") for row in rows]
+            if any(not isinstance(old_id, int) for old_id in old_ids):
+                raise CatalogError(f"Таблица {name}: у строк должны быть целые id")
+            # Как и в bulk.insert_rows: SQLite выдает rowid по возрастанию в порядке вставки
+            self.connection.execute(
+                text("INSERT INTO temp.catalog_ids (tbl, old_id, new_id) VALUES (:tbl, :old_id, :new_id)"),
+                [{"tbl": name, "old_id": old_id, "new_id": new_id} for old_id, new_id in zip(old_ids, new_ids)],
+            )
+        self.connection.commit()
+        self.counts[name] += len(rows)
+        DATA_VERSION.bump()
+        invalidate({name, *(("course", course_id) for course_id in course_ids)})
+
+    def _drop_snapshots(self, name: str, values: List[dict]) -> List[int]:
+        """Удалить снимки курсов, дерево которых меняет пачка; возвращает их id"""
+        if name == "topics":
+            course_ids = sorted({value["course_id"] for value in values})
+        elif name == "assignments":
+            topic_ids = sorted({value["topic_id"] for value in values})
+            course_ids = list(self.connection.scalars(
+                select(Topic.course_id).where(Topic.id.in_(topic_ids)).distinct()
+            ))
+        else:
+            return []
+        self.connection.execute(delete(CourseSnapshot).where(CourseSnapshot.course_id.in_(course_ids)))
+        return course_ids
+
+    def _remap(self, parent: str, column: str, values: List[dict]) -> None:
+        """Заменить старые id родителей новыми одним запросом на пачку"""
+        old_ids = {value.get(column) for value in values}
+        mapping = dict(self.connection.execute(
+            _PARENT_IDS,
+            {"tbl": parent, "ids": [old_id for old_id in old_ids if isinstance(old_id, int)]},
+        ).all())
+        missing = sorted(str(old_id) for old_id in old_ids if old_id not in mapping)
+        if missing:
+            raise CatalogError(f"Нет родительских записей {parent} с id: {', '.join(missing[:20])}")
+        for value in values:
+            value[column] = mapping[value[column]]
+
+def import_catalog(connection: Connection, lines: Iterable[bytes], batch_size: int = IMPORT_BATCH_SIZE) -> dict:
+    """Загрузить каталог; возвращает число строк по таблицам и скорость"""
+    return CatalogImport(connection, batch_size).run(lines)
+
+def _open(path: str, mode: str) -> BinaryIO:
+    if path == "-":
+        return sys.stdout.buffer if "w" in mode else sys.stdin.buffer
+    if path.endswith(".gz"):
+        import gzip
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+if __name__ == "__main__":
+    from database import engine
+    if len(sys.argv) not in (2, 3) or sys.argv[1] not in ("export", "import"):
+        print("Использование: python catalog.py export|import [файл.ndjson[.gz] | -]")
+        sys.exit(2)
+    command, path = sys.argv[1], sys.argv[2] if len(sys.argv) == 3 else "-"
+    started = time.perf_counter()
+    if command == "export":
+        rows = 0
+        target = _open(path, "wb")
+        with engine.connect() as connection:
+            for chunk in export_catalog(connection):
+                rows += chunk.count(b"\n")
+                target.write(chunk)
+        if target is not sys.stdout.buffer:
+            target.close()
+        # Заголовок — тоже строка
+        rows -= 1
+        elapsed = time.perf_counter() - started
+        print(f"Выгружено {rows} строк за {elapsed:.1f} с ({rows / elapsed:.0f} строк/с)", file=sys.stderr)
+    else:
+        source = _open(path, "rb")
+        try:
+            with engine.connect() as connection:
+                result = import_catalog(connection, source)
+        except CatalogError as error:
+            print(error, file=sys.stderr)
+            sys.exit(1)
+        finally:
+            if source is not sys.stdin.buffer:
+                source.close()
+        tables = ", ".join(f"{name} {count}" for name, count in result["tables"].items())
+        print(
+            f"Загружено {result['rows']} строк ({tables}) за {result['seconds']:.1f} с "
+            f"({result['rows_per_second']:.0f} строк/с)",
+            file=sys.stderr,
+        )
@@ -0,0 +1,309 @@
+from fastapi import Request, Response
+from invalidation import on_invalidate
+from async_routes import run_blocking
+from collections import OrderedDict, defaultdict
+from threading import Lock
+from typing import Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+import gzip
+import os
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+"""Кэш готовых (и заранее сжатых) тел ответов GET-маршрутов.
+
+Контент читается на порядки чаще, чем меняется, поэтому читающие
+маршруты не загружают и не сериализуют строки на каждый запрос: тело
+собирается один раз на версию, сжимается один раз на кодировку, а
+повторный запрос отдает готовые байты из памяти.
+
+Запись адресуется ключом маршрута с параметрами запроса
+(`("topics", skip, limit, ...)`, `("course", 1)`) и версией содержимого —
+ETag ответа, который уже вычисляется из агрегатов `max(updated_at)`/
+`count`: если версия не совпала, запись пересобирается. Поэтому кэш
+согласован и между воркерами (агрегаты сами кэшируются до смены
+поколения данных, см. `invalidation.py`). Сверх этого:
+
+- TTL на маршрут: запись живет не дольше `ttl_for(key)` секунд
+  (`RESPONSE_CACHE_TTL` по умолчанию, переопределения по пространству
+  ключа в `RESPONSE_CACHE_ROUTE_TTL="course=3600,topics=60"`);
+- теги: запись помечается сущностями, из которых собрана
+  (`"topics"`, `("course", 1)`), и коммит, изменивший сущность, сразу
+  удаляет все записи с ее тегами (`invalidation.track_writes`);
+- объем ограничен `RESPONSE_CACHE_MB`, вытесняются давно не
+  использованные записи;
+- счетчики попаданий, промахов, вытеснений, истечений и сбросов по
+  пространствам ключей отдает GET /api/cache/stats.
+
+Кодировка выбирается по `Accept-Encoding` с учетом q-значений:
+br (если установлен пакет brotli), затем gzip, иначе тело без сжатия.
+"""
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9
+# Меньшие тела не сжимаются: выигрыш меньше заголовков и затрат на распаковку
+MIN_COMPRESS_SIZE = 1024
+RESPONSE_CACHE_BYTES = int(float(os.getenv("RESPONSE_CACHE_MB", "64")) * 1024 * 1024)
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+
+def _route_ttls(value: str) -> Dict[str, float]:
+    ttls = {}
+    for part in value.split(","):
+        name, _, seconds = part.partition("=")
+        if name.strip() and seconds.strip():
+            ttls[name.strip()] = float(seconds)
+    return ttls
+
+# Дерево курса собирается дороже всего и меняется реже всего
+ROUTE_TTL: Dict[str, float] = {"course": 3600, **_route_ttls(os.getenv("RESPONSE_CACHE_ROUTE_TTL", ""))}
+
+def namespace(key: Hashable) -> str:
+    """Пространство ключа: имя маршрута для кортежей вида ("topics", ...)"""
+    return str(key[0]) if isinstance(key, tuple) and key else str(key)
+
+def ttl_for(key: Hashable) -> float:
+    return ROUTE_TTL.get(namespace(key), RESPONSE_CACHE_TTL)
+
+IDENTITY = "identity"
+COMPRESSORS: Dict[str, Callable[[bytes], bytes]] = {
+    "gzip": lambda body: gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0),
+}
+if brotli is not None:
+    COMPRESSORS["br"] = lambda body: brotli.compress(body, quality=BROTLI_QUALITY)
+# Порядок предпочтения при равных q
+PREFERENCE = ("br", "gzip")
+
+def negotiate(accept_encoding: Optional[str]) -> str:
+    """Лучшая поддерживаемая кодировка из заголовка Accept-Encoding"""
+    if not accept_encoding:
+        return IDENTITY
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+    best, best_weight = IDENTITY, 0.0
+    for encoding in PREFERENCE:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if encoding in COMPRESSORS and weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+class CompressedEntry:
+    __slots__ = ("version", "bodies", "size", "headers", "tags", "expires")
+
+    def __init__(self, version: str, body: bytes, headers: Dict[str, str], tags: frozenset, expires: float):
+        self.version = version
+        self.bodies = {IDENTITY: body}
+        self.size = len(body)
+        self.headers = headers
+        self.tags = tags
+        self.expires = expires
+
+    def encoded(self, encoding: str) -> Optional[Tuple[str, bytes]]:
+        if self.size < MIN_COMPRESS_SIZE:
+            encoding = IDENTITY
+        body = self.bodies.get(encoding)
+        return None if body is None else (encoding, body)
+
+class CacheStats:
+    """Счетчики одного пространства ключей"""
+    __slots__ = ("hits", "misses", "evictions", "expirations", "invalidations")
+
+    def __init__(self):
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+class CompressedCache:
+    """LRU-кэш тел ответов по ключу маршрута: версия, заголовки, теги и тела во всех запрошенных кодировках"""
+
+    def __init__(self, max_bytes: int = RESPONSE_CACHE_BYTES, clock: Callable[[], float] = time.monotonic):
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.lock = Lock()
+        self.entries: "OrderedDict[Hashable, CompressedEntry]" = OrderedDict()
+        self.tagged: Dict[Hashable, Set[Hashable]] = defaultdict(set)
+        self.counters: Dict[str, CacheStats] = defaultdict(CacheStats)
+        self.size = 0
+
+    def _entry(self, key: Hashable, version: str) -> Optional[CompressedEntry]:
+        """Живая запись нужной версии; истекшая удаляется"""
+        entry = self.entries.get(key)
+        if entry is not None and entry.expires <= self.clock():
+            self._remove(key)
+            self.counters[namespace(key)].expirations += 1
+            return None
+        return entry if entry is not None and entry.version == version else None
+
+    def get(self, key: Hashable, version: str, encoding: str) -> Optional[Tuple[str, bytes, Dict[str, str]]]:
+        """(кодировка, тело, заголовки) нужной версии, если тело в этой кодировке уже есть"""
+        with self.lock:
+            entry = self._entry(key, version)
+            encoded = entry.encoded(encoding) if entry is not None else None
+            if encoded is None:
+                return None
+            self.entries.move_to_end(key)
+            self.counters[namespace(key)].hits += 1
+            return (*encoded, entry.headers)
+
+    def body(self, key: Hashable, version: str) -> Optional[Tuple[bytes, Dict[str, str]]]:
+        """Несжатое тело версии и его заголовки: из него досжимается новая кодировка без обращения к БД.
+
+        Вызывается после промаха `get`, поэтому отсутствие тела считается промахом.
+        """
+        with self.lock:
+            entry = self._entry(key, version)
+            counters = self.counters[namespace(key)]
+            if entry is None:
+                counters.misses += 1
+                return None
+            counters.hits += 1
+            return entry.bodies[IDENTITY], entry.headers
+
+    def put(
+        self,
+        key: Hashable,
+        version: str,
+        body: bytes,
+        encoding: str,
+        headers: Optional[Dict[str, str]] = None,
+        tags: Iterable[Hashable] = (),
+        ttl: Optional[float] = None,
+    ) -> Tuple[str, bytes]:
+        """Сохранить тело версии и вернуть (кодировка, тело), сжимая при необходимости.
+
+        Сжатие выполняется вне блокировки: параллельные промахи по одному
+        ключу в худшем случае сожмут тело дважды.
+        """
+        if len(body) < MIN_COMPRESS_SIZE:
+            encoding = IDENTITY
+        encoded = body if encoding == IDENTITY else COMPRESSORS[encoding](body)
+        with self.lock:
+            entry = self._entry(key, version)
+            if entry is None:
+                self._remove(key)
+                expires = self.clock() + (ttl_for(key) if ttl is None else ttl)
+                entry = self.entries[key] = CompressedEntry(version, body, dict(headers or {}), frozenset(tags), expires)
+                self.size += entry.size
+                for tag in entry.tags:
+                    self.tagged[tag].add(key)
+            if encoding not in entry.bodies:
+                entry.bodies[encoding] = encoded
+                entry.size += len(encoded)
+                self.size += len(encoded)
+            self.entries.move_to_end(key)
+            while self.size > self.max_bytes and len(self.entries) > 1:
+                evicted = next(iter(self.entries))
+                self._remove(evicted)
+                self.counters[namespace(evicted)].evictions += 1
+        return encoding, encoded
+
+    def invalidate(self, key: Hashable) -> None:
+        with self.lock:
+            if self._remove(key):
+                self.counters[namespace(key)].invalidations += 1
+
+    def invalidate_tags(self, tags: Iterable[Hashable]) -> int:
+        """Удалить записи, помеченные любым из тегов; возвращает число удаленных"""
+        removed = 0
+        with self.lock:
+            for tag in tags:
+                for key in list(self.tagged.get(tag, ())):
+                    if self._remove(key):
+                        self.counters[namespace(key)].invalidations += 1
+                        removed += 1
+        return removed
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.tagged.clear()
+            self.counters.clear()
+            self.size = 0
+
+    def stats(self) -> dict:
+        """Счетчики и занятый объем по пространствам ключей"""
+        with self.lock:
+            routes = {
+                name: {**{field: getattr(counters, field) for field in CacheStats.__slots__}, "entries": 0, "bytes": 0}
+                for name, counters in self.counters.items()
+            }
+            for key, entry in self.entries.items():
+                route = routes.setdefault(namespace(key), {**dict.fromkeys(CacheStats.__slots__, 0), "entries": 0, "bytes": 0})
+                route["entries"] += 1
+                route["bytes"] += entry.size
+            for name, route in routes.items():
+                route["ttl"] = ROUTE_TTL.get(name, RESPONSE_CACHE_TTL)
+                lookups = route["hits"] + route["misses"]
+                route["hit_ratio"] = round(route["hits"] / lookups, 4) if lookups else None
+            totals = {field: sum(route[field] for route in routes.values()) for field in (*CacheStats.__slots__, "entries", "bytes")}
+            lookups = totals["hits"] + totals["misses"]
+            totals["hit_ratio"] = round(totals["hits"] / lookups, 4) if lookups else None
+            return {"max_bytes": self.max_bytes, "default_ttl": RESPONSE_CACHE_TTL, "total": totals, "routes": routes}
+
+    def _remove(self, key: Hashable) -> bool:
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return False
+        self.size -= entry.size
+        for tag in entry.tags:
+            keys = self.tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tagged[tag]
+        return True
+
+RESPONSE_CACHE = CompressedCache()
+# Коммит, изменивший сущности, сразу сбрасывает собранные из них ответы
+on_invalidate(RESPONSE_CACHE.invalidate_tags)
+
+def _response(encoded: Tuple[str, bytes], headers: Optional[Dict[str, str]], media_type: str) -> Response:
+    encoding, body = encoded
+    response_headers = {**(headers or {}), "Vary": "Accept-Encoding"}
+    if encoding != IDENTITY:
+        response_headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=media_type, headers=response_headers)
+
+def cached_response(
+    request: Request,
+    key: Hashable,
+    version: str,
+    load: Callable[[], Optional[bytes]],
+    headers: Optional[Dict[str, str]] = None,
+    media_type: str = "application/json",
+    tags: Optional[Set[Hashable]] = None,
+    ttl: Optional[float] = None,
+    cache: CompressedCache = RESPONSE_CACHE,
+) -> Optional[Response]:
+    """Ответ из кэша тел; `load` вызывается только при промахе.
+
+    `headers` и `tags` сохраняются вместе с телом и читаются после
+    `load`, поэтому загрузка может их дополнить (курсор следующей
+    страницы, теги вложенных сущностей). Возвращает None, если `load`
+    не нашел тело (например, сущность удалена).
+    """
+    headers = {} if headers is None else headers
+    tags = set() if tags is None else tags
+    encoding = negotiate(request.headers.get("accept-encoding"))
+    cached = cache.get(key, version, encoding)
+    if cached is not None:
+        return _response(cached[:2], cached[2], media_type)
+    stored = cache.body(key, version)
+    if stored is not None:
+        payload, headers = stored
+    else:
+        payload = load()
+    if payload is None:
+        return None
+    # В асинхронном стеке сжатие уходит в threadpool, не блокируя цикл событий
+    encoded = run_blocking(cache.put, key, version, payload, encoding, headers, tags, ttl)
+    return _response(encoded, headers, media_type)
@@ -1,6 +1,8 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from query_stats import instrument_engine
+from invalidation import watch_database
 import os
 
 """Конфигурация подключения к SQLite.
@@ -12,17 +14,100 @@ import os
 
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
 DB_FILE_PATH = os.path.join(PROJECT_ROOT, "vibe_coding.db")
-DATABASE_URL = f"sqlite:///{DB_FILE_PATH}"
+DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{DB_FILE_PATH}")
+ASYNC_DATABASE_URL = DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
 
-engine = create_engine(
-    DATABASE_URL, 
-    connect_args={"check_same_thread": False}  # Нужно для SQLite
-)
+# Асинхронный стек (AsyncEngine + aiosqlite) включается переменной окружения
+USE_ASYNC_DB = os.getenv("USE_ASYNC_DB", "0").lower() in ("1", "true", "yes")
+
+# Профиль подключения: "default" (как раньше) или "production"
+# (WAL, настроенные PRAGMA, явный размер пула и pre-ping)
+DB_PROFILE = os.getenv("DB_PROFILE", "default")
+
+def _env_int(name, default):
+    return int(os.getenv(name, default))
+
+def production_pragmas():
+    """PRAGMA профиля production, каждую можно переопределить переменной окружения"""
+    return {
+        "journal_mode": os.getenv("DB_JOURNAL_MODE", "WAL"),
+        "synchronous": os.getenv("DB_SYNCHRONOUS", "NORMAL"),
+        "mmap_size": _env_int("DB_MMAP_SIZE", 256 * 1024 * 1024),
+        "cache_size": _env_int("DB_CACHE_SIZE", -64 * 1024),  # отрицательное значение - в КиБ
+        "temp_store": os.getenv("DB_TEMP_STORE", "MEMORY"),
+        "busy_timeout": _env_int("DB_BUSY_TIMEOUT_MS", 5000),
+    }
+
+def production_pool_options():
+    """Пул по размеру threadpool Starlette (40 потоков) с ограниченным overflow.
+
+    Соединение удерживается сессией до конца обработки запроса, включая
+    сериализацию ответа, которой тоже нужен поток. Если одновременных
+    запросов больше, чем соединений, под нагрузкой потоки ждут соединений,
+    а соединения - потоков, и запросы падают по pool_timeout. Поэтому
+    пул рассчитан на предел конкурентности сервера: run_backend.sh
+    запускает uvicorn с `--limit-concurrency` = DB_POOL_SIZE +
+    DB_MAX_OVERFLOW (64), и лишние запросы сразу получают 503, а не
+    открывают соединения без ограничения. Меняя одно, меняйте и другое.
+    """
+    return {
+        "pool_size": _env_int("DB_POOL_SIZE", 40),
+        "max_overflow": _env_int("DB_MAX_OVERFLOW", 24),
+        "pool_timeout": _env_int("DB_POOL_TIMEOUT", 30),
+        "pool_pre_ping": True,
+    }
+
+def apply_pragmas(target_engine, pragmas):
+    """Выполнять PRAGMA на каждом новом соединении пула"""
+    @event.listens_for(target_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def create_db_engine(url=DATABASE_URL, profile=DB_PROFILE):
+    """Создать синхронный движок с выбранным профилем"""
+    if profile == "production":
+        db_engine = create_engine(
+            url,
+            connect_args={"check_same_thread": False},  # Нужно для SQLite
+            **production_pool_options(),
+        )
+        apply_pragmas(db_engine, production_pragmas())
+        return db_engine
+    return create_engine(
+        url, 
+        connect_args={"check_same_thread": False}  # Нужно для SQLite
+    )
+
+engine = create_db_engine()
+instrument_engine(engine)
+watch_database(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+def _events_url(url):
+    """Файл базы событий рядом с основной: vibe_coding.db -> vibe_coding_events.db"""
+    if url.startswith("sqlite:///") and not url.endswith(":memory:"):
+        root, extension = os.path.splitext(url)
+        return f"{root}_events{extension or '.db'}"
+    return url
+
+# События учащихся (открытия подсказок, reveals.py) пишутся в отдельный файл
+# SQLite: частые коммиты в основную базу меняли бы PRAGMA data_version и
+# сбрасывали кэши всех воркеров (invalidation.py). WAL и synchronous=NORMAL
+# включены всегда: в эту базу только дописывают пачками из фонового потока
+EVENTS_DATABASE_URL = os.getenv("EVENTS_DATABASE_URL", _events_url(DATABASE_URL))
+events_engine = create_engine(EVENTS_DATABASE_URL, connect_args={"check_same_thread": False})
+apply_pragmas(events_engine, {"journal_mode": "WAL", "synchronous": "NORMAL", "busy_timeout": 5000})
+instrument_engine(events_engine)
+EventsSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=events_engine)
+
+EventsBase = declarative_base()
+
 # Функция для получения сессии базы данных
 def get_db():
     db = SessionLocal()
@@ -30,3 +115,32 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Асинхронный движок создается лениво: aiosqlite нужен только при USE_ASYNC_DB
+_async_engine = None
+_AsyncSessionLocal = None
+
+def get_async_engine():
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+        if DB_PROFILE == "production":
+            # Для aiosqlite по умолчанию используется NullPool, пул задаем явно
+            from sqlalchemy.pool import AsyncAdaptedQueuePool
+            _async_engine = create_async_engine(
+                ASYNC_DATABASE_URL, poolclass=AsyncAdaptedQueuePool, **production_pool_options()
+            )
+            apply_pragmas(_async_engine.sync_engine, production_pragmas())
+        else:
+            _async_engine = create_async_engine(ASYNC_DATABASE_URL)
+        instrument_engine(_async_engine.sync_engine)
+        _AsyncSessionLocal = async_sessionmaker(
+            bind=_async_engine, autoflush=False, expire_on_commit=False
+        )
+    return _async_engine
+
+# Асинхронный аналог get_db
+async def get_async_db():
+    get_async_engine()
+    async with _AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,139 @@
+from fastapi import Request, Response
+from sqlalchemy import select, func, literal, union_all
+from sqlalchemy.orm import Session
+from pagination import paginate
+from models import Assignment, Hint
+from loaders import batch_assignment_ids, load_hints_batch
+from invalidation import DATA_VERSION, DataVersion
+from threading import Lock
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+import hashlib
+import os
+
+"""Условные GET-запросы (ETag / If-None-Match).
+
+ETag ответа вычисляется из агрегатов `max(updated_at)` и `count(*)` по
+всем сущностям, попадающим в ответ. Все агрегаты собираются одним
+запросом, без загрузки и сериализации самих строк, поэтому
+перепроверка актуальности заметно дешевле полной выборки.
+
+Результаты агрегатов запоминаются в процессе до смены поколения данных
+(`invalidation.py`): пока ни один воркер ничего не записал, повторная
+проверка ETag не обращается к базе.
+"""
+
+State = Tuple[Optional[object], int]
+
+STATES_CACHE_SIZE = int(os.getenv("STATES_CACHE_SIZE", "10000"))
+
+class StatesCache:
+    """Агрегаты по ключу запроса, действительные в пределах одного поколения данных"""
+
+    def __init__(self, version: DataVersion = DATA_VERSION, max_entries: int = STATES_CACHE_SIZE):
+        self.version = version
+        self.max_entries = max_entries
+        self.lock = Lock()
+        self.generation = -1
+        self.entries: Dict[Hashable, List[State]] = {}
+
+    def get(self, key: Hashable, generation: int) -> Optional[List[State]]:
+        with self.lock:
+            return self.entries.get(key) if generation == self.generation else None
+
+    def put(self, key: Hashable, generation: int, states: List[State]) -> None:
+        with self.lock:
+            if generation < self.generation:
+                return
+            if generation > self.generation or len(self.entries) >= self.max_entries:
+                self.generation = generation
+                self.entries = {}
+            self.entries[key] = states
+
+STATES_CACHE = StatesCache()
+
+def statement_key(statement) -> Optional[Hashable]:
+    """Ключ запроса: структура (ключ кэша компиляции SQLAlchemy) и значения параметров"""
+    cache_key = statement._generate_cache_key()
+    if cache_key is None:
+        return None
+    values = tuple(
+        tuple(value) if isinstance(value, list) else value
+        for value in (bindparam.effective_value for bindparam in cache_key.bindparams)
+    )
+    key = (cache_key.key, values)
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+def entity_state(model, *criteria):
+    """Агрегат (max(updated_at), count) по строкам модели, подходящим под условия"""
+    return select(func.max(model.updated_at), func.count(model.id)).where(*criteria)
+
+def page_state(model, skip: int, limit: int, after_id: Optional[int] = None):
+    """Агрегат по странице списка (offset или keyset)"""
+    page = paginate(select(model.id, model.updated_at), model, skip, limit, after_id).subquery()
+    return select(func.max(page.c.updated_at), func.count(page.c.id))
+
+def fetch_states(db: Session, *states, cache: StatesCache = STATES_CACHE) -> List[State]:
+    """Выполнить все агрегаты одним запросом, сохранив их порядок"""
+    parts = [
+        state.add_columns(literal(position).label("position"))
+        for position, state in enumerate(states)
+    ]
+    statement = union_all(*parts)
+    # Поколение берется до запроса: коммит во время выборки сделает результат устаревшим
+    generation = cache.version.current()
+    key = statement_key(statement)
+    cached = cache.get(key, generation) if key is not None else None
+    if cached is not None:
+        return cached
+    rows = db.execute(statement).all()
+    rows = sorted(rows, key=lambda row: row[2])
+    result = [(row[0], row[1]) for row in rows]
+    if key is not None:
+        cache.put(key, generation, result)
+    return result
+
+def make_etag(*parts) -> str:
+    """Сильный ETag из произвольных частей ключа"""
+    digest = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """Проверить заголовок If-None-Match"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    return etag in [tag[2:] if tag.startswith("W/") else tag for tag in candidates]
+
+def conditional(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """Вернуть 304, если клиент уже имеет актуальную версию, иначе выставить ETag"""
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return None
+
+def hints_batch_etag(db: Session, assignment_ids: Iterable[int], up_to: Optional[int] = None) -> str:
+    """ETag пакета подсказок по агрегатам, без загрузки строк.
+
+    Один запрос `fetch_states`: число найденных заданий и max(updated_at)/count
+    подсказок `WHERE assignment_id IN (...)`. Если заданий найдено меньше,
+    строки читаются ради 404 со списком отсутствующих.
+    """
+    ids = batch_assignment_ids(assignment_ids)
+    criteria = [Hint.assignment_id.in_(ids)]
+    if up_to is not None:
+        criteria.append(Hint.order_index <= up_to)
+    states = fetch_states(
+        db,
+        entity_state(Assignment, Assignment.id.in_(ids)),
+        entity_state(Hint, *criteria),
+    )
+    if states[0][1] != len(ids):
+        load_hints_batch(db, ids, up_to)
+    return make_etag("hints-batch", ids, up_to, states[1:])
@@ -0,0 +1,216 @@
+from sqlalchemy import DateTime, func, insert, select, text
+from database import engine
+from models import Base, Course, Topic, Assignment, Hint
+from search import search_ddl, rebuild_search_index
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List
+import argparse
+import itertools
+import random
+import time
+
+"""Генератор синтетических данных для нагрузочных прогонов и проверок.
+
+Строит N курсов × M тем × K заданий × H подсказок с текстами
+реалистичного объема и вставляет их пакетами Core `insert()` в одной
+транзакции, без ORM-объектов. id назначаются заранее (после текущего
+максимума в таблице), поэтому внешние ключи известны без RETURNING и
+вставка сводится к executemany. Результат полностью определяется `seed`.
+
+Триггеры поискового индекса на время загрузки снимаются: построчная
+индексация миллиона строк медленнее, чем одно перестроение индекса в
+конце (его можно пропустить флагом `--skip-search-index`, тогда индекс
+перестраивается позже командой `python search.py`). DDL в SQLite
+выполняется вне транзакции драйвера, поэтому если загрузка упадет,
+данные откатятся, а триггеры восстановит следующий `create_all` при
+запуске приложения.
+
+Запуск из каталога backend:
+    python generate_data.py --courses 20 --topics 25 --assignments 20 --hints 5
+"""
+
+BATCH_SIZE = 10_000
+BASE_TIME = datetime(2025, 1, 1)
+WORDS = (
+    "приложение компонент запрос ответ сервер клиент данные модель схема маршрут "
+    "состояние хук эффект контекст шаблон тест ошибка исключение валидация миграция "
+    "индекс таблица транзакция сессия кэш очередь поток процесс память производительность "
+    "интерфейс пользователь форма кнопка страница стиль анимация адаптивность доступность "
+    "FastAPI React SQLAlchemy Pydantic Docker Python JavaScript TypeScript API REST JSON "
+    "создайте проверьте настройте используйте добавьте разделите вынесите оптимизируйте "
+    "документацию конфигурацию зависимости окружение деплой мониторинг логирование"
+).split()
+DIFFICULTIES = {
+    "courses": ["beginner", "intermediate", "advanced"],
+    "assignments": ["easy", "medium", "hard"],
+}
+PENALTIES = [5, 10, 10, 15]
+POOL_SIZE = 4096
+# Порядок значений в кортежах строк для каждой таблицы
+COLUMNS = {
+    "courses": ["id", "title", "description", "duration_hours", "difficulty_level", "created_at", "updated_at"],
+    "topics": [
+        "id", "title", "description", "content", "order_index", "duration_minutes", "course_id",
+        "created_at", "updated_at",
+    ],
+    "assignments": [
+        "id", "title", "description", "instructions", "difficulty_level", "estimated_hours", "is_required",
+        "topic_id", "created_at", "updated_at",
+    ],
+    "hints": ["id", "assignment_id", "order_index", "text", "penalty", "created_at", "updated_at"],
+}
+
+class TextPool:
+    """Тексты заданной длины из заранее сгенерированных предложений.
+
+    Для каждого диапазона длины один раз строится набор из POOL_SIZE
+    текстов, дальше строки выбирают из него: генерация текста на каждую
+    из миллиона строк заметно дороже самой вставки.
+    """
+
+    def __init__(self, rng: random.Random, sentences: int = 2000):
+        self.rng = rng
+        self.sentences = []
+        for _ in range(sentences):
+            words = rng.choices(WORDS, k=rng.randint(6, 14))
+            self.sentences.append(" ".join(words).capitalize() + ".")
+        self.average = sum(len(sentence) for sentence in self.sentences) / len(self.sentences)
+        self.pools = {}
+
+    def title(self) -> str:
+        return " ".join(self.rng.choices(WORDS, k=self.rng.randint(2, 5))).capitalize()
+
+    def build(self, low: int, high: int) -> str:
+        count = max(1, round(self.rng.randint(low, high) / self.average))
+        return " ".join(self.rng.choices(self.sentences, k=count))
+
+    def text(self, low: int, high: int) -> str:
+        pool = self.pools.get((low, high))
+        if pool is None:
+            pool = self.pools[(low, high)] = [self.build(low, high) for _ in range(POOL_SIZE)]
+        return self.rng.choice(pool)
+
+def next_id(connection, model) -> int:
+    return (connection.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+def insert_batches(connection, model, columns: List[str], rows: Iterator[tuple], batch_size: int = BATCH_SIZE) -> int:
+    """Вставить кортежи значений пакетами executemany; возвращает число строк.
+
+    Statement строится Core `insert()` один раз, а пакеты уходят прямо в
+    драйвер: обработка параметров SQLAlchemy по каждой строке занимала
+    больше времени, чем сама вставка. Значения должны быть уже в виде,
+    пригодном для драйвера (см. `timestamps`).
+    """
+    statement = str(insert(model.__table__).compile(dialect=connection.dialect, column_keys=columns))
+    total = 0
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            return total
+        connection.exec_driver_sql(statement, batch)
+        total += len(batch)
+
+def timestamps(connection, count: int) -> List:
+    """`count` меток времени с шагом в минуту, уже преобразованных для драйвера"""
+    process = DateTime().bind_processor(connection.dialect) or (lambda value: value)
+    return [process(BASE_TIME + timedelta(minutes=n)) for n in range(count)]
+
+def drop_search_triggers(connection) -> None:
+    for (name,) in connection.execute(text(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE '%_search_%'"
+    )).all():
+        connection.execute(text(f"DROP TRIGGER {name}"))
+
+def generate_data(
+    connection,
+    courses: int,
+    topics: int,
+    assignments: int,
+    hints: int,
+    seed: int = 0,
+    search_index: bool = True,
+) -> Dict[str, int]:
+    """Сгенерировать данные в рамках переданного соединения (транзакцию ведет вызывающий).
+
+    `topics`, `assignments` и `hints` задаются на одного родителя.
+    Возвращает число вставленных строк по таблицам.
+    """
+    rng = random.Random(seed)
+    pool = TextPool(rng)
+    course_start = next_id(connection, Course)
+    topic_start = next_id(connection, Topic)
+    assignment_start = next_id(connection, Assignment)
+    hint_start = next_id(connection, Hint)
+    # Все строки курса созданы в одну минуту: меток столько же, сколько курсов
+    created = timestamps(connection, courses)
+    per_course = {"topics": topics, "assignments": topics * assignments, "hints": topics * assignments * hints}
+
+    def course_rows():
+        for n in range(courses):
+            yield (
+                course_start + n, pool.title(), pool.text(300, 1200), rng.randint(10, 80),
+                rng.choice(DIFFICULTIES["courses"]), created[n], created[n],
+            )
+
+    def topic_rows():
+        for n in range(courses * topics):
+            at = created[n // per_course["topics"]]
+            yield (
+                topic_start + n, pool.title(), pool.text(60, 200), pool.text(1000, 4000), n % topics + 1,
+                rng.choice([30, 45, 60, 90, 120]), course_start + n // topics, at, at,
+            )
+
+    def assignment_rows():
+        for n in range(courses * topics * assignments):
+            at = created[n // per_course["assignments"]]
+            yield (
+                assignment_start + n, pool.title(), pool.text(60, 200), pool.text(300, 1500),
+                rng.choice(DIFFICULTIES["assignments"]), rng.randint(1, 12), rng.random() < 0.7,
+                topic_start + n // assignments, at, at,
+            )
+
+    def hint_rows():
+        for n in range(courses * topics * assignments * hints):
+            at = created[n // per_course["hints"]]
+            yield (
+                hint_start + n, assignment_start + n // hints, n % hints, pool.text(60, 240),
+                rng.choice(PENALTIES), at, at,
+            )
+
+    drop_search_triggers(connection)
+    counts = {
+        "courses": insert_batches(connection, Course, COLUMNS["courses"], course_rows()),
+        "topics": insert_batches(connection, Topic, COLUMNS["topics"], topic_rows()),
+        "assignments": insert_batches(connection, Assignment, COLUMNS["assignments"], assignment_rows()),
+        "hints": insert_batches(connection, Hint, COLUMNS["hints"], hint_rows()),
+    }
+    for statement in search_ddl():
+        connection.execute(text(statement))
+    if search_index:
+        rebuild_search_index(connection)
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--courses", type=int, default=10)
+    parser.add_argument("--topics", type=int, default=10, help="тем на курс")
+    parser.add_argument("--assignments", type=int, default=10, help="заданий на тему")
+    parser.add_argument("--hints", type=int, default=5, help="подсказок на задание")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-search-index", action="store_true")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    started = time.perf_counter()
+    with engine.begin() as connection:
+        counts = generate_data(
+            connection, args.courses, args.topics, args.assignments, args.hints,
+            seed=args.seed, search_index=not args.skip_search_index,
+        )
+    elapsed = time.perf_counter() - started
+    total = sum(counts.values())
+    details = ", ".join(f"{table}: {count}" for table, count in counts.items())
+    print(f"Сгенерировано {total} строк за {elapsed:.1f} с ({total / elapsed:.0f} строк/с): {details}")
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,12 @@
 from sqlalchemy.orm import Session
-from database import SessionLocal, engine
-from models import Base, Course, Topic, Assignment, Hint
-
-# Создаем все таблицы
-Base.metadata.create_all(bind=engine)
+from database import SessionLocal
+from models import Course, Topic, Assignment, Hint
+from bulk import insert_rows
+from startup import prepare_schema
 
 def init_data():
+    # Создаем таблицы (или сверяем ревизию при SCHEMA_MODE=alembic)
+    prepare_schema()
     db = SessionLocal()
     
     try:
@@ -32,9 +33,9 @@ def init_data():
             duration_hours=40,
             difficulty_level="intermediate"
         )
+        # Все данные создаются в одной транзакции пакетными INSERT
         db.add(course)
-        db.commit()
-        db.refresh(course)
+        db.flush()
         
         # Создаем темы курса
         topics_data = [
@@ -133,17 +134,7 @@ def init_data():
             }
         ]
         
-        for topic_data in topics_data:
-            topic = Topic(
-                course_id=course.id,
-                **topic_data
-            )
-            db.add(topic)
-        
-        db.commit()
-        
-        # Получаем созданные темы для создания заданий
-        topics = db.query(Topic).filter(Topic.course_id == course.id).all()
+        topics = insert_rows(db, Topic, [{"course_id": course.id, **topic_data} for topic_data in topics_data])
         
         # Создаем задания для каждой темы
         assignments_data = [
@@ -289,14 +280,9 @@ def init_data():
             }
         ]
         
-        for assignment_data in assignments_data:
-            assignment = Assignment(**assignment_data)
-            db.add(assignment)
-        
-        db.commit()
+        all_assignments = insert_rows(db, Assignment, assignments_data)
 
         # Создаем подсказки для всех заданий
-        all_assignments = db.query(Assignment).all()
         
         # Словарь с подсказками для каждого задания
         hints_by_title = {
@@ -350,17 +336,12 @@ def init_data():
             ],
         }
         
-        for assignment in all_assignments:
-            if assignment.title in hints_by_title:
-                hints_data = hints_by_title[assignment.title]
-                for hint_data in hints_data:
-                    hint = Hint(
-                        assignment_id=assignment.id,
-                        order_index=hint_data["order_index"],
-                        text=hint_data["text"],
-                        penalty=hint_data["penalty"]
-                    )
-                    db.add(hint)
+        hints = [
+            {"assignment_id": assignment.id, **hint_data}
+            for assignment in all_assignments
+            for hint_data in hints_by_title.get(assignment.title, [])
+        ]
+        insert_rows(db, Hint, hints)
         
         db.commit()
         print("Тестовые данные успешно созданы!")
@@ -0,0 +1,180 @@
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from threading import Lock, Thread
+from typing import Callable, Hashable, Iterable, List, Optional, Set
+import os
+import sqlite3
+import time
+
+"""Согласованность кэшей между воркерами.
+
+Кэши процесса (агрегаты ETag в `etags.py`, сжатые тела в `compression.py`)
+привязаны к поколению данных: любое изменение базы увеличивает
+поколение, и записи прошлых поколений больше не используются.
+
+Поколение меняется двумя путями:
+
+- коммит сессии этого процесса — сразу, событием `after_commit`
+  (воркер всегда видит свои записи);
+- коммит другого процесса (другой воркер uvicorn, `generate_data.py`,
+  миграция) — по `PRAGMA data_version`: SQLite меняет это значение,
+  когда базу изменило любое другое соединение. Значение опрашивает
+  фоновый поток каждого процесса раз в `CACHE_POLL_MS` миллисекунд на
+  отдельном соединении, поэтому чтения к базе не обращаются вовсе, а
+  чужая запись становится видна не позже чем через этот интервал.
+
+Опрос вынесен из пути запроса намеренно: в асинхронном режиме ожидание
+блокировки SQLite в потоке цикла событий останавливает и писателей.
+
+Кроме поколения коммит сессии точечно сбрасывает записи кэша ответов
+по тегам измененных сущностей (`track_writes`): flush собирает теги
+новых, измененных и удаленных объектов (с прежним родителем при
+переносе), `after_commit` передает их слушателям `on_invalidate`,
+откат их отбрасывает. Так инвалидацию получают все POST/PUT/DELETE
+обработчики, включая будущие, без вызовов в каждом из них.
+"""
+
+CACHE_POLL_SECONDS = float(os.getenv("CACHE_POLL_MS", "50")) / 1000
+# Ключ session.info с тегами изменений незафиксированной транзакции
+CACHE_TAGS = "cache_tags"
+
+class DataVersion:
+    """Поколение данных процесса"""
+
+    def __init__(self, poll_interval: float = CACHE_POLL_SECONDS):
+        self.poll_interval = poll_interval
+        self.generation = 0
+        self.path: Optional[str] = None
+        self.lock = Lock()
+        self._pid: Optional[int] = None
+
+    def watch(self, path: Optional[str]) -> None:
+        """Следить за изменениями файла базы из других процессов"""
+        with self.lock:
+            self.path = path if path and path != ":memory:" else None
+            self._pid = None
+
+    def bump(self) -> None:
+        with self.lock:
+            self.generation += 1
+
+    def on_commit(self, session) -> None:
+        self.bump()
+
+    def current(self) -> int:
+        """Текущее поколение; при первом обращении в процессе запускает опрос"""
+        if self._pid != os.getpid() and self.path is not None:
+            self._start()
+        return self.generation
+
+    def _start(self) -> None:
+        with self.lock:
+            # После fork поток родителя не наследуется: у каждого воркера свой
+            if self._pid == os.getpid() or self.path is None:
+                return
+            self._pid = os.getpid()
+            Thread(target=self._poll, args=(self.path, self._pid), name="data-version", daemon=True).start()
+
+    def _poll(self, path: str, pid: int) -> None:
+        connection = None
+        data_version = None
+        while self.path == path and self._pid == pid:
+            try:
+                if connection is None:
+                    connection = sqlite3.connect(path)
+                (current,), = connection.execute("PRAGMA data_version").fetchall()
+            except sqlite3.Error:
+                if connection is not None:
+                    connection.close()
+                connection = None
+                current = None
+            # Первое значение тоже увеличивает поколение: чтения до него могли
+            # застать данные, которые другой процесс успел изменить
+            if current is None or current != data_version:
+                data_version = current
+                self.bump()
+            time.sleep(self.poll_interval)
+        if connection is not None:
+            connection.close()
+
+DATA_VERSION = DataVersion()
+
+def watch_database(target_engine, version: DataVersion = DATA_VERSION) -> None:
+    """Увеличивать поколение после каждого коммита сессии и следить за файлом базы.
+
+    Событие вызывается уже после фиксации транзакции: чтение, начатое до
+    коммита, сохранит свой результат под старым поколением и не переживет
+    увеличение. Коммиты вне сессий (`engine.begin()`) замечает data_version.
+    """
+    if not event.contains(Session, "after_commit", version.on_commit):
+        event.listen(Session, "after_commit", version.on_commit)
+    watch_writes()
+    if target_engine.url.get_backend_name() == "sqlite":
+        version.watch(target_engine.url.database)
+
+# Тег-список модели и атрибут со ссылкой на родителя, чей тег тоже сбрасывается
+TAGGED_MODELS = {
+    "Course": ("courses", "course", None),
+    "Topic": ("topics", "topic", ("course_id", "course")),
+    "Assignment": ("assignments", "assignment", ("topic_id", "topic")),
+    "Hint": ("hints", "hint", ("assignment_id", "assignment")),
+}
+
+_listeners: List[Callable[[Set[Hashable]], object]] = []
+
+def on_invalidate(listener: Callable[[Set[Hashable]], object]) -> None:
+    """Вызывать `listener(tags)` после каждого коммита, изменившего контент"""
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+def entity_tags(instance) -> Set[Hashable]:
+    """Теги объекта: список его таблицы, он сам и родитель (текущий и прежний)"""
+    tagged = TAGGED_MODELS.get(type(instance).__name__)
+    if tagged is None:
+        return set()
+    collection, name, parent = tagged
+    state = inspect(instance)
+    tags = {collection}
+    if state.identity is not None:
+        tags.add((name, state.identity[0]))
+    elif getattr(instance, "id", None) is not None:
+        tags.add((name, instance.id))
+    if parent is not None:
+        column, parent_name = parent
+        history = state.attrs[column].history
+        for parent_id in (*history.sum(), state.dict.get(column)):
+            if parent_id is not None:
+                tags.add((parent_name, parent_id))
+    return tags
+
+def track_writes(session: Session, instances: Iterable) -> None:
+    """Отметить объекты измененными в транзакции сессии.
+
+    Вызывается из `after_flush` для объектов unit of work; пакетные
+    `INSERT ... RETURNING` (`bulk.py`) передают возвращенные строки сами.
+    """
+    tags = session.info.setdefault(CACHE_TAGS, set())
+    for instance in instances:
+        tags.update(entity_tags(instance))
+
+def _after_flush(session: Session, flush_context) -> None:
+    track_writes(session, [*session.new, *session.dirty, *session.deleted])
+
+def invalidate(tags: Set[Hashable]) -> None:
+    """Передать теги слушателям; для записей в обход сессии (`catalog.py`)"""
+    for listener in _listeners:
+        listener(tags)
+
+def _after_commit(session: Session) -> None:
+    tags = session.info.pop(CACHE_TAGS, None)
+    if tags:
+        invalidate(tags)
+
+def _after_rollback(session: Session, previous_transaction) -> None:
+    session.info.pop(CACHE_TAGS, None)
+
+def watch_writes() -> None:
+    """Подписать все сессии на сбор тегов изменений"""
+    for name, listener in (("after_flush", _after_flush), ("after_commit", _after_commit), ("after_soft_rollback", _after_rollback)):
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
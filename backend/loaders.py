@@ -0,0 +1,74 @@
+from typing import Iterable, List, Optional
+from fastapi import HTTPException
+from sqlalchemy import and_, inspect, select
+from sqlalchemy.orm import Session, selectinload, undefer_group
+from models import Course, Topic, Assignment, Hint, HEAVY_TEXT
+from schemas import AssignmentHints
+
+"""Стратегии загрузки дерева курса.
+
+Сериализация `CourseWithTopics` и `TopicWithAssignments` обходит связи
+`Course.topics` и `Topic.assignments`. При ленивой загрузке это один
+SELECT на каждую тему, поэтому связи подгружаются заранее через
+`selectinload`: один запрос на уровень дерева, независимо от его размера.
+
+Длинные тексты (`Topic.content`, `Assignment.instructions`) отложены на
+уровне моделей, поэтому выборки для полных ответов добавляют `with_text()`,
+а `refresh` после записи перечитывает `column_names(model)`.
+"""
+
+MAX_BATCH_ASSIGNMENTS = 500
+
+def with_text():
+    """Загрузить отложенные длинные тексты тем же запросом, что и строку"""
+    return undefer_group(HEAVY_TEXT)
+
+def column_names(model) -> List[str]:
+    """Все колонки модели, включая отложенные (для `refresh` перед полным ответом)"""
+    return [attribute.key for attribute in inspect(model).column_attrs]
+
+def course_tree_options():
+    """Курс -> темы -> задания: 3 запроса на всё дерево"""
+    return selectinload(Course.topics).options(with_text(), topic_tree_options())
+
+def topic_tree_options():
+    """Тема -> задания: 2 запроса независимо от числа тем"""
+    return selectinload(Topic.assignments).options(with_text())
+
+def batch_assignment_ids(assignment_ids: Iterable[int]) -> List[int]:
+    """Id заданий пакета без повторов (400 для пустого или слишком большого)"""
+    ids = list(dict.fromkeys(assignment_ids))
+    if not ids:
+        raise HTTPException(status_code=400, detail="Не указаны задания")
+    if len(ids) > MAX_BATCH_ASSIGNMENTS:
+        raise HTTPException(status_code=400, detail=f"Не больше {MAX_BATCH_ASSIGNMENTS} заданий за запрос")
+    return ids
+
+def load_hints_batch(db: Session, assignment_ids: Iterable[int], up_to: Optional[int] = None) -> List[AssignmentHints]:
+    """Подсказки нескольких заданий одним запросом, сгруппированные по заданию.
+    
+    Запрос идет от заданий к подсказкам через LEFT OUTER JOIN: задание без
+    подсказок дает строку с NULL, а несуществующее не дает ни одной, поэтому
+    отдельная проверка существования заданий не нужна. С `up_to` возвращаются
+    только подсказки с order_index <= up_to.
+    """
+    ids = batch_assignment_ids(assignment_ids)
+    join_on = Hint.assignment_id == Assignment.id
+    if up_to is not None:
+        join_on = and_(join_on, Hint.order_index <= up_to)
+    rows = db.execute(
+        select(Assignment.id, Hint)
+        .outerjoin(Hint, join_on)
+        .where(Assignment.id.in_(ids))
+        .order_by(Assignment.id, Hint.order_index, Hint.id)
+    ).all()
+    
+    grouped = {}
+    for assignment_id, hint in rows:
+        hints = grouped.setdefault(assignment_id, [])
+        if hint is not None:
+            hints.append(hint)
+    missing = [assignment_id for assignment_id in ids if assignment_id not in grouped]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Задания не найдены: {missing}")
+    return [AssignmentHints(assignment_id=assignment_id, hints=grouped[assignment_id]) for assignment_id in ids]
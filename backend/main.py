@@ -1,12 +1,24 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from database import engine, Base
-from routers import courses, topics, assignments, hints
+from database import USE_ASYNC_DB
+from metrics import MetricsMiddleware, REGISTRY, CONTENT_TYPE
+from query_stats import QueryStatsMiddleware, QUERY_COUNT_HEADER, DB_TIME_HEADER
+from compression import RESPONSE_CACHE
+from startup import lifespan
 
-# Создаем таблицы в базе данных
-Base.metadata.create_all(bind=engine)
+from async_routes import async_router
+from routers import courses, topics, assignments, hints, search, query, catalog, reveals, leaderboard
 
-app = FastAPI(title="Vibe Coding Course", version="1.0.0")
+if USE_ASYNC_DB:
+    # Выгрузка каталога потоково читает асинхронный движок, а не сессию
+    from routers import async_catalog as catalog
+
+def routes(module):
+    """Роутер модуля; при USE_ASYNC_DB — его асинхронная версия (async_routes.py)"""
+    return async_router(module.router) if USE_ASYNC_DB else module.router
+
+# Схема готовится (и при STARTUP_PREWARM=1 прогреваются кэши) при старте, а не при импорте
+app = FastAPI(title="Vibe Coding Course", version="1.0.0", lifespan=lifespan)
 
 # Настройка CORS для работы с React
 app.add_middleware(
@@ -15,13 +27,23 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", QUERY_COUNT_HEADER, DB_TIME_HEADER],
 )
+# Число запросов к БД и время БД на каждый запрос (заголовки при SQL_DEBUG=1)
+app.add_middleware(QueryStatsMiddleware)
+# Метрики запросов для /api/metrics; самый внешний слой, учитывает и CORS
+app.add_middleware(MetricsMiddleware)
 
 # Подключение роутеров
-app.include_router(courses.router, prefix="/api/courses", tags=["courses"])
-app.include_router(topics.router, prefix="/api/topics", tags=["topics"])
-app.include_router(assignments.router, prefix="/api/assignments", tags=["assignments"])
-app.include_router(hints.router, prefix="/api/hints", tags=["hints"])
+app.include_router(routes(courses), prefix="/api/courses", tags=["courses"])
+app.include_router(routes(topics), prefix="/api/topics", tags=["topics"])
+app.include_router(routes(assignments), prefix="/api/assignments", tags=["assignments"])
+app.include_router(routes(hints), prefix="/api/hints", tags=["hints"])
+app.include_router(routes(search), prefix="/api/search", tags=["search"])
+app.include_router(routes(query), prefix="/api/query", tags=["query"])
+app.include_router(routes(catalog), prefix="/api/catalog", tags=["catalog"])
+app.include_router(routes(reveals), prefix="/api/reveals", tags=["reveals"])
+app.include_router(routes(leaderboard), prefix="/api/leaderboard", tags=["leaderboard"])
 
 @app.get("/")
 async def root():
@@ -30,3 +52,13 @@ async def root():
 @app.get("/api/health")
 async def health_check():
     return {"status": "ok", "message": "Vibe Coding API is running"}
+
+@app.get("/api/metrics")
+async def metrics():
+    """Метрики запросов в формате Prometheus"""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Счетчики кэша ответов этого процесса по маршрутам"""
+    return RESPONSE_CACHE.stats()
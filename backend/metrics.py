@@ -0,0 +1,145 @@
+from bisect import bisect_left
+from threading import Lock
+from typing import Dict, List, Tuple
+import time
+
+"""Метрики HTTP-запросов в формате Prometheus.
+
+`MetricsMiddleware` — чистый ASGI middleware (без BaseHTTPMiddleware,
+который буферизует ответ и ломает потоковую выдачу). Для каждого
+запроса он замеряет время до отправки последнего байта тела и размер
+тела, а после обработки берет шаблон маршрута из `scope["route"]`
+(его выставляет FastAPI при сопоставлении), поэтому число рядов
+ограничено числом маршрутов, а не числом разных URL. Запросы, не
+совпавшие ни с одним маршрутом, попадают в один ряд `<unmatched>`.
+
+Агрегаты хранятся в `Metrics` под одной блокировкой: критическая секция
+сводится к нескольким сложениям, а запись безопасна из любого потока
+(обработчики sync-роутов выполняются в threadpool, TestClient гоняет
+приложение в отдельном потоке). Отдаются через GET /api/metrics.
+"""
+
+# Границы бакетов, как у клиентских библиотек Prometheus по умолчанию
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+UNMATCHED_ROUTE = "<unmatched>"
+# charset Starlette добавит сам
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+class Histogram:
+    """Счетчики по бакетам (не накопительные), сумма и число наблюдений"""
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+class Metrics:
+    """Потокобезопасный реестр метрик HTTP"""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.in_flight = 0
+        self.latency: Dict[Tuple[str, str, str], Histogram] = {}
+        self.size: Dict[Tuple[str, str, str], Histogram] = {}
+
+    def started(self) -> None:
+        with self.lock:
+            self.in_flight += 1
+
+    def finished(self, method: str, route: str, status: int, seconds: float, size: int) -> None:
+        key = (method, route, str(status))
+        latency_bucket = bisect_left(LATENCY_BUCKETS, seconds)
+        size_bucket = bisect_left(SIZE_BUCKETS, size)
+        with self.lock:
+            self.in_flight -= 1
+            latency = self.latency.get(key)
+            if latency is None:
+                latency = self.latency[key] = Histogram(LATENCY_BUCKETS)
+                self.size[key] = Histogram(SIZE_BUCKETS)
+            size_histogram = self.size[key]
+            latency.counts[latency_bucket] += 1
+            latency.sum += seconds
+            latency.count += 1
+            size_histogram.counts[size_bucket] += 1
+            size_histogram.sum += size
+            size_histogram.count += 1
+
+    def render(self) -> str:
+        """Текстовый формат экспозиции Prometheus 0.0.4"""
+        with self.lock:
+            in_flight = self.in_flight
+            latency = {key: _copy(histogram) for key, histogram in self.latency.items()}
+            size = {key: _copy(histogram) for key, histogram in self.size.items()}
+        lines = [
+            "# HELP http_requests_in_flight Запросы, обрабатываемые в данный момент",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {in_flight}",
+        ]
+        lines += _render_histogram(
+            "http_request_duration_seconds", "Время обработки запроса до последнего байта ответа",
+            LATENCY_BUCKETS, latency,
+        )
+        lines += _render_histogram("http_response_size_bytes", "Размер тела ответа", SIZE_BUCKETS, size)
+        return "\n".join(lines) + "\n"
+
+def _copy(histogram: Histogram) -> Tuple[List[int], float, int]:
+    return list(histogram.counts), histogram.sum, histogram.count
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _render_histogram(name: str, help_text: str, buckets: Tuple[float, ...], series: Dict) -> List[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for (method, route, status), (counts, total, count) in sorted(series.items()):
+        labels = f'method="{method}",route="{_escape(route)}",status="{status}"'
+        cumulative = 0
+        for bound, bucket_count in zip(buckets, counts):
+            cumulative += bucket_count
+            lines.append(f'{name}_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {count}')
+        lines.append(f"{name}_sum{{{labels}}} {total:g}")
+        lines.append(f"{name}_count{{{labels}}} {count}")
+    return lines
+
+REGISTRY = Metrics()
+
+class MetricsMiddleware:
+    """ASGI middleware, записывающий метрики каждого HTTP-запроса в реестр"""
+
+    def __init__(self, app, registry: Metrics = REGISTRY):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        self.registry.started()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.registry.finished(scope["method"], route_label(scope, status), status, time.perf_counter() - started, size)
+
+def route_label(scope, status: int) -> str:
+    """Шаблон маршрута FastAPI; служебные маршруты Starlette (/docs) по пути, прочее — без пути"""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if status != 404 and "endpoint" in scope:
+        return scope["path"]
+    return UNMATCHED_ROUTE
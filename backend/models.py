@@ -1,8 +1,13 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean
-from sqlalchemy.orm import relationship
-from database import Base
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, LargeBinary, Index, event
+from sqlalchemy.orm import relationship, deferred
+from database import Base, EventsBase
+from search import create_search_index
 from datetime import datetime
 
+# Группа отложенных колонок: длинные тексты не нужны спискам и служебным выборкам,
+# полные ответы подгружают их через loaders.with_text()
+HEAVY_TEXT = "heavy_text"
+
 class Course(Base):
     __tablename__ = "courses"
     
@@ -23,7 +28,7 @@ class Topic(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(200), nullable=False)
     description = Column(Text, nullable=False)
-    content = Column(Text, nullable=False)
+    content = deferred(Column(Text, nullable=False), group=HEAVY_TEXT)
     order_index = Column(Integer, default=0)
     duration_minutes = Column(Integer, default=0)
     course_id = Column(Integer, ForeignKey("courses.id"), nullable=False)
@@ -33,6 +38,11 @@ class Topic(Base):
     # Связи
     course = relationship("Course", back_populates="topics")
     assignments = relationship("Assignment", back_populates="topic", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        # Темы курса выбираются по course_id с сортировкой по order_index
+        Index("ix_topics_course_order", "course_id", "order_index"),
+    )
 
 class Assignment(Base):
     __tablename__ = "assignments"
@@ -40,7 +50,7 @@ class Assignment(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(200), nullable=False)
     description = Column(Text, nullable=False)
-    instructions = Column(Text, nullable=False)
+    instructions = deferred(Column(Text, nullable=False), group=HEAVY_TEXT)
     difficulty_level = Column(String(50), default="easy")
     estimated_hours = Column(Integer, default=1)
     is_required = Column(Boolean, default=True)
@@ -51,6 +61,11 @@ class Assignment(Base):
     # Связи
     topic = relationship("Topic", back_populates="assignments")
     hints = relationship("Hint", back_populates="assignment", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        # Покрывает выборку по topic_id и агрегат max(updated_at) для ETag
+        Index("ix_assignments_topic_updated", "topic_id", "updated_at"),
+    )
 
 class Hint(Base):
     __tablename__ = "hints"
@@ -64,3 +79,79 @@ class Hint(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     assignment = relationship("Assignment", back_populates="hints")
+    
+    __table_args__ = (
+        # Естественный ключ подсказки, используется для upsert
+        Index("ix_hints_assignment_order", "assignment_id", "order_index", unique=True),
+    )
+
+class CourseSnapshot(Base):
+    """Материализованное дерево курса: готовый JSON ответа GET /api/courses/{id}"""
+    __tablename__ = "course_snapshots"
+    
+    course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"), primary_key=True)
+    version = Column(Integer, nullable=False, default=1)
+    payload = Column(LargeBinary, nullable=False)
+    # ETag данных курса, по которым построен снимок (snapshots.course_states)
+    source_etag = Column(String(42))
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class HintReveal(EventsBase):
+    """Открытие подсказки учащимся; пишется журналом reveals.py в базу событий.
+
+    База событий отдельная, поэтому внешнего ключа на hints нет: задание и
+    штраф копируются из подсказки в момент открытия.
+    """
+    __tablename__ = "hint_reveals"
+    
+    id = Column(Integer, primary_key=True)
+    learner_id = Column(String(100), nullable=False)
+    hint_id = Column(Integer, nullable=False)
+    assignment_id = Column(Integer, nullable=False)
+    penalty = Column(Integer, nullable=False)
+    revealed_at = Column(DateTime, nullable=False)
+    
+    __table_args__ = (
+        # Подсказка открывается учащимся один раз: повторы и повторная загрузка журнала игнорируются
+        Index("ix_hint_reveals_learner_hint", "learner_id", "hint_id", unique=True),
+        Index("ix_hint_reveals_learner_assignment", "learner_id", "assignment_id"),
+    )
+
+# Агрегаты открытий (scores.py) обновляются в транзакции записи событий.
+# assignment_id = 0 — итог по всем заданиям
+class LearnerScore(EventsBase):
+    """Итоги учащегося по заданию: открыто подсказок, сумма штрафов, баллы"""
+    __tablename__ = "learner_scores"
+    
+    learner_id = Column(String(100), primary_key=True)
+    assignment_id = Column(Integer, primary_key=True)
+    hints_used = Column(Integer, nullable=False, default=0)
+    penalty_sum = Column(Integer, nullable=False, default=0)
+    score = Column(Integer, nullable=False, default=0)
+    assignments = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False)
+    
+    __table_args__ = (
+        # Порядок рейтинга: меньше штрафов — выше
+        Index("ix_learner_scores_rank", "assignment_id", "penalty_sum", "hints_used", "learner_id"),
+    )
+
+class PenaltyHistogram(EventsBase):
+    """Число учащихся с данной суммой штрафов: место = 1 + учащиеся с меньшей суммой"""
+    __tablename__ = "penalty_histogram"
+    
+    assignment_id = Column(Integer, primary_key=True)
+    penalty_sum = Column(Integer, primary_key=True)
+    learners = Column(Integer, nullable=False)
+
+class AssignmentTotals(EventsBase):
+    """Итоги задания по всем учащимся"""
+    __tablename__ = "assignment_totals"
+    
+    assignment_id = Column(Integer, primary_key=True)
+    learners = Column(Integer, nullable=False, default=0)
+    hints_used = Column(Integer, nullable=False, default=0)
+    penalty_sum = Column(Integer, nullable=False, default=0)
+
+# Поисковый индекс FTS5 и его триггеры создаются вместе с таблицами
+event.listen(Base.metadata, "after_create", create_search_index)
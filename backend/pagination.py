@@ -0,0 +1,115 @@
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_session
+from sqlalchemy.orm import Session
+from serialization import dump_json
+from loaders import with_text
+from projection import Fields, projected_schema, select_fields
+from typing import MutableMapping, Optional
+import base64
+import json
+
+"""Пагинация списков.
+
+Помимо `skip`/`limit` списки поддерживают keyset-пагинацию по `id`:
+непрозрачный курсор кодирует последний отданный `id`, следующая
+страница выбирается условием `id > :last_id` по индексу первичного
+ключа, поэтому глубокие страницы не медленнее первой. Курсор следующей
+страницы отдается в заголовке `X-Next-Cursor`.
+
+Режим `?stream=ndjson` отдает всю таблицу построчно через серверный
+курсор (`yield_per`), не материализуя ее в памяти; `?fields=` в нем
+тоже применяется.
+"""
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+STREAM_BATCH_SIZE = 1000
+
+def encode_cursor(last_id: int) -> str:
+    """Закодировать позицию в непрозрачный курсор"""
+    raw = json.dumps({"id": last_id}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    """Раскодировать курсор в последний отданный id"""
+    if cursor is None:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        last_id = json.loads(base64.urlsafe_b64decode(padded))["id"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+    if not isinstance(last_id, int):
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+    return last_id
+
+def paginate(query, model, skip: int, limit: int, after_id: Optional[int] = None):
+    """Применить к Query/Select keyset-условие или offset и ограничение страницы"""
+    query = query.order_by(model.id)
+    if after_id is not None:
+        query = query.filter(model.id > after_id)
+    else:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+def set_next_cursor(headers: MutableMapping[str, str], items: list, limit: int) -> None:
+    """Выставить курсор следующей страницы, если текущая заполнена целиком.
+    
+    `headers` — заголовки ответа или словарь, сохраняемый в кэше ответов.
+    """
+    if items and len(items) == limit:
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(items[-1].id)
+
+def _stream_statement(model, after_id: Optional[int], fields: Optional[Fields]):
+    statement = (
+        (select_fields(model, fields) if fields else select(model).options(with_text()))
+        .order_by(model.id)
+        .execution_options(yield_per=STREAM_BATCH_SIZE, stream_results=True)
+    )
+    if after_id is not None:
+        statement = statement.where(model.id > after_id)
+    return statement
+
+def ndjson_response(db: Session, model, schema, after_id: Optional[int] = None, fields: Optional[Fields] = None) -> StreamingResponse:
+    """Потоковая выгрузка строк модели в формате NDJSON.
+
+    Строки читаются уже после возврата обработчика, поэтому сессию,
+    стоящую за AsyncSession (`async_routes.py`), читает ее AsyncSession.
+    """
+    proxy = async_session(db)
+    if proxy is not None:
+        return async_ndjson_response(proxy, model, schema, after_id, fields)
+    statement = _stream_statement(model, after_id, fields)
+    if fields:
+        schema = projected_schema(schema, fields)
+    
+    def lines():
+        chunk = []
+        for row in db.scalars(statement):
+            chunk.append(dump_json(schema, row))
+            if len(chunk) >= STREAM_BATCH_SIZE:
+                yield b"\n".join(chunk) + b"\n"
+                chunk = []
+        if chunk:
+            yield b"\n".join(chunk) + b"\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+def async_ndjson_response(db, model, schema, after_id: Optional[int] = None, fields: Optional[Fields] = None) -> StreamingResponse:
+    """То же, что ndjson_response, для AsyncSession"""
+    statement = _stream_statement(model, after_id, fields)
+    if fields:
+        schema = projected_schema(schema, fields)
+    
+    async def lines():
+        chunk = []
+        async for row in await db.stream_scalars(statement):
+            chunk.append(dump_json(schema, row))
+            if len(chunk) >= STREAM_BATCH_SIZE:
+                yield b"\n".join(chunk) + b"\n"
+                chunk = []
+        if chunk:
+            yield b"\n".join(chunk) + b"\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
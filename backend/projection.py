@@ -0,0 +1,61 @@
+from fastapi import HTTPException
+from pydantic import ConfigDict, create_model
+from sqlalchemy import inspect, select
+from sqlalchemy.orm import load_only, selectinload
+from loaders import with_text
+from serialization import dump_json
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+"""Разреженные наборы полей (`?fields=`).
+
+Спискам обычно нужны заголовки и метаданные, а не длинные тексты.
+Параметр `fields=title,order_index` превращается в SELECT только этих
+колонок (`load_only`; `id` выбирается всегда), а ответ сериализуется
+схемой, построенной из исходной: в нее попадают только запрошенные поля
+с теми же типами. Схемы кэшируются по набору полей.
+
+Поля-связи (`assignments` у `TopicWithAssignments`) подгружаются
+отдельным запросом через `selectinload` и отдаются целиком.
+"""
+
+Fields = Tuple[str, ...]
+
+def parse_fields(fields: Optional[str], schema) -> Optional[Fields]:
+    """Разобрать `?fields=` в кортеж полей схемы в порядке их объявления"""
+    if fields is None:
+        return None
+    names = {name.strip() for name in fields.split(",") if name.strip()}
+    if not names:
+        raise HTTPException(status_code=400, detail="Не указаны поля")
+    unknown = sorted(names - set(schema.model_fields))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Неизвестные поля: {', '.join(unknown)}")
+    names.add("id")
+    return tuple(name for name in schema.model_fields if name in names)
+
+@lru_cache(maxsize=None)
+def projected_schema(schema, fields: Fields):
+    """Схема с подмножеством полей исходной"""
+    definitions = {name: (schema.model_fields[name].annotation, schema.model_fields[name]) for name in fields}
+    return create_model(
+        f"{schema.__name__}Fields",
+        __config__=ConfigDict(from_attributes=True),
+        **definitions,
+    )
+
+def select_fields(model, fields: Fields):
+    """SELECT модели только с запрошенными колонками (и связями)"""
+    relationships = inspect(model).relationships
+    columns = [getattr(model, name) for name in fields if name not in relationships]
+    options = [
+        selectinload(getattr(model, name)).options(with_text())
+        for name in fields if name in relationships
+    ]
+    return select(model).options(load_only(*columns), *options)
+
+def projected_json(schema, fields: Optional[Fields], items: list) -> bytes:
+    """JSON списка в проекции (или целиком по схеме, если поля не заданы)"""
+    if fields:
+        schema = projected_schema(schema, fields)
+    return dump_json(List[schema], items)
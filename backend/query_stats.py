@@ -0,0 +1,144 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from threading import Lock
+from typing import Iterator, List, Optional
+import logging
+import os
+import time
+
+"""Учет SQL-запросов через события курсора SQLAlchemy.
+
+Движки из database.py подключаются `instrument_engine`: на каждый
+запрос к БД замеряется время выполнения. Дальше наблюдение попадает:
+
+- в статистику текущего HTTP-запроса (`QueryStatsMiddleware`): число
+  запросов и суммарное время БД; при `SQL_DEBUG=1` они отдаются
+  заголовками `X-DB-Query-Count` и `X-DB-Time-Ms`;
+- в лог `sql.slow`, если запрос дольше `SLOW_QUERY_MS` (вместе с
+  параметрами);
+- во все активные `query_budget` — помощник для проверок, что
+  endpoint укладывается в заданное число запросов.
+
+Статистика запроса хранится в ContextVar: контекст копируется и в
+threadpool sync-роутов, и в greenlet асинхронного стека, а сам объект
+статистики общий, поэтому запросы из обработчика видны middleware.
+"""
+
+SQL_DEBUG = os.getenv("SQL_DEBUG", "0").lower() in ("1", "true", "yes")
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+QUERY_COUNT_HEADER = "X-DB-Query-Count"
+DB_TIME_HEADER = "X-DB-Time-Ms"
+# Длинные параметры (executemany) в логе обрезаются
+MAX_LOGGED_PARAMETERS = 1000
+
+logger = logging.getLogger("sql.slow")
+
+class QueryStats:
+    """Число запросов и суммарное время БД; `statements` заполняется только для бюджетов"""
+
+    def __init__(self, keep_statements: bool = False):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: Optional[List[str]] = [] if keep_statements else None
+
+    def add(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        if self.statements is not None:
+            self.statements.append(" ".join(statement.split()))
+
+_request_stats: ContextVar[Optional[QueryStats]] = ContextVar("request_query_stats", default=None)
+# Бюджеты видны запросам из всех потоков (threadpool, поток TestClient), поэтому под блокировкой
+_budgets: List[QueryStats] = []
+_budgets_lock = Lock()
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Начало хранится в контексте выполнения: упавший запрос не оставляет его на соединении
+    context._query_start = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_start
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.add(statement, elapsed)
+    with _budgets_lock:
+        for budget in _budgets:
+            budget.add(statement, elapsed)
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        logged = repr(parameters)
+        if len(logged) > MAX_LOGGED_PARAMETERS:
+            logged = logged[:MAX_LOGGED_PARAMETERS] + "..."
+        logger.warning("Медленный запрос %.1f мс: %s; параметры: %s", elapsed * 1000, " ".join(statement.split()), logged)
+
+def instrument_engine(target_engine) -> None:
+    """Подключить учет запросов к синхронному движку (для async — к `sync_engine`)"""
+    event.listen(target_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(target_engine, "after_cursor_execute", _after_cursor_execute)
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Собирать статистику запросов текущего контекста (HTTP-запроса)"""
+    stats = QueryStats()
+    token = _request_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _request_stats.reset(token)
+
+@contextmanager
+def query_budget(max_queries: Optional[int] = None, max_ms: Optional[float] = None) -> Iterator[QueryStats]:
+    """Проверить, что код внутри блока укладывается в бюджет запросов к БД.
+
+    Учитываются все запросы инструментированных движков из любого потока,
+    поэтому помощник рассчитан на последовательные проверки:
+
+        with query_budget(3):
+            client.get("/api/courses/1")
+
+    При превышении бросается QueryBudgetExceeded со списком запросов.
+    Без ограничений просто возвращает собранную статистику.
+    """
+    budget = QueryStats(keep_statements=True)
+    with _budgets_lock:
+        _budgets.append(budget)
+    try:
+        yield budget
+    finally:
+        with _budgets_lock:
+            _budgets.remove(budget)
+    if max_queries is not None and budget.count > max_queries:
+        statements = "\n  ".join(budget.statements)
+        raise QueryBudgetExceeded(f"{budget.count} запросов при бюджете {max_queries}:\n  {statements}")
+    if max_ms is not None and budget.seconds * 1000 > max_ms:
+        raise QueryBudgetExceeded(f"Время БД {budget.seconds * 1000:.1f} мс при бюджете {max_ms} мс")
+
+class QueryStatsMiddleware:
+    """ASGI middleware: статистика запросов к БД на каждый HTTP-запрос.
+
+    В режиме SQL_DEBUG добавляет заголовки с числом запросов и временем БД,
+    накопленными к моменту отправки заголовков ответа.
+    """
+
+    def __init__(self, app, debug: bool = SQL_DEBUG):
+        self.app = app
+        self.debug = debug
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start" and self.debug:
+                    headers = list(message.get("headers", []))
+                    headers.append((QUERY_COUNT_HEADER.lower().encode(), str(stats.count).encode()))
+                    headers.append((DB_TIME_HEADER.lower().encode(), f"{stats.seconds * 1000:.2f}".encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
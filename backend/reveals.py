@@ -0,0 +1,338 @@
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from database import EventsBase, EventsSessionLocal, events_engine
+from models import HintReveal
+from scores import apply_reveals, ensure_scores
+from datetime import datetime
+from threading import Event, Lock, Thread
+from typing import BinaryIO, Callable, Iterator, List, Optional
+import contextlib
+import fcntl
+import json
+import logging
+import os
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+"""Учет открытых подсказок: журнал с отложенной записью в базу.
+
+POST /api/reveals/ не ждет записи в SQLite. Событие дописывается строкой
+в сегмент журнала (`write` в кэш страниц ОС, без fsync) и ставится в
+очередь в памяти. Фоновый поток раз в `REVEAL_FLUSH_MS` или при
+накоплении `REVEAL_BATCH_SIZE` событий забирает очередь, закрывает
+текущий сегмент (новые события идут в следующий) и записывает пачку
+одной транзакцией `INSERT ... ON CONFLICT DO NOTHING` в базу событий.
+После коммита закрытые сегменты удаляются, при ошибке события
+возвращаются в очередь и записываются следующей попыткой.
+
+Сегменты лежат в `REVEAL_LOG_DIR`, активный сегмент процесс держит под
+`flock`. При старте процесс дописывает в базу все сегменты, которые не
+заблокированы живым процессом, то есть остались от упавшего. Поэтому:
+
+- падение процесса (kill -9) не теряет принятых событий: их строки уже
+  у ОС. Оборванная последняя строка сегмента пропускается;
+- повторная запись не создает дубликатов: пара (learner_id, hint_id)
+  уникальна, первое открытие остается;
+- падение ОС или питания может потерять события последних
+  `REVEAL_FLUSH_MS`, еще не записанные в базу: сегменты не синхронизируются
+  на диск, иначе каждый запрос ждал бы fsync.
+
+Очередь ограничена `REVEAL_QUEUE_LIMIT` событиями; при переполнении (база
+долго недоступна) запрос получает 503, а не растит память процесса.
+"""
+
+REVEAL_FLUSH_SECONDS = float(os.getenv("REVEAL_FLUSH_MS", "200")) / 1000
+REVEAL_BATCH_SIZE = int(os.getenv("REVEAL_BATCH_SIZE", "1000"))
+REVEAL_QUEUE_LIMIT = int(os.getenv("REVEAL_QUEUE_LIMIT", "100000"))
+# Повторы транзакции записи, если база событий занята дольше busy_timeout
+WRITE_ATTEMPTS = 3
+
+def _default_log_dir() -> Optional[str]:
+    database = events_engine.url.database
+    if not database or database == ":memory:":
+        return None
+    return os.path.splitext(os.path.abspath(database))[0] + "_reveals"
+
+REVEAL_LOG_DIR = os.getenv("REVEAL_LOG_DIR") or _default_log_dir()
+SEGMENT_SUFFIX = ".ndjson"
+
+logger = logging.getLogger("uvicorn.error")
+
+class RevealQueueFull(RuntimeError):
+    """Очередь записи переполнена"""
+
+def _encode(event: dict) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(event) + b"\n"
+    return json.dumps(event, ensure_ascii=False, default=datetime.isoformat).encode("utf-8") + b"\n"
+
+def _decode(line: bytes) -> dict:
+    event = orjson.loads(line) if orjson is not None else json.loads(line)
+    if isinstance(event["revealed_at"], str):
+        event["revealed_at"] = datetime.fromisoformat(event["revealed_at"])
+    return event
+
+def write_events(engine: Engine, events: List[dict]) -> None:
+    """Записать пачку событий и обновить итоги одной транзакцией; уже записанные пропускаются"""
+    table = HintReveal.__table__
+    statement = (
+        sqlite_insert(table)
+        .on_conflict_do_nothing(index_elements=["learner_id", "hint_id"])
+        .returning(table.c.learner_id, table.c.assignment_id, table.c.penalty)
+    )
+    for attempt in range(1, WRITE_ATTEMPTS + 1):
+        try:
+            with _write_transaction(engine) as connection:
+                apply_reveals(connection, connection.execute(statement, events).all())
+            return
+        except OperationalError as error:
+            if not _is_locked(error) or attempt == WRITE_ATTEMPTS:
+                raise
+            logger.warning("База событий занята, повтор записи %d из %d", attempt + 1, WRITE_ATTEMPTS)
+            time.sleep(0.05 * attempt)
+
+@contextlib.contextmanager
+def _write_transaction(engine: Engine) -> Iterator[Connection]:
+    with engine.begin() as connection:
+        # Итоги читаются и переписываются: блокировка записи берется сразу.
+        # Иначе переход от чтения к записи в WAL при записи другого воркера
+        # сразу дает SQLITE_BUSY, не дожидаясь busy_timeout
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+        yield connection
+
+def _is_locked(error: OperationalError) -> bool:
+    return "database is locked" in str(error.orig)
+
+def read_segment(source: BinaryIO) -> Iterator[dict]:
+    """События сегмента; строка, оборванная падением процесса, пропускается"""
+    for line in source:
+        if not line.endswith(b"\n"):
+            logger.warning("Журнал открытий: пропущена неполная строка %r", line[:100])
+            continue
+        try:
+            yield _decode(line)
+        except (ValueError, KeyError):
+            logger.warning("Журнал открытий: пропущена некорректная строка %r", line[:100])
+
+class RevealLog:
+    """Очередь событий процесса, сегменты журнала и фоновая запись"""
+
+    def __init__(
+        self,
+        engine: Engine = events_engine,
+        directory: Optional[str] = REVEAL_LOG_DIR,
+        flush_interval: float = REVEAL_FLUSH_SECONDS,
+        batch_size: int = REVEAL_BATCH_SIZE,
+        queue_limit: int = REVEAL_QUEUE_LIMIT,
+    ):
+        self.engine = engine
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.queue_limit = queue_limit
+        self.queue: List[dict] = []
+        # Закрытые сегменты, события которых еще не записаны в базу
+        self.closed: List[str] = []
+        self.segment: Optional[BinaryIO] = None
+        self.lock = Lock()
+        self.flush_lock = Lock()
+        self.wakeup = Event()
+        self.stopping = Event()
+        self.thread: Optional[Thread] = None
+        self._pid: Optional[int] = None
+
+    def start(self) -> None:
+        """Создать схему, дописать сегменты упавших процессов и запустить запись.
+
+        Вызывается при старте приложения; иначе — при первом событии процесса
+        (после fork у каждого воркера свои очередь, сегмент и поток).
+        """
+        with self.lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self.queue, self.closed, self.segment = [], [], None
+            self.stopping.clear()
+            EventsBase.metadata.create_all(bind=self.engine)
+            with _write_transaction(self.engine) as connection:
+                rebuilt = ensure_scores(connection)
+            if rebuilt:
+                logger.info("Итоги открытий построены по %d событиям", rebuilt)
+            if self.directory is not None:
+                os.makedirs(self.directory, exist_ok=True)
+                self.recover()
+                self.segment = self._open_segment()
+            self.thread = Thread(target=self._run, name="reveal-log", daemon=True)
+            self.thread.start()
+
+    def stop(self) -> None:
+        """Остановить поток и записать остаток очереди (при остановке приложения)"""
+        if self._pid != os.getpid():
+            return
+        self.stopping.set()
+        self.wakeup.set()
+        self.thread.join()
+        self.flush()
+        with self.lock:
+            # Все события в базе: активный сегмент больше не нужен
+            if self.segment is not None:
+                self.segment.close()
+                self._remove(self.segment.name)
+                self.segment = None
+            self._pid = None
+
+    def append(self, event: dict) -> None:
+        """Принять событие: строка в журнал (без fsync) и в очередь"""
+        if self._pid != os.getpid():
+            self.start()
+        line = _encode(event)
+        with self.lock:
+            if len(self.queue) >= self.queue_limit:
+                raise RevealQueueFull(f"В очереди уже {len(self.queue)} событий")
+            if self.segment is not None:
+                self.segment.write(line)
+                self.segment.flush()
+            self.queue.append(event)
+            full = len(self.queue) >= self.batch_size
+        if full:
+            self.wakeup.set()
+
+    def flush(self) -> int:
+        """Записать очередь в базу; возвращает число записанных событий"""
+        if self._pid != os.getpid():
+            return 0
+        with self.flush_lock:
+            with self.lock:
+                if not self.queue:
+                    return 0
+                # Новый сегмент открывается до смены очереди: при ошибке ничего не теряется
+                segment = self._open_segment() if self.segment is not None else None
+                events, self.queue = self.queue, []
+                segments, self.closed = self.closed, []
+                if self.segment is not None:
+                    self.segment.close()
+                    segments.append(self.segment.name)
+                self.segment = segment
+            try:
+                write_events(self.engine, events)
+            except Exception:
+                with self.lock:
+                    self.queue[:0] = events
+                    self.closed[:0] = segments
+                raise
+            for path in segments:
+                self._remove(path)
+            return len(events)
+
+    def pending(self) -> int:
+        return len(self.queue)
+
+    def recover(self) -> int:
+        """Дописать в базу сегменты, не заблокированные живым процессом"""
+        recovered = 0
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(SEGMENT_SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                source = open(path, "rb")
+            except FileNotFoundError:
+                continue
+            with source:
+                try:
+                    fcntl.flock(source, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    # Активный сегмент работающего процесса
+                    continue
+                batch = []
+                for event in read_segment(source):
+                    batch.append(event)
+                    if len(batch) >= self.batch_size:
+                        write_events(self.engine, batch)
+                        recovered += len(batch)
+                        batch = []
+                if batch:
+                    write_events(self.engine, batch)
+                    recovered += len(batch)
+            self._remove(path)
+        if recovered:
+            logger.info("Журнал открытий: восстановлено %d событий", recovered)
+        return recovered
+
+    def _open_segment(self) -> BinaryIO:
+        path = os.path.join(self.directory, f"{os.getpid()}-{time.time_ns()}{SEGMENT_SUFFIX}")
+        segment = open(path, "ab")
+        fcntl.flock(segment, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return segment
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        # Сегмент мог уже дописать и удалить другой процесс при своем старте
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+
+    def _run(self) -> None:
+        while not self.stopping.is_set():
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Журнал открытий: ошибка записи, %d событий ждут повтора", self.pending())
+
+REVEAL_LOG = RevealLog()
+
+def reveal_event(learner_id: str, hint) -> dict:
+    """Событие открытия подсказки (hint — строка с id, assignment_id и penalty)"""
+    return {
+        "learner_id": learner_id,
+        "hint_id": hint.id,
+        "assignment_id": hint.assignment_id,
+        "penalty": hint.penalty if hint.penalty is not None else 10,
+        "revealed_at": datetime.utcnow(),
+    }
+
+def check_learner(learner_id: str) -> None:
+    if not 0 < len(learner_id) <= 100:
+        raise HTTPException(status_code=422, detail="learner_id должен быть от 1 до 100 символов")
+
+def accept_reveal(event: dict) -> dict:
+    """Поставить событие в журнал; запись в базу идет в фоне"""
+    try:
+        REVEAL_LOG.append(event)
+    except RevealQueueFull:
+        raise HTTPException(status_code=503, detail="Очередь открытий переполнена", headers={"Retry-After": "1"})
+    return event
+
+def query_events(function: Callable, *args):
+    """Выполнить `function(session, *args)` на базе событий.
+
+    При первом обращении процесса создается схема и запускается журнал;
+    async-роутеры вызывают функцию через run_in_threadpool.
+    """
+    REVEAL_LOG.start()
+    db = EventsSessionLocal()
+    try:
+        return function(db, *args)
+    finally:
+        db.close()
+
+def _select_reveals(db: Session, learner_id: str, assignment_id: Optional[int]) -> List[HintReveal]:
+    query = select(HintReveal).where(HintReveal.learner_id == learner_id)
+    if assignment_id is not None:
+        query = query.where(HintReveal.assignment_id == assignment_id)
+    return db.scalars(query.order_by(HintReveal.revealed_at, HintReveal.id)).all()
+
+def list_reveals(learner_id: str, assignment_id: Optional[int] = None) -> List[HintReveal]:
+    """Открытия учащегося; сначала записывается очередь этого процесса"""
+    REVEAL_LOG.start()
+    REVEAL_LOG.flush()
+    return query_events(_select_reveals, learner_id, assignment_id)
@@ -1,35 +1,105 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from database import get_db
+from serialization import FastJSONRoute, dump_json
+from snapshots import rebuild_course_snapshot
+from loaders import with_text, column_names
+from etags import entity_state, page_state, fetch_states, make_etag, conditional
 from models import Assignment, Topic, Hint as HintModel
 from schemas import Assignment as AssignmentSchema, AssignmentCreate, AssignmentUpdate, Hint as HintSchema
-from typing import List
+from bulk import create_assignments, update_entity, delete_entity
+from pagination import paginate, decode_cursor, set_next_cursor, ndjson_response
+from projection import parse_fields, select_fields, projected_json
+from compression import cached_response
+from typing import List, Literal, Optional
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
 
 @router.get("/", response_model=List[AssignmentSchema])
-def get_assignments(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def get_assignments(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    stream: Optional[Literal["ndjson"]] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
     """Получить список всех заданий"""
-    assignments = db.query(Assignment).offset(skip).limit(limit).all()
-    return assignments
+    after_id = decode_cursor(cursor)
+    projection = parse_fields(fields, AssignmentSchema)
+    if stream:
+        return ndjson_response(db, Assignment, AssignmentSchema, after_id, projection)
+    
+    states = fetch_states(db, page_state(Assignment, skip, limit, after_id))
+    etag = make_etag("assignments", skip, limit, after_id, projection, states)
+    not_modified = conditional(request, response, etag)
+    if not_modified:
+        return not_modified
+    
+    headers = {"ETag": etag}
+    
+    def load():
+        query = select_fields(Assignment, projection) if projection else select(Assignment).options(with_text())
+        assignments = db.scalars(paginate(query, Assignment, skip, limit, after_id)).all()
+        set_next_cursor(headers, assignments, limit)
+        return projected_json(AssignmentSchema, projection, assignments)
+    
+    key = ("assignments", skip, limit, after_id, projection)
+    return cached_response(request, key, etag, load, headers, tags={"assignments"})
 
 @router.get("/topic/{topic_id}", response_model=List[AssignmentSchema])
-def get_assignments_by_topic(topic_id: int, db: Session = Depends(get_db)):
+def get_assignments_by_topic(
+    topic_id: int,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
     """Получить задания по теме"""
-    topic = db.query(Topic).filter(Topic.id == topic_id).first()
-    if not topic:
+    projection = parse_fields(fields, AssignmentSchema)
+    states = fetch_states(
+        db,
+        entity_state(Topic, Topic.id == topic_id),
+        entity_state(Assignment, Assignment.topic_id == topic_id),
+    )
+    if not states[0][1]:
         raise HTTPException(status_code=404, detail="Тема не найдена")
+    etag = make_etag("topic-assignments", topic_id, projection, states[1:])
+    not_modified = conditional(request, response, etag)
+    if not_modified:
+        return not_modified
+    
+    def load():
+        query = select_fields(Assignment, projection) if projection else select(Assignment).options(with_text())
+        assignments = db.scalars(query.where(Assignment.topic_id == topic_id)).all()
+        return projected_json(AssignmentSchema, projection, assignments)
     
-    assignments = db.query(Assignment).filter(Assignment.topic_id == topic_id).all()
-    return assignments
+    key = ("topic-assignments", topic_id, projection)
+    return cached_response(request, key, etag, load, {"ETag": etag}, tags={("topic", topic_id)})
 
 @router.get("/{assignment_id}", response_model=AssignmentSchema)
-def get_assignment(assignment_id: int, db: Session = Depends(get_db)):
+def get_assignment(assignment_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """Получить задание по ID"""
-    assignment = db.query(Assignment).filter(Assignment.id == assignment_id).first()
-    if not assignment:
+    states = fetch_states(db, entity_state(Assignment, Assignment.id == assignment_id))
+    if not states[0][1]:
         raise HTTPException(status_code=404, detail="Задание не найдено")
-    return assignment
+    etag = make_etag("assignment", assignment_id, states)
+    not_modified = conditional(request, response, etag)
+    if not_modified:
+        return not_modified
+    
+    def load():
+        assignment = db.query(Assignment).options(with_text()).filter(Assignment.id == assignment_id).first()
+        return dump_json(AssignmentSchema, assignment) if assignment else None
+    
+    tags = {("assignment", assignment_id)}
+    cached = cached_response(request, ("assignment", assignment_id), etag, load, {"ETag": etag}, tags=tags)
+    if not cached:
+        raise HTTPException(status_code=404, detail="Задание не найдено")
+    return cached
 
 @router.post("/", response_model=AssignmentSchema)
 def create_assignment(assignment: AssignmentCreate, db: Session = Depends(get_db)):
@@ -42,62 +112,88 @@ def create_assignment(assignment: AssignmentCreate, db: Session = Depends(get_db
     db_assignment = Assignment(**assignment.dict())
     db.add(db_assignment)
     db.commit()
-    db.refresh(db_assignment)
+    rebuild_course_snapshot(db, topic.course_id)
+    # Снимок коммитит сессию, поэтому объект (с отложенными колонками) перечитывается после него
+    db.refresh(db_assignment, column_names(Assignment))
     return db_assignment
 
+@router.post("/bulk", response_model=List[AssignmentSchema])
+def create_assignments_bulk(assignments: List[AssignmentCreate], db: Session = Depends(get_db)):
+    """Создать несколько заданий одной транзакцией"""
+    return create_assignments(db, assignments)
+
 @router.put("/{assignment_id}", response_model=AssignmentSchema)
 def update_assignment(assignment_id: int, assignment: AssignmentUpdate, db: Session = Depends(get_db)):
     """Обновить задание"""
-    db_assignment = db.query(Assignment).filter(Assignment.id == assignment_id).first()
-    if not db_assignment:
+    updated = update_entity(db, Assignment, AssignmentSchema, assignment_id, assignment.dict(exclude_unset=True))
+    if updated is None:
         raise HTTPException(status_code=404, detail="Задание не найдено")
-    
-    update_data = assignment.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_assignment, field, value)
-    
-    db.commit()
-    db.refresh(db_assignment)
-    return db_assignment
+    rebuild_course_snapshot(db, db.scalar(select(Topic.course_id).where(Topic.id == updated.topic_id)))
+    return updated
 
 @router.delete("/{assignment_id}")
 def delete_assignment(assignment_id: int, db: Session = Depends(get_db)):
     """Удалить задание"""
-    db_assignment = db.query(Assignment).filter(Assignment.id == assignment_id).first()
-    if not db_assignment:
+    if not delete_entity(db, Assignment, assignment_id):
         raise HTTPException(status_code=404, detail="Задание не найдено")
-    
-    db.delete(db_assignment)
-    db.commit()
     return {"message": "Задание успешно удалено"}
 
 # ===== Hints endpoints =====
 
 @router.get("/{assignment_id}/hints", response_model=List[HintSchema])
-def get_hints_for_assignment(assignment_id: int, db: Session = Depends(get_db)):
+def get_hints_for_assignment(assignment_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """Получить список подсказок для задания"""
-    assignment = db.query(Assignment).filter(Assignment.id == assignment_id).first()
-    if not assignment:
-        raise HTTPException(status_code=404, detail="Задание не найдено")
-    hints = (
-        db.query(HintModel)
-        .filter(HintModel.assignment_id == assignment_id)
-        .order_by(HintModel.order_index.asc(), HintModel.id.asc())
-        .all()
+    states = fetch_states(
+        db,
+        entity_state(Assignment, Assignment.id == assignment_id),
+        entity_state(HintModel, HintModel.assignment_id == assignment_id),
     )
-    return hints
+    if not states[0][1]:
+        raise HTTPException(status_code=404, detail="Задание не найдено")
+    etag = make_etag("assignment-hints", assignment_id, states[1:])
+    not_modified = conditional(request, response, etag)
+    if not_modified:
+        return not_modified
+    
+    def load():
+        hints = (
+            db.query(HintModel)
+            .filter(HintModel.assignment_id == assignment_id)
+            .order_by(HintModel.order_index.asc(), HintModel.id.asc())
+            .all()
+        )
+        return dump_json(List[HintSchema], hints)
+    
+    key = ("assignment-hints", assignment_id)
+    return cached_response(request, key, etag, load, {"ETag": etag}, tags={("assignment", assignment_id)})
 
 @router.get("/{assignment_id}/hints/{order_index}", response_model=HintSchema)
-def get_hint_by_order(assignment_id: int, order_index: int, db: Session = Depends(get_db)):
+def get_hint_by_order(assignment_id: int, order_index: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """Получить конкретную подсказку по порядковому номеру"""
-    assignment = db.query(Assignment).filter(Assignment.id == assignment_id).first()
-    if not assignment:
-        raise HTTPException(status_code=404, detail="Задание не найдено")
-    hint = (
-        db.query(HintModel)
-        .filter(HintModel.assignment_id == assignment_id, HintModel.order_index == order_index)
-        .first()
+    states = fetch_states(
+        db,
+        entity_state(Assignment, Assignment.id == assignment_id),
+        entity_state(HintModel, HintModel.assignment_id == assignment_id, HintModel.order_index == order_index),
     )
-    if not hint:
+    if not states[0][1]:
+        raise HTTPException(status_code=404, detail="Задание не найдено")
+    if not states[1][1]:
+        raise HTTPException(status_code=404, detail="Подсказка не найдена")
+    etag = make_etag("assignment-hint", assignment_id, order_index, states[1:])
+    not_modified = conditional(request, response, etag)
+    if not_modified:
+        return not_modified
+    
+    def load():
+        hint = (
+            db.query(HintModel)
+            .filter(HintModel.assignment_id == assignment_id, HintModel.order_index == order_index)
+            .first()
+        )
+        return dump_json(HintSchema, hint) if hint else None
+    
+    key = ("assignment-hint", assignment_id, order_index)
+    cached = cached_response(request, key, etag, load, {"ETag": etag}, tags={("assignment", assignment_id)})
+    if not cached:
         raise HTTPException(status_code=404, detail="Подсказка не найдена")
-    return hint
+    return cached
@@ -0,0 +1,30 @@
+# Асинхронная версия routers/catalog.py (USE_ASYNC_DB=1)
+from fastapi import APIRouter, File, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
+from database import get_async_engine
+from serialization import FastJSONRoute
+from catalog import CatalogError, async_export_catalog, import_catalog
+from schemas import CatalogImportResult
+
+router = APIRouter(route_class=FastJSONRoute)
+
+EXPORT_HEADERS = {"Content-Disposition": 'attachment; filename="catalog.ndjson"'}
+
+@router.get("/export")
+async def export_catalog_ndjson():
+    """Выгрузить весь каталог в формате NDJSON"""
+    async def lines():
+        async with get_async_engine().connect() as connection:
+            async for chunk in async_export_catalog(connection):
+                yield chunk
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers=EXPORT_HEADERS)
+
+@router.post("/import", response_model=CatalogImportResult)
+async def import_catalog_ndjson(file: UploadFile = File(...)):
+    """Загрузить каталог из файла выгрузки пачками с новыми id"""
+    try:
+        async with get_async_engine().connect() as connection:
+            return await connection.run_sync(import_catalog, file.file)
+    except CatalogError as error:
+        raise HTTPException(status_code=400, detail=str(error))
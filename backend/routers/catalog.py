@@ -0,0 +1,28 @@
+from fastapi import APIRouter, File, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
+from database import engine
+from serialization import FastJSONRoute
+from catalog import CatalogError, export_catalog, import_catalog
+from schemas import CatalogImportResult
+
+router = APIRouter(route_class=FastJSONRoute)
+
+EXPORT_HEADERS = {"Content-Disposition": 'attachment; filename="catalog.ndjson"'}
+
+@router.get("/export")
+def export_catalog_ndjson():
+    """Выгрузить весь каталог в формате NDJSON"""
+    def lines():
+        with engine.connect() as connection:
+            yield from export_catalog(connection)
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers=EXPORT_HEADERS)
+
+@router.post("/import", response_model=CatalogImportResult)
+def import_catalog_ndjson(file: UploadFile = File(...)):
+    """Загрузить каталог из файла выгрузки пачками с новыми id"""
+    try:
+        with engine.connect() as connection:
+            return import_catalog(connection, file.file)
+    except CatalogError as error:
+        raise HTTPException(status_code=400, detail=str(error))
@@ -1,25 +1,73 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from database import get_db
+from serialization import FastJSONRoute
+from snapshots import get_course_snapshot, rebuild_course_snapshot, course_states, course_etag
+from compression import cached_response
 from models import Course
-from schemas import Course as CourseSchema, CourseCreate, CourseUpdate, CourseWithTopics
-from typing import List
+from etags import page_state, fetch_states, make_etag, conditional
+from schemas import Course as CourseSchema, CourseCreate, CourseUpdate, CourseWithTopics, CourseDocument
+from bulk import import_course, update_entity, delete_entity
+from pagination import paginate, decode_cursor, set_next_cursor, ndjson_response
+from projection import parse_fields, select_fields, projected_json
+from typing import List, Literal, Optional
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
 
 @router.get("/", response_model=List[CourseSchema])
-def get_courses(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def get_courses(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    stream: Optional[Literal["ndjson"]] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
     """Получить список всех курсов"""
-    courses = db.query(Course).offset(skip).limit(limit).all()
-    return courses
+    after_id = decode_cursor(cursor)
+    projection = parse_fields(fields, CourseSchema)
+    if stream:
+        return ndjson_response(db, Course, CourseSchema, after_id, projection)
+    
+    states = fetch_states(db, page_state(Course, skip, limit, after_id))
+    etag = make_etag("courses", skip, limit, after_id, projection, states)
+    not_modified = conditional(request, response, etag)
+    if not_modified:
+        return not_modified
+    
+    headers = {"ETag": etag}
+    
+    def load():
+        query = select_fields(Course, projection) if projection else select(Course)
+        courses = db.scalars(paginate(query, Course, skip, limit, after_id)).all()
+        set_next_cursor(headers, courses, limit)
+        return projected_json(CourseSchema, projection, courses)
+    
+    key = ("courses", skip, limit, after_id, projection)
+    return cached_response(request, key, etag, load, headers, tags={"courses"})
 
 @router.get("/{course_id}", response_model=CourseWithTopics)
-def get_course(course_id: int, db: Session = Depends(get_db)):
+def get_course(course_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """Получить курс по ID с темами и заданиями"""
-    course = db.query(Course).filter(Course.id == course_id).first()
-    if not course:
+    states = fetch_states(db, *course_states(course_id))
+    if not states[0][1]:
         raise HTTPException(status_code=404, detail="Курс не найден")
-    return course
+    etag = course_etag(course_id, states)
+    not_modified = conditional(request, response, etag)
+    if not_modified:
+        return not_modified
+    
+    def load():
+        snapshot = get_course_snapshot(db, course_id, etag)
+        return snapshot.payload if snapshot else None
+    
+    cached = cached_response(request, ("course", course_id), etag, load, {"ETag": etag}, tags={("course", course_id)})
+    if not cached:
+        raise HTTPException(status_code=404, detail="Курс не найден")
+    return cached
 
 @router.post("/", response_model=CourseSchema)
 def create_course(course: CourseCreate, db: Session = Depends(get_db)):
@@ -28,30 +76,27 @@ def create_course(course: CourseCreate, db: Session = Depends(get_db)):
     db.add(db_course)
     db.commit()
     db.refresh(db_course)
+    rebuild_course_snapshot(db, db_course.id)
     return db_course
 
+@router.post("/import", response_model=CourseWithTopics)
+def import_course_document(document: CourseDocument, db: Session = Depends(get_db)):
+    """Загрузить курс вместе с темами, заданиями и подсказками одной транзакцией"""
+    snapshot = import_course(db, document)
+    return Response(content=snapshot.payload, media_type="application/json")
+
 @router.put("/{course_id}", response_model=CourseSchema)
 def update_course(course_id: int, course: CourseUpdate, db: Session = Depends(get_db)):
     """Обновить курс"""
-    db_course = db.query(Course).filter(Course.id == course_id).first()
-    if not db_course:
+    updated = update_entity(db, Course, CourseSchema, course_id, course.dict(exclude_unset=True))
+    if updated is None:
         raise HTTPException(status_code=404, detail="Курс не найден")
-    
-    update_data = course.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_course, field, value)
-    
-    db.commit()
-    db.refresh(db_course)
-    return db_course
+    rebuild_course_snapshot(db, course_id)
+    return updated
 
 @router.delete("/{course_id}")
 def delete_course(course_id: int, db: Session = Depends(get_db)):
     """Удалить курс"""
-    db_course = db.query(Course).filter(Course.id == course_id).first()
-    if not db_course:
+    if not delete_entity(db, Course, course_id):
         raise HTTPException(status_code=404, detail="Курс не найден")
-    
-    db.delete(db_course)
-    db.commit()
     return {"message": "Курс успешно удален"}
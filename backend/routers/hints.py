@@ -1,34 +1,78 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from database import get_db
+from serialization import FastJSONRoute, dump_json
 from models import Hint as HintModel, Assignment
-from schemas import Hint as HintSchema, HintCreate, HintUpdate
-from typing import List
+from schemas import Hint as HintSchema, HintCreate, HintUpdate, AssignmentHints
+from bulk import create_hints, update_entity, delete_entity
+from etags import entity_state, fetch_states, hints_batch_etag, make_etag, conditional
+from loaders import load_hints_batch
+from compression import cached_response
+from typing import List, Optional
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
 
 @router.get("/assignment/{assignment_id}", response_model=List[HintSchema])
-def get_hints_for_assignment(assignment_id: int, db: Session = Depends(get_db)):
+def get_hints_for_assignment(assignment_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """Получить список подсказок для задания"""
-    assignment = db.query(Assignment).filter(Assignment.id == assignment_id).first()
-    if not assignment:
+    states = fetch_states(
+        db,
+        entity_state(Assignment, Assignment.id == assignment_id),
+        entity_state(HintModel, HintModel.assignment_id == assignment_id),
+    )
+    if not states[0][1]:
         raise HTTPException(status_code=404, detail="Задание не найдено")
+    etag = make_etag("assignment-hints", assignment_id, states[1:])
+    not_modified = conditional(request, response, etag)
+    if not_modified:
+        return not_modified
     
-    hints = (
-        db.query(HintModel)
-        .filter(HintModel.assignment_id == assignment_id)
-        .order_by(HintModel.order_index.asc(), HintModel.id.asc())
-        .all()
-    )
-    return hints
+    def load():
+        hints = (
+            db.query(HintModel)
+            .filter(HintModel.assignment_id == assignment_id)
+            .order_by(HintModel.order_index.asc(), HintModel.id.asc())
+            .all()
+        )
+        return dump_json(List[HintSchema], hints)
+    
+    key = ("assignment-hints", assignment_id)
+    return cached_response(request, key, etag, load, {"ETag": etag}, tags={("assignment", assignment_id)})
+
+@router.get("/batch", response_model=List[AssignmentHints])
+def get_hints_batch(
+    request: Request,
+    response: Response,
+    assignment_ids: List[int] = Query(default=[]),
+    up_to: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    """Получить подсказки нескольких заданий одним запросом"""
+    etag = hints_batch_etag(db, assignment_ids, up_to)
+    not_modified = conditional(request, response, etag)
+    if not_modified:
+        return not_modified
+    return load_hints_batch(db, assignment_ids, up_to)
 
 @router.get("/{hint_id}", response_model=HintSchema)
-def get_hint(hint_id: int, db: Session = Depends(get_db)):
+def get_hint(hint_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """Получить подсказку по ID"""
-    hint = db.query(HintModel).filter(HintModel.id == hint_id).first()
-    if not hint:
+    states = fetch_states(db, entity_state(HintModel, HintModel.id == hint_id))
+    if not states[0][1]:
         raise HTTPException(status_code=404, detail="Подсказка не найдена")
-    return hint
+    etag = make_etag("hint", hint_id, states)
+    not_modified = conditional(request, response, etag)
+    if not_modified:
+        return not_modified
+    
+    def load():
+        hint = db.query(HintModel).filter(HintModel.id == hint_id).first()
+        return dump_json(HintSchema, hint) if hint else None
+    
+    cached = cached_response(request, ("hint", hint_id), etag, load, {"ETag": etag}, tags={("hint", hint_id)})
+    if not cached:
+        raise HTTPException(status_code=404, detail="Подсказка не найдена")
+    return cached
 
 @router.post("/", response_model=HintSchema)
 def create_hint(hint: HintCreate, db: Session = Depends(get_db)):
@@ -44,28 +88,26 @@ def create_hint(hint: HintCreate, db: Session = Depends(get_db)):
     db.refresh(db_hint)
     return db_hint
 
+@router.post("/bulk", response_model=List[HintSchema])
+def create_hints_bulk(hints: List[HintCreate], upsert: bool = False, db: Session = Depends(get_db)):
+    """Создать несколько подсказок одной транзакцией.
+    
+    С `upsert=true` подсказки с уже существующей парой
+    (assignment_id, order_index) обновляются, а не вызывают ошибку.
+    """
+    return create_hints(db, hints, upsert)
+
 @router.put("/{hint_id}", response_model=HintSchema)
 def update_hint(hint_id: int, hint: HintUpdate, db: Session = Depends(get_db)):
     """Обновить подсказку"""
-    db_hint = db.query(HintModel).filter(HintModel.id == hint_id).first()
-    if not db_hint:
+    updated = update_entity(db, HintModel, HintSchema, hint_id, hint.dict(exclude_unset=True))
+    if updated is None:
         raise HTTPException(status_code=404, detail="Подсказка не найдена")
-    
-    update_data = hint.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_hint, field, value)
-    
-    db.commit()
-    db.refresh(db_hint)
-    return db_hint
+    return updated
 
 @router.delete("/{hint_id}")
 def delete_hint(hint_id: int, db: Session = Depends(get_db)):
     """Удалить подсказку"""
-    db_hint = db.query(HintModel).filter(HintModel.id == hint_id).first()
-    if not db_hint:
+    if not delete_entity(db, HintModel, hint_id):
         raise HTTPException(status_code=404, detail="Подсказка не найдена")
-    
-    db.delete(db_hint)
-    db.commit()
     return {"message": "Подсказка успешно удалена"}
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, HTTPException
+from serialization import FastJSONRoute
+from schemas import LeaderboardEntry, AssignmentScoreTotals
+from reveals import check_learner, query_events
+from scores import ALL_ASSIGNMENTS, leaderboard, learner_standing, assignment_totals
+from typing import List
+
+router = APIRouter(route_class=FastJSONRoute)
+
+@router.get("/", response_model=List[LeaderboardEntry])
+def get_leaderboard(assignment_id: int = ALL_ASSIGNMENTS, skip: int = 0, limit: int = 100):
+    """Рейтинг учащихся по сумме штрафов (assignment_id=0 — по всем заданиям)"""
+    return query_events(leaderboard, assignment_id, skip, limit)
+
+@router.get("/learner/{learner_id}", response_model=LeaderboardEntry)
+def get_learner_standing(learner_id: str, assignment_id: int = ALL_ASSIGNMENTS):
+    """Итоги учащегося и его место в рейтинге"""
+    check_learner(learner_id)
+    standing = query_events(learner_standing, learner_id, assignment_id)
+    if standing is None:
+        raise HTTPException(status_code=404, detail="Учащийся не открывал подсказок")
+    return standing
+
+@router.get("/totals", response_model=AssignmentScoreTotals)
+def get_assignment_totals(assignment_id: int = ALL_ASSIGNMENTS):
+    """Итоги задания по всем учащимся"""
+    return query_events(assignment_totals, assignment_id)
@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy.orm import Session
+from database import get_db
+from serialization import FastJSONRoute
+from schemas import QueryRequest
+from selection import resolve_query
+
+router = APIRouter(route_class=FastJSONRoute)
+
+@router.post("/")
+def run_query(query: QueryRequest, db: Session = Depends(get_db)):
+    """Получить дерево сущностей по декларативной выборке"""
+    return Response(content=resolve_query(db, query), media_type="application/json")
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from database import get_db
+from serialization import FastJSONRoute
+from models import Hint as HintModel
+from schemas import HintReveal, HintRevealCreate
+from reveals import accept_reveal, check_learner, list_reveals, reveal_event
+from typing import List, Optional
+
+router = APIRouter(route_class=FastJSONRoute)
+
+@router.post("/", response_model=HintReveal, status_code=202)
+def reveal_hint(reveal: HintRevealCreate, db: Session = Depends(get_db)):
+    """Отметить открытие подсказки учащимся (запись в базу — в фоне)"""
+    check_learner(reveal.learner_id)
+    hint = db.execute(
+        select(HintModel.id, HintModel.assignment_id, HintModel.penalty).where(HintModel.id == reveal.hint_id)
+    ).first()
+    if not hint:
+        raise HTTPException(status_code=404, detail="Подсказка не найдена")
+    return accept_reveal(reveal_event(reveal.learner_id, hint))
+
+@router.get("/learner/{learner_id}", response_model=List[HintReveal])
+def get_learner_reveals(learner_id: str, assignment_id: Optional[int] = None):
+    """Открытые учащимся подсказки (с assignment_id — одного задания)"""
+    check_learner(learner_id)
+    return list_reveals(learner_id, assignment_id)
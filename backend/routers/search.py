@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from database import get_db
+from serialization import FastJSONRoute
+from schemas import SearchResult
+from search import MAX_LIMIT, search
+from typing import List, Literal, Optional
+
+router = APIRouter(route_class=FastJSONRoute)
+
+@router.get("/", response_model=List[SearchResult])
+def search_content(
+    q: str,
+    kind: Optional[Literal["topic", "assignment", "hint"]] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=MAX_LIMIT),
+    db: Session = Depends(get_db),
+):
+    """Полнотекстовый поиск по темам, заданиям и подсказкам"""
+    return search(db, q, kind, skip, limit)
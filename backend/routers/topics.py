@@ -1,35 +1,120 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from database import get_db
-from models import Topic, Course
+from serialization import FastJSONRoute, dump_json
+from loaders import topic_tree_options, with_text, column_names
+from snapshots import rebuild_course_snapshot
+from models import Topic, Course, Assignment
+from etags import entity_state, page_state, fetch_states, make_etag, conditional
 from schemas import Topic as TopicSchema, TopicCreate, TopicUpdate, TopicWithAssignments
-from typing import List
+from bulk import create_topics, update_entity, delete_entity
+from pagination import paginate, decode_cursor, set_next_cursor, ndjson_response
+from projection import parse_fields, select_fields, projected_json
+from compression import cached_response
+from typing import List, Literal, Optional
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
 
 @router.get("/", response_model=List[TopicSchema])
-def get_topics(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def get_topics(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    stream: Optional[Literal["ndjson"]] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
     """Получить список всех тем"""
-    topics = db.query(Topic).offset(skip).limit(limit).all()
-    return topics
+    after_id = decode_cursor(cursor)
+    projection = parse_fields(fields, TopicSchema)
+    if stream:
+        return ndjson_response(db, Topic, TopicSchema, after_id, projection)
+    
+    states = fetch_states(db, page_state(Topic, skip, limit, after_id))
+    etag = make_etag("topics", skip, limit, after_id, projection, states)
+    not_modified = conditional(request, response, etag)
+    if not_modified:
+        return not_modified
+    
+    headers = {"ETag": etag}
+    
+    def load():
+        query = select_fields(Topic, projection) if projection else select(Topic).options(with_text())
+        topics = db.scalars(paginate(query, Topic, skip, limit, after_id)).all()
+        set_next_cursor(headers, topics, limit)
+        return projected_json(TopicSchema, projection, topics)
+    
+    key = ("topics", skip, limit, after_id, projection)
+    return cached_response(request, key, etag, load, headers, tags={"topics"})
 
 @router.get("/course/{course_id}", response_model=List[TopicWithAssignments])
-def get_topics_by_course(course_id: int, db: Session = Depends(get_db)):
+def get_topics_by_course(
+    course_id: int,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
     """Получить темы по курсу"""
-    course = db.query(Course).filter(Course.id == course_id).first()
-    if not course:
+    projection = parse_fields(fields, TopicWithAssignments)
+    topic_ids = select(Topic.id).where(Topic.course_id == course_id)
+    states = fetch_states(
+        db,
+        entity_state(Course, Course.id == course_id),
+        entity_state(Topic, Topic.course_id == course_id),
+        entity_state(Assignment, Assignment.topic_id.in_(topic_ids)),
+    )
+    if not states[0][1]:
         raise HTTPException(status_code=404, detail="Курс не найден")
+    # Поля самого курса в ответ не входят
+    etag = make_etag("course-topics", course_id, projection, states[1:])
+    not_modified = conditional(request, response, etag)
+    if not_modified:
+        return not_modified
     
-    topics = db.query(Topic).filter(Topic.course_id == course_id).order_by(Topic.order_index).all()
-    return topics
+    tags = {("course", course_id)}
+    
+    def load():
+        query = select_fields(Topic, projection) if projection else select(Topic).options(with_text(), topic_tree_options())
+        topics = db.scalars(query.where(Topic.course_id == course_id).order_by(Topic.order_index)).all()
+        # Задания тем входят в ответ: их изменения отмечаются тегом темы
+        tags.update(("topic", topic.id) for topic in topics)
+        return projected_json(TopicWithAssignments, projection, topics)
+    
+    key = ("course-topics", course_id, projection)
+    return cached_response(request, key, etag, load, {"ETag": etag}, tags=tags)
 
 @router.get("/{topic_id}", response_model=TopicWithAssignments)
-def get_topic(topic_id: int, db: Session = Depends(get_db)):
+def get_topic(topic_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """Получить тему по ID с заданиями"""
-    topic = db.query(Topic).filter(Topic.id == topic_id).first()
-    if not topic:
+    states = fetch_states(
+        db,
+        entity_state(Topic, Topic.id == topic_id),
+        entity_state(Assignment, Assignment.topic_id == topic_id),
+    )
+    if not states[0][1]:
         raise HTTPException(status_code=404, detail="Тема не найдена")
-    return topic
+    etag = make_etag("topic", topic_id, states)
+    not_modified = conditional(request, response, etag)
+    if not_modified:
+        return not_modified
+    
+    def load():
+        topic = (
+            db.query(Topic)
+            .options(with_text(), topic_tree_options())
+            .filter(Topic.id == topic_id)
+            .first()
+        )
+        return dump_json(TopicWithAssignments, topic) if topic else None
+    
+    cached = cached_response(request, ("topic", topic_id), etag, load, {"ETag": etag}, tags={("topic", topic_id)})
+    if not cached:
+        raise HTTPException(status_code=404, detail="Тема не найдена")
+    return cached
 
 @router.post("/", response_model=TopicSchema)
 def create_topic(topic: TopicCreate, db: Session = Depends(get_db)):
@@ -42,31 +127,28 @@ def create_topic(topic: TopicCreate, db: Session = Depends(get_db)):
     db_topic = Topic(**topic.dict())
     db.add(db_topic)
     db.commit()
-    db.refresh(db_topic)
+    rebuild_course_snapshot(db, db_topic.course_id)
+    # Снимок коммитит сессию, поэтому объект (с отложенными колонками) перечитывается после него
+    db.refresh(db_topic, column_names(Topic))
     return db_topic
 
+@router.post("/bulk", response_model=List[TopicSchema])
+def create_topics_bulk(topics: List[TopicCreate], db: Session = Depends(get_db)):
+    """Создать несколько тем одной транзакцией"""
+    return create_topics(db, topics)
+
 @router.put("/{topic_id}", response_model=TopicSchema)
 def update_topic(topic_id: int, topic: TopicUpdate, db: Session = Depends(get_db)):
     """Обновить тему"""
-    db_topic = db.query(Topic).filter(Topic.id == topic_id).first()
-    if not db_topic:
+    updated = update_entity(db, Topic, TopicSchema, topic_id, topic.dict(exclude_unset=True))
+    if updated is None:
         raise HTTPException(status_code=404, detail="Тема не найдена")
-    
-    update_data = topic.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_topic, field, value)
-    
-    db.commit()
-    db.refresh(db_topic)
-    return db_topic
+    rebuild_course_snapshot(db, updated.course_id)
+    return updated
 
 @router.delete("/{topic_id}")
 def delete_topic(topic_id: int, db: Session = Depends(get_db)):
     """Удалить тему"""
-    db_topic = db.query(Topic).filter(Topic.id == topic_id).first()
-    if not db_topic:
+    if not delete_entity(db, Topic, topic_id):
         raise HTTPException(status_code=404, detail="Тема не найдена")
-    
-    db.delete(db_topic)
-    db.commit()
     return {"message": "Тема успешно удалена"}
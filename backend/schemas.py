@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional
 
 # Схемы для Course
 class CourseBase(BaseModel):
@@ -111,3 +111,73 @@ class Hint(HintBase):
 
     class Config:
         from_attributes = True
+
+class AssignmentHints(BaseModel):
+    assignment_id: int
+    hints: List[Hint] = []
+
+# Схемы для загрузки курса одним документом
+class AssignmentDocument(AssignmentBase):
+    hints: List[HintBase] = []
+
+class TopicDocument(TopicBase):
+    assignments: List[AssignmentDocument] = []
+
+class CourseDocument(CourseBase):
+    topics: List[TopicDocument] = []
+
+# Результат полнотекстового поиска
+class SearchResult(BaseModel):
+    kind: str
+    id: int
+    parent_id: int
+    title: str
+    snippet: str
+    rank: float
+
+# Схемы для декларативных выборок (POST /api/query)
+class QuerySelection(BaseModel):
+    fields: Optional[List[str]] = None
+    include: Dict[str, "QuerySelection"] = {}
+
+class QueryRequest(QuerySelection):
+    entity: Literal["courses", "topics", "assignments", "hints"]
+    ids: Optional[List[int]] = None
+    skip: int = 0
+    limit: int = 100
+
+# Результат загрузки каталога (POST /api/catalog/import)
+class CatalogImportResult(BaseModel):
+    tables: Dict[str, int]
+    rows: int
+    seconds: float
+    rows_per_second: float
+
+# Открытия подсказок (POST /api/reveals)
+class HintRevealCreate(BaseModel):
+    learner_id: str
+    hint_id: int
+
+class HintReveal(HintRevealCreate):
+    assignment_id: int
+    penalty: int
+    revealed_at: datetime
+
+    class Config:
+        from_attributes = True
+
+# Итоги открытий и рейтинг (GET /api/leaderboard); assignment_id = 0 — по всем заданиям
+class LeaderboardEntry(BaseModel):
+    rank: int
+    learner_id: str
+    assignment_id: int
+    hints_used: int
+    penalty_sum: int
+    score: int
+    assignments: int
+
+class AssignmentScoreTotals(BaseModel):
+    assignment_id: int
+    learners: int
+    hints_used: int
+    penalty_sum: int
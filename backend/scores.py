@@ -0,0 +1,258 @@
+from sqlalchemy import bindparam, delete, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from models import HintReveal, LearnerScore, PenaltyHistogram, AssignmentTotals
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+"""Итоги открытий подсказок для рейтинга и панели преподавателя.
+
+Агрегаты не считаются по сырым событиям при чтении, а обновляются в той
+же транзакции, что записывает пачку открытий (`reveals.write_events`):
+
+- `learner_scores` — по учащемуся и заданию число открытых подсказок,
+  сумма штрафов (`Hint.penalty` на момент открытия) и баллы
+  `max(0, BASE_SCORE - штрафы)`, как в Assignments.js; строка с
+  `assignment_id = 0` — итог учащегося по всем заданиям;
+- `assignment_totals` — по заданию (и 0 — по всем) число учащихся,
+  открытых подсказок и сумма штрафов;
+- `penalty_histogram` — сколько учащихся набрали данную сумму штрафов.
+
+Учитываются только действительно вставленные события (`RETURNING` у
+`INSERT ... ON CONFLICT DO NOTHING`), поэтому повторная запись сегмента
+журнала итоги не меняет. На пачку выполняется один запрос чтения
+затронутых строк и по одному пакетному upsert на таблицу.
+
+Рейтинг упорядочен по сумме штрафов (меньше — выше), затем по числу
+подсказок. Место учащегося — 1 + число учащихся с меньшей суммой: это
+сумма по строкам гистограммы ниже его суммы, число которых ограничено
+числом различных сумм штрафов, а не числом учащихся. Равные суммы
+делят место.
+
+Ограничения: учитываются только открытия подсказок — сдачи заданий не
+записываются, поэтому выполнение не отслеживается; `assignments` — число
+заданий, где учащийся открыл хотя бы одну подсказку, а баллы — 100 минус
+штрафы, а не оценка за решение. Поиск места стоит O(число различных сумм
+штрафов ниже суммы учащегося), а не O(log n): индекс не хранит
+накопленных сумм.
+"""
+
+BASE_SCORE = 100
+ALL_ASSIGNMENTS = 0
+# Учащихся в одном запросе IN (...)
+READ_CHUNK = 500
+
+Key = Tuple[str, int]
+
+def assignment_score(penalty_sum: int) -> int:
+    return max(0, BASE_SCORE - penalty_sum)
+
+def _current(connection: Connection, keys: Iterable[Key]) -> Dict[Key, dict]:
+    """Строки итогов учащихся пачки по заданиям пачки и итоговые.
+
+    Row-value IN ((learner_id, assignment_id), ...) SQLite выполняет полным
+    просмотром, а два IN по колонкам первичного ключа — поиском по индексу
+    (лишние пары из их произведения отбрасываются).
+    """
+    keys = set(keys)
+    learners = sorted({learner_id for learner_id, _ in keys})
+    assignments = sorted({assignment_id for _, assignment_id in keys})
+    rows = {}
+    for start in range(0, len(learners), READ_CHUNK):
+        result = connection.execute(
+            select(LearnerScore.__table__).where(
+                LearnerScore.learner_id.in_(learners[start:start + READ_CHUNK]),
+                LearnerScore.assignment_id.in_(assignments),
+            )
+        ).mappings()
+        for row in result:
+            key = (row["learner_id"], row["assignment_id"])
+            if key in keys:
+                rows[key] = dict(row)
+    return rows
+
+def apply_reveals(connection: Connection, reveals: Iterable[Tuple[str, int, int]]) -> None:
+    """Учесть новые открытия (learner_id, assignment_id, penalty) в итогах"""
+    deltas: Dict[Key, List[int]] = defaultdict(lambda: [0, 0])
+    for learner_id, assignment_id, penalty in reveals:
+        delta = deltas[(learner_id, assignment_id)]
+        delta[0] += 1
+        delta[1] += penalty
+    if not deltas:
+        return
+    current = _current(connection, [*deltas, *((learner_id, ALL_ASSIGNMENTS) for learner_id, _ in deltas)])
+
+    now = datetime.utcnow()
+    rows: List[dict] = []
+    histogram: Counter = Counter()
+    totals: Dict[int, List[int]] = defaultdict(lambda: [0, 0, 0])
+    # Приращения итога учащегося: подсказки, штрафы, баллы, задания
+    overall: Dict[str, List[int]] = defaultdict(lambda: [0, 0, 0, 0])
+
+    def update(key: Key, hints: int, penalty: int, score: int, assignments: int) -> None:
+        old = current.get(key)
+        assignment_id = key[1]
+        if old is None:
+            old = {"hints_used": 0, "penalty_sum": 0}
+            totals[assignment_id][0] += 1
+        else:
+            histogram[(assignment_id, old["penalty_sum"])] -= 1
+        penalty_sum = old["penalty_sum"] + penalty
+        histogram[(assignment_id, penalty_sum)] += 1
+        totals[assignment_id][1] += hints
+        totals[assignment_id][2] += penalty
+        rows.append({
+            "learner_id": key[0],
+            "assignment_id": assignment_id,
+            "hints_used": old["hints_used"] + hints,
+            "penalty_sum": penalty_sum,
+            "score": score,
+            "assignments": assignments,
+            "updated_at": now,
+        })
+
+    for key, (hints, penalty) in deltas.items():
+        old = current.get(key)
+        score = assignment_score((old["penalty_sum"] if old else 0) + penalty)
+        update(key, hints, penalty, score, 1)
+        total = overall[key[0]]
+        total[0] += hints
+        total[1] += penalty
+        total[2] += score - (old["score"] if old else 0)
+        total[3] += 0 if old else 1
+    for learner_id, (hints, penalty, score, assignments) in overall.items():
+        old = current.get((learner_id, ALL_ASSIGNMENTS))
+        if old is not None:
+            score += old["score"]
+            assignments += old["assignments"]
+        update((learner_id, ALL_ASSIGNMENTS), hints, penalty, score, assignments)
+
+    table = LearnerScore.__table__
+    statement = sqlite_insert(table)
+    connection.execute(
+        statement.on_conflict_do_update(
+            index_elements=[table.c.learner_id, table.c.assignment_id],
+            set_={name: statement.excluded[name] for name in ("hints_used", "penalty_sum", "score", "assignments", "updated_at")},
+        ),
+        rows,
+    )
+
+    changes = [
+        {"assignment_id": assignment_id, "penalty_sum": penalty_sum, "learners": learners}
+        for (assignment_id, penalty_sum), learners in histogram.items() if learners
+    ]
+    if changes:
+        table = PenaltyHistogram.__table__
+        statement = sqlite_insert(table)
+        connection.execute(
+            statement.on_conflict_do_update(
+                index_elements=[table.c.assignment_id, table.c.penalty_sum],
+                set_={"learners": table.c.learners + statement.excluded.learners},
+            ),
+            changes,
+        )
+        emptied = [
+            {"assignment_id": change["assignment_id"], "penalty_sum": change["penalty_sum"]}
+            for change in changes if change["learners"] < 0
+        ]
+        if emptied:
+            connection.execute(
+                delete(table).where(
+                    table.c.assignment_id == bindparam("assignment_id"),
+                    table.c.penalty_sum == bindparam("penalty_sum"),
+                    table.c.learners <= 0,
+                ),
+                emptied,
+            )
+
+    table = AssignmentTotals.__table__
+    statement = sqlite_insert(table)
+    connection.execute(
+        statement.on_conflict_do_update(
+            index_elements=[table.c.assignment_id],
+            set_={name: table.c[name] + statement.excluded[name] for name in ("learners", "hints_used", "penalty_sum")},
+        ),
+        [
+            {"assignment_id": assignment_id, "learners": learners, "hints_used": hints, "penalty_sum": penalty}
+            for assignment_id, (learners, hints, penalty) in totals.items()
+        ],
+    )
+
+def rebuild_scores(connection: Connection, chunk_size: int = 5000) -> int:
+    """Пересчитать итоги по всем событиям (для базы, где события были раньше итогов)"""
+    for model in (LearnerScore, PenaltyHistogram, AssignmentTotals):
+        connection.execute(delete(model.__table__))
+    statement = (
+        select(HintReveal.learner_id, HintReveal.assignment_id, HintReveal.penalty)
+        .order_by(HintReveal.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    count = 0
+    for partition in connection.execute(statement).partitions():
+        apply_reveals(connection, partition)
+        count += len(partition)
+    return count
+
+def ensure_scores(connection: Connection) -> int:
+    """Построить итоги, если события уже есть, а итогов еще нет"""
+    if connection.scalar(select(LearnerScore.learner_id).limit(1)) is not None:
+        return 0
+    if connection.scalar(select(HintReveal.id).limit(1)) is None:
+        return 0
+    return rebuild_scores(connection)
+
+def rank(db: Session, assignment_id: int, penalty_sum: int) -> int:
+    below = db.scalar(
+        select(func.coalesce(func.sum(PenaltyHistogram.learners), 0))
+        .where(PenaltyHistogram.assignment_id == assignment_id, PenaltyHistogram.penalty_sum < penalty_sum)
+    )
+    return 1 + below
+
+def _entry(row: LearnerScore, place: int) -> dict:
+    return {
+        "rank": place,
+        "learner_id": row.learner_id,
+        "assignment_id": row.assignment_id,
+        "hints_used": row.hints_used,
+        "penalty_sum": row.penalty_sum,
+        "score": row.score,
+        "assignments": row.assignments,
+    }
+
+def leaderboard(db: Session, assignment_id: int = ALL_ASSIGNMENTS, skip: int = 0, limit: int = 100) -> List[dict]:
+    """Страница рейтинга по индексу ix_learner_scores_rank"""
+    rows = db.scalars(
+        select(LearnerScore)
+        .where(LearnerScore.assignment_id == assignment_id)
+        .order_by(LearnerScore.penalty_sum, LearnerScore.hints_used, LearnerScore.learner_id)
+        .offset(skip)
+        .limit(limit)
+    ).all()
+    entries = []
+    place = None
+    for position, row in enumerate(rows, start=skip):
+        if place is None:
+            place = rank(db, assignment_id, row.penalty_sum)
+        elif row.penalty_sum != rows[position - skip - 1].penalty_sum:
+            # Выше в рейтинге ровно `position` учащихся, все с меньшей суммой
+            place = position + 1
+        entries.append(_entry(row, place))
+    return entries
+
+def learner_standing(db: Session, learner_id: str, assignment_id: int = ALL_ASSIGNMENTS) -> Optional[dict]:
+    """Итоги учащегося и его место: поиск по первичному ключу и по гистограмме"""
+    row = db.get(LearnerScore, (learner_id, assignment_id))
+    if row is None:
+        return None
+    return _entry(row, rank(db, assignment_id, row.penalty_sum))
+
+def assignment_totals(db: Session, assignment_id: int = ALL_ASSIGNMENTS) -> dict:
+    row = db.get(AssignmentTotals, assignment_id)
+    return {
+        "assignment_id": assignment_id,
+        "learners": row.learners if row else 0,
+        "hints_used": row.hints_used if row else 0,
+        "penalty_sum": row.penalty_sum if row else 0,
+    }
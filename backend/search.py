@@ -0,0 +1,135 @@
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from schemas import SearchResult
+from typing import List, Optional
+import re
+
+"""Полнотекстовый поиск по содержимому курса.
+
+Темы, задания и подсказки индексируются в виртуальной таблице FTS5
+`search_index`. Индекс поддерживается триггерами SQLite, поэтому его
+обновляют любые записи: роутеры, пакетные вставки, каскадные удаления
+и скрипты наполнения. Запрос к `/api/search` идет по инвертированному
+индексу вместо `LIKE '%...%'`, который читал бы каждую Text-колонку.
+
+rowid документа кодирует тип и id исходной строки (`id * 4 + вид`),
+поэтому триггеры обновляют и удаляют документ по первичному ключу.
+
+Перестроение индекса целиком (из каталога backend):
+    python search.py
+"""
+
+KINDS = {"topic": 1, "assignment": 2, "hint": 3}
+KIND_NAMES = {code: kind for kind, code in KINDS.items()}
+# Вес совпадения в заголовке относительно текста для bm25
+TITLE_WEIGHT = 5.0
+SNIPPET_TOKENS = 12
+# Наибольший размер страницы результатов (limit в GET /api/search/)
+MAX_LIMIT = 100
+
+# Содержимое документа для каждой исходной таблицы: (таблица, вид, заголовок, текст, родитель)
+SOURCES = [
+    ("topics", "topic", "{row}.title", "{row}.description || char(10) || {row}.content", "{row}.course_id"),
+    ("assignments", "assignment", "{row}.title", "{row}.description || char(10) || {row}.instructions", "{row}.topic_id"),
+    ("hints", "hint", "''", "{row}.text", "{row}.assignment_id"),
+]
+# Колонки, изменение которых переиндексирует документ
+INDEXED_COLUMNS = {
+    "topics": "title, description, content, course_id",
+    "assignments": "title, description, instructions, topic_id",
+    "hints": "text, assignment_id",
+}
+
+def _document_sql(table: str, kind: str, title: str, body: str, parent: str, row: str) -> str:
+    columns = ", ".join(part.format(row=row) for part in (title, body, parent))
+    return f"{row}.id * 4 + {KINDS[kind]}, {columns}"
+
+def search_ddl() -> List[str]:
+    """DDL индекса и триггеров синхронизации"""
+    statements = [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+        "title, body, parent_id UNINDEXED, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    ]
+    for table, kind, title, body, parent in SOURCES:
+        insert = f"INSERT INTO search_index(rowid, title, body, parent_id) VALUES ({_document_sql(table, kind, title, body, parent, 'new')});"
+        delete = f"DELETE FROM search_index WHERE rowid = old.id * 4 + {KINDS[kind]};"
+        statements += [
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_insert AFTER INSERT ON {table} BEGIN {insert} END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_update AFTER UPDATE OF {INDEXED_COLUMNS[table]} ON {table} "
+            f"BEGIN {delete} {insert} END",
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_delete AFTER DELETE ON {table} BEGIN {delete} END",
+        ]
+    return statements
+
+def rebuild_search_index(connection) -> int:
+    """Заполнить индекс заново из исходных таблиц; возвращает число документов"""
+    connection.execute(text("DELETE FROM search_index"))
+    for table, kind, title, body, parent in SOURCES:
+        connection.execute(text(
+            f"INSERT INTO search_index(rowid, title, body, parent_id) "
+            f"SELECT {_document_sql(table, kind, title, body, parent, table)} FROM {table}"
+        ))
+    connection.execute(text("INSERT INTO search_index(search_index) VALUES ('optimize')"))
+    return connection.execute(text("SELECT count(*) FROM search_index")).scalar()
+
+def create_search_index(target, connection, **kw) -> None:
+    """Создать индекс и триггеры после create_all; новый индекс сразу заполняется"""
+    if connection.dialect.name != "sqlite":
+        return
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_index'")
+    ).first()
+    for statement in search_ddl():
+        connection.execute(text(statement))
+    if not exists:
+        rebuild_search_index(connection)
+
+def match_expression(query: str) -> str:
+    """Превратить пользовательский ввод в безопасное выражение MATCH.
+
+    Синтаксис FTS5 (кавычки, NEAR, OR, `-`) пользователю не доступен:
+    каждое слово берется в кавычки, слова объединяются через AND,
+    последнее ищется по префиксу для поиска по мере ввода.
+    """
+    terms = re.findall(r"\w+", query)
+    if not terms:
+        raise HTTPException(status_code=400, detail="Пустой поисковый запрос")
+    phrases = [f'"{term}"' for term in terms]
+    phrases[-1] += "*"
+    return " ".join(phrases)
+
+def search(db: Session, query: str, kind: Optional[str] = None, skip: int = 0, limit: int = 20) -> List[SearchResult]:
+    """Найти документы по релевантности (bm25) со сниппетами совпадений"""
+    params = {"match": match_expression(query), "skip": skip, "limit": limit}
+    kind_filter = ""
+    if kind:
+        kind_filter = "AND search_index.rowid % 4 = :kind"
+        params["kind"] = KINDS[kind]
+    rows = db.execute(text(
+        f"SELECT search_index.rowid, parent_id, title, "
+        f"snippet(search_index, -1, '<mark>', '</mark>', '…', {SNIPPET_TOKENS}) AS snippet, "
+        f"bm25(search_index, {TITLE_WEIGHT}, 1.0) AS rank "
+        f"FROM search_index WHERE search_index MATCH :match {kind_filter} "
+        f"ORDER BY rank LIMIT :limit OFFSET :skip"
+    ), params).all()
+    return [
+        SearchResult(
+            kind=KIND_NAMES[row.rowid % 4],
+            id=row.rowid // 4,
+            parent_id=row.parent_id,
+            title=row.title,
+            snippet=row.snippet,
+            rank=row.rank,
+        )
+        for row in rows
+    ]
+
+if __name__ == "__main__":
+    from database import engine
+
+    with engine.begin() as connection:
+        create_search_index(None, connection)
+        count = rebuild_search_index(connection)
+    print(f"Поисковый индекс перестроен: {count} документов")
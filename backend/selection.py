@@ -0,0 +1,148 @@
+from fastapi import HTTPException
+from pydantic import ConfigDict, create_model
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from models import Course, Topic, Assignment, Hint
+from schemas import (
+    QueryRequest, QuerySelection,
+    Course as CourseSchema, Topic as TopicSchema, Assignment as AssignmentSchema, Hint as HintSchema,
+)
+from projection import Fields, parse_fields
+from pagination import paginate
+from serialization import dump_json
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Tuple
+
+"""Декларативные вложенные выборки (`POST /api/query`).
+
+Страница собирает дерево одним запросом к API вместо цепочки
+`/api/courses/1` -> `/api/topics/course/1` -> подсказки каждого задания:
+
+    {"entity": "courses", "ids": [1], "fields": ["title"],
+     "include": {"topics": {"fields": ["title", "order_index"],
+                 "include": {"assignments": {"include": {"hints": {}}}}}}}
+
+Выборка разрешается по уровням, как DataLoader: строки уровня выбираются
+одним запросом, затем id всех строк уровня собираются и дети выбираются
+одним `WHERE parent_id IN (...)` на связь. Число SQL-запросов равно
+числу узлов выборки и не зависит от числа строк (пока у уровня не больше
+`IN_BATCH_SIZE` родителей). Читаются только запрошенные колонки
+(`fields`, по умолчанию все поля схемы ответа; `id` всегда).
+
+`MAX_QUERY_ROWS` ограничивает только корневой уровень, а вложенные
+уровни растут в число детей на родителя раз. Поэтому строки всех
+уровней считаются вместе: каждый запрос детей читает не больше остатка
+`MAX_TOTAL_ROWS` плюс одну строку, и превышение дает 400.
+"""
+
+MAX_QUERY_ROWS = 500
+# Строк всех уровней выборки вместе
+MAX_TOTAL_ROWS = 20000
+# Родителей в одном IN (...); лимит переменных SQLite — 32766
+IN_BATCH_SIZE = 10000
+# Служебная метка внешнего ключа в выборке детей
+PARENT = "_parent_id"
+
+# Сущность -> (модель, схема ответа, текст 404)
+ENTITIES = {
+    "courses": (Course, CourseSchema, "Курсы не найдены"),
+    "topics": (Topic, TopicSchema, "Темы не найдены"),
+    "assignments": (Assignment, AssignmentSchema, "Задания не найдены"),
+    "hints": (Hint, HintSchema, "Подсказки не найдены"),
+}
+
+# (сущность, связь) -> (сущность детей, внешний ключ, порядок внутри родителя)
+RELATIONS = {
+    ("courses", "topics"): ("topics", Topic.course_id, (Topic.order_index, Topic.id)),
+    ("topics", "assignments"): ("assignments", Assignment.topic_id, (Assignment.id,)),
+    ("assignments", "hints"): ("hints", Hint.assignment_id, (Hint.order_index, Hint.id)),
+}
+
+class Plan(NamedTuple):
+    """Разобранная выборка: сущность, поля и вложенные связи"""
+    entity: str
+    fields: Fields
+    include: Tuple[Tuple[str, "Plan"], ...]
+
+def build_plan(entity: str, selection: QuerySelection) -> Plan:
+    """Проверить поля и связи выборки (400 при ошибке)"""
+    _, schema, _ = ENTITIES[entity]
+    names = selection.fields if selection.fields is not None else list(schema.model_fields)
+    fields = parse_fields(",".join(names), schema)
+    include = []
+    for relation, child in selection.include.items():
+        if (entity, relation) not in RELATIONS:
+            raise HTTPException(status_code=400, detail=f"Неизвестная связь {entity}.{relation}")
+        include.append((relation, build_plan(RELATIONS[(entity, relation)][0], child)))
+    return Plan(entity, fields, tuple(include))
+
+@lru_cache(maxsize=None)
+def plan_schema(plan: Plan):
+    """Схема ответа выборки: поля исходной схемы и списки детей"""
+    _, schema, _ = ENTITIES[plan.entity]
+    definitions = {name: (schema.model_fields[name].annotation, schema.model_fields[name]) for name in plan.fields}
+    for relation, child in plan.include:
+        definitions[relation] = (List[plan_schema(child)], [])
+    return create_model(
+        f"{schema.__name__}Selection",
+        __config__=ConfigDict(from_attributes=True),
+        **definitions,
+    )
+
+def _columns(plan: Plan) -> list:
+    model, _, _ = ENTITIES[plan.entity]
+    return [getattr(model, name) for name in plan.fields]
+
+def _load_children(db: Session, plan: Plan, rows: List[dict], loaded: int) -> int:
+    """Дописать строкам уровня их детей: один запрос на связь.
+
+    `loaded` — строк выборки уже прочитано; возвращает новое число.
+    """
+    for relation, child in plan.include:
+        _, foreign_key, order = RELATIONS[(plan.entity, relation)]
+        grouped: Dict[int, List[dict]] = {row["id"]: [] for row in rows}
+        parent_ids = list(grouped)
+        for start in range(0, len(parent_ids), IN_BATCH_SIZE):
+            statement = (
+                select(*_columns(child), foreign_key.label(PARENT))
+                .where(foreign_key.in_(parent_ids[start:start + IN_BATCH_SIZE]))
+                .order_by(foreign_key, *order)
+                .limit(MAX_TOTAL_ROWS - loaded + 1)
+            )
+            for mapping in db.execute(statement).mappings():
+                loaded += 1
+                if loaded > MAX_TOTAL_ROWS:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Выборка больше {MAX_TOTAL_ROWS} строк: уменьшите ids, limit или include",
+                    )
+                item = dict(mapping)
+                grouped[item.pop(PARENT)].append(item)
+        children = []
+        for row in rows:
+            row[relation] = grouped[row["id"]]
+            children.extend(row[relation])
+        if children:
+            loaded = _load_children(db, child, children, loaded)
+    return loaded
+
+def resolve_query(db: Session, query: QueryRequest) -> bytes:
+    """Выполнить выборку и вернуть JSON дерева"""
+    plan = build_plan(query.entity, query)
+    model, _, not_found = ENTITIES[query.entity]
+    statement = select(*_columns(plan))
+    if query.ids is not None:
+        ids = list(dict.fromkeys(query.ids))
+        if len(ids) > MAX_QUERY_ROWS:
+            raise HTTPException(status_code=400, detail=f"Не больше {MAX_QUERY_ROWS} id за запрос")
+        found = {row["id"]: dict(row) for row in db.execute(statement.where(model.id.in_(ids))).mappings()}
+        missing = [entity_id for entity_id in ids if entity_id not in found]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"{not_found}: {missing}")
+        rows = [found[entity_id] for entity_id in ids]
+    else:
+        if not 0 < query.limit <= MAX_QUERY_ROWS:
+            raise HTTPException(status_code=400, detail=f"limit должен быть от 1 до {MAX_QUERY_ROWS}")
+        rows = [dict(row) for row in db.execute(paginate(statement, model, query.skip, query.limit)).mappings()]
+    _load_children(db, plan, rows, len(rows))
+    return dump_json(List[plan_schema(plan)], rows)
@@ -0,0 +1,114 @@
+from fastapi import Response
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.routing import APIRoute
+from pydantic import TypeAdapter
+from functools import lru_cache, wraps
+from typing import Any, Callable
+import asyncio
+import inspect
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+"""Быстрая сериализация ответов.
+
+Штатный путь FastAPI для `response_model`: ORM-объект валидируется в
+модель (`from_attributes`), модель выгружается в словарь с JSON-типами,
+словарь еще раз обходит `jsonable_encoder`, и только потом стандартный
+`json.dumps` превращает его в строку. Для списков и дерева курса это
+основная часть CPU запроса.
+
+`FastJSONRoute` оставляет одну валидацию: для схемы ответа один раз
+строится `TypeAdapter`, ORM-объекты валидируются им напрямую, а модели
+кодируются в байты orjson (без orjson — `dump_json` из pydantic-core).
+Обработчик возвращает готовый `Response`, поэтому FastAPI повторно ответ
+не валидирует. Схема в OpenAPI остается прежней.
+
+Включается на уровне роутера:
+
+    router = APIRouter(route_class=FastJSONRoute)
+"""
+
+@lru_cache(maxsize=None)
+def serializer(schema) -> TypeAdapter:
+    """TypeAdapter схемы; строится один раз на тип"""
+    return TypeAdapter(schema)
+
+def dump_json(schema, value: Any, **options) -> bytes:
+    """Провалидировать значение (ORM-объекты допускаются) и закодировать в JSON"""
+    adapter = serializer(schema)
+    validated = adapter.validate_python(value, from_attributes=True)
+    if orjson is None:
+        return adapter.dump_json(validated, **options)
+    return orjson.dumps(adapter.dump_python(validated, **options))
+
+def _response_parameter(signature: inspect.Signature):
+    for parameter in signature.parameters.values():
+        if parameter.annotation is Response:
+            return parameter
+    return None
+
+class FastJSONRoute(APIRoute):
+    """Маршрут, сериализующий `response_model` через `dump_json`.
+
+    Маршруты без `response_model` и ответы-`Response` (304, снимки,
+    NDJSON) проходят без изменений. Заголовки и статус, выставленные
+    обработчиком на параметре `response: Response` (ETag,
+    X-Next-Cursor), переносятся в итоговый ответ.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        response_model = kwargs.get("response_model")
+        if response_model is not None and not isinstance(response_model, DefaultPlaceholder):
+            endpoint = self._wrap(endpoint, response_model, kwargs)
+        super().__init__(path, endpoint, **kwargs)
+
+    def _wrap(self, endpoint: Callable, response_model, kwargs) -> Callable:
+        options = {
+            "by_alias": kwargs.get("response_model_by_alias", True),
+            "exclude_unset": kwargs.get("response_model_exclude_unset", False),
+            "exclude_defaults": kwargs.get("response_model_exclude_defaults", False),
+            "exclude_none": kwargs.get("response_model_exclude_none", False),
+        }
+        signature = inspect.signature(endpoint)
+        declared = _response_parameter(signature)
+        if declared is None:
+            # Параметр нужен, чтобы FastAPI передал заголовки, выставленные зависимостями
+            declared = inspect.Parameter("_fast_json_response", inspect.Parameter.KEYWORD_ONLY, annotation=Response)
+            signature = signature.replace(parameters=[*signature.parameters.values(), declared])
+            passed_through = False
+        else:
+            passed_through = True
+
+        def render(result, sub_response: Response):
+            if isinstance(result, Response):
+                return result
+            response = Response(
+                content=dump_json(response_model, result, **options),
+                status_code=sub_response.status_code or self.status_code or 200,
+                media_type="application/json",
+            )
+            response.headers.raw.extend(sub_response.headers.raw)
+            return response
+
+        def split(values):
+            sub_response = values[declared.name]
+            if not passed_through:
+                values = {name: value for name, value in values.items() if name != declared.name}
+            return values, sub_response
+
+        if asyncio.iscoroutinefunction(endpoint):
+            @wraps(endpoint)
+            async def wrapper(**values):
+                values, sub_response = split(values)
+                return render(await endpoint(**values), sub_response)
+        else:
+            @wraps(endpoint)
+            def wrapper(**values):
+                values, sub_response = split(values)
+                return render(endpoint(**values), sub_response)
+
+        wrapper.__signature__ = signature
+        return wrapper
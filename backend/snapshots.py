@@ -0,0 +1,88 @@
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from models import Course, Topic, Assignment, CourseSnapshot
+from schemas import CourseWithTopics
+from loaders import course_tree_options
+from serialization import dump_json
+from compression import RESPONSE_CACHE
+from etags import entity_state, fetch_states, make_etag
+from datetime import datetime
+from typing import Optional
+
+"""Снимки дерева курса.
+
+Дерево курса (курс -> темы -> задания) читается гораздо чаще, чем
+меняется, поэтому сериализованный JSON хранится в `course_snapshots`
+и перестраивается роутерами сразу после записи. Чтение сводится к
+выборке одной строки по первичному ключу, а повторные чтения отдаются
+из кэша сжатых тел (`compression.py`), запись которого перестроение
+снимка сбрасывает.
+
+Перестроение идет отдельным коммитом после записи, а часть путей
+записи его не вызывает (загрузка каталога, запись в обход роутеров).
+Поэтому строка снимка хранит ETag исходных данных (`source_etag`,
+агрегаты `course_states`), по которым она построена. GET сверяет его
+с ETag, уже вычисленным для ответа, и при расхождении перестраивает
+снимок: устаревшее дерево не отдается под новым ETag. Агрегаты читаются
+до дерева, поэтому запись между ними дает снимок со старым ETag, и он
+перестраивается при следующем чтении.
+"""
+
+def course_states(course_id: int) -> tuple:
+    """Агрегаты ETag дерева курса: курс, его темы и задания тем"""
+    topic_ids = select(Topic.id).where(Topic.course_id == course_id)
+    return (
+        entity_state(Course, Course.id == course_id),
+        entity_state(Topic, Topic.course_id == course_id),
+        entity_state(Assignment, Assignment.topic_id.in_(topic_ids)),
+    )
+
+def course_etag(course_id: int, states) -> str:
+    return make_etag("course", course_id, states)
+
+def rebuild_course_snapshot(db: Session, course_id: int, etag: Optional[str] = None) -> Optional[CourseSnapshot]:
+    """Перестроить снимок курса; для удаленного курса снимок удаляется.
+
+    `etag` — ETag данных, прочитанный до вызова (GET); иначе он
+    вычисляется здесь, до чтения дерева.
+    """
+    RESPONSE_CACHE.invalidate(("course", course_id))
+    if etag is None:
+        etag = course_etag(course_id, fetch_states(db, *course_states(course_id)))
+    course = (
+        db.query(Course)
+        .options(course_tree_options())
+        .filter(Course.id == course_id)
+        .populate_existing()
+        .first()
+    )
+    if not course:
+        db.query(CourseSnapshot).filter(CourseSnapshot.course_id == course_id).delete()
+        db.commit()
+        return None
+    
+    payload = dump_json(CourseWithTopics, course)
+    # Upsert вместо SELECT + INSERT: параллельные перестроения не конфликтуют
+    db.execute(
+        insert(CourseSnapshot)
+        .values(course_id=course_id, payload=payload, source_etag=etag, version=1, updated_at=datetime.utcnow())
+        .on_conflict_do_update(
+            index_elements=[CourseSnapshot.course_id],
+            set_={
+                "payload": payload,
+                "source_etag": etag,
+                "version": CourseSnapshot.version + 1,
+                "updated_at": datetime.utcnow(),
+            },
+        )
+    )
+    db.commit()
+    return db.get(CourseSnapshot, course_id, populate_existing=True)
+
+def get_course_snapshot(db: Session, course_id: int, etag: str) -> Optional[CourseSnapshot]:
+    """Снимок курса для данных с ETag `etag`; отсутствующий или устаревший перестраивается"""
+    snapshot = db.get(CourseSnapshot, course_id)
+    if snapshot is None or snapshot.source_etag != etag:
+        snapshot = rebuild_course_snapshot(db, course_id, etag)
+    return snapshot
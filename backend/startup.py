@@ -0,0 +1,201 @@
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
+from sqlalchemy.exc import OperationalError
+from database import engine, Base, USE_ASYNC_DB, DB_PROFILE, production_pool_options
+from serialization import serializer
+from typing import List, Optional
+import logging
+import os
+import re
+import sys
+import time
+
+"""Запуск приложения: подготовка схемы и прогрев.
+
+Раньше `main.py` вызывал `create_all` при импорте, т.е. каждый воркер и
+каждый перезапуск `--reload` сверял схему с базой. Теперь схема
+готовится один раз в lifespan-обработчике, режим задает `SCHEMA_MODE`:
+
+- `create` (по умолчанию) — `create_all`, как раньше, но при старте
+  приложения, а не при импорте модуля;
+- `alembic` — схемой управляют только миграции. При старте выполняется
+  один запрос: ревизия из `alembic_version` сравнивается с головой
+  каталога `alembic/versions`, при расхождении приложение не стартует.
+
+Голова определяется разбором файлов миграций, без импорта alembic
+(импорт и загрузка скриптов alembic стоят сотни миллисекунд).
+
+Прогрев (`STARTUP_PREWARM=1`) открывает соединения пула, строит
+сериализаторы всех схем ответов и запрашивает `PREWARM_URLS`, заполняя
+снимки и кэш сжатых тел. Длительность каждой фазы пишется в лог.
+
+Команды:
+    python startup.py init   # пустая база: create_all + alembic stamp head
+    python startup.py check  # сверить ревизию базы с головой миграций
+"""
+
+SCHEMA_MODE = os.getenv("SCHEMA_MODE", "create")
+STARTUP_PREWARM = os.getenv("STARTUP_PREWARM", "0").lower() in ("1", "true", "yes")
+PREWARM_URLS = [url.strip() for url in os.getenv("PREWARM_URLS", "").split(",") if url.strip()]
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+ALEMBIC_INI = os.path.join(BACKEND_DIR, "alembic.ini")
+VERSIONS_DIR = os.path.join(BACKEND_DIR, "alembic", "versions")
+
+logger = logging.getLogger("uvicorn.error")
+
+class SchemaMismatch(RuntimeError):
+    """Ревизия базы не совпадает с головой миграций"""
+
+_REVISION = re.compile(r"^revision\s*=\s*['\"]([^'\"]+)['\"]", re.MULTILINE)
+_DOWN_REVISION = re.compile(r"^down_revision\s*=\s*(.+)$", re.MULTILINE)
+
+def head_revision(versions_dir: str = VERSIONS_DIR) -> str:
+    """Голова цепочки миграций: ревизия, на которую не ссылается ни одна другая"""
+    revisions, parents = set(), set()
+    for name in sorted(os.listdir(versions_dir)):
+        if not name.endswith(".py"):
+            continue
+        with open(os.path.join(versions_dir, name), encoding="utf-8") as source:
+            text = source.read()
+        revision = _REVISION.search(text)
+        if revision is None:
+            continue
+        revisions.add(revision.group(1))
+        down_revision = _DOWN_REVISION.search(text)
+        if down_revision is not None:
+            # None, строка или кортеж строк (слияние веток)
+            parents.update(re.findall(r"['\"]([^'\"]+)['\"]", down_revision.group(1)))
+    heads = sorted(revisions - parents)
+    if len(heads) != 1:
+        raise SchemaMismatch(f"Ожидалась одна голова миграций, найдено: {', '.join(heads) or 'нет'}")
+    return heads[0]
+
+def stored_revision() -> Optional[str]:
+    """Ревизия из alembic_version или None, если база не размечена"""
+    try:
+        with engine.connect() as connection:
+            return connection.exec_driver_sql("SELECT version_num FROM alembic_version").scalar()
+    except OperationalError:
+        return None
+
+def check_schema() -> str:
+    head = head_revision()
+    stored = stored_revision()
+    if stored != head:
+        raise SchemaMismatch(
+            f"Ревизия базы {stored or 'отсутствует'}, ожидается {head}: выполните "
+            "`alembic upgrade head` (или `python startup.py init` для пустой базы)"
+        )
+    return head
+
+def create_schema() -> None:
+    # Модели регистрируют таблицы и триггеры поиска в метаданных
+    import models  # noqa: F401
+    Base.metadata.create_all(bind=engine)
+
+def prepare_schema(mode: str = SCHEMA_MODE) -> None:
+    if mode == "create":
+        create_schema()
+    elif mode == "alembic":
+        check_schema()
+    else:
+        raise ValueError(f"Неизвестный SCHEMA_MODE: {mode}")
+
+def init_schema() -> str:
+    """Создать схему пустой базы и отметить ее головой миграций.
+
+    Первая миграция не создает базовые таблицы, поэтому новая база
+    строится через `create_all`, а дальше обновляется миграциями.
+    """
+    from alembic import command
+    from alembic.config import Config
+    create_schema()
+    command.stamp(Config(ALEMBIC_INI), "head")
+    return head_revision()
+
+def _connection_count() -> int:
+    # По умолчанию весь постоянный пул профиля production, иначе одно соединение
+    default = production_pool_options()["pool_size"] if DB_PROFILE == "production" else 1
+    return int(os.getenv("PREWARM_CONNECTIONS", default))
+
+def _prewarm_connections() -> int:
+    """Открыть соединения пула заранее, чтобы первые запросы не ждали подключения"""
+    count = _connection_count()
+    connections = [engine.connect() for _ in range(count)]
+    for connection in connections:
+        connection.exec_driver_sql("SELECT 1")
+    for connection in connections:
+        connection.close()
+    return count
+
+async def _prewarm_async_connections() -> int:
+    from database import get_async_engine
+    count = _connection_count()
+    async_engine = get_async_engine()
+    connections = [await async_engine.connect() for _ in range(count)]
+    for connection in connections:
+        await connection.exec_driver_sql("SELECT 1")
+    for connection in connections:
+        await connection.close()
+    return count
+
+def _prewarm_serializers(app: FastAPI) -> int:
+    """Построить TypeAdapter каждой схемы ответа (иначе это делает первый запрос)"""
+    schemas = {
+        route.response_model for route in app.routes
+        if isinstance(route, APIRoute) and route.response_model is not None
+    }
+    for schema in schemas:
+        serializer(schema)
+    return len(schemas)
+
+async def _prewarm_urls(app: FastAPI, urls: List[str]) -> None:
+    """Запросить адреса через приложение: заполняются снимки и кэш сжатых тел"""
+    import httpx
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://prewarm") as client:
+        for url in urls:
+            response = await client.get(url, headers={"Accept-Encoding": "gzip, deflate, br"})
+            if response.status_code != 200:
+                logger.warning("Прогрев %s: статус %s", url, response.status_code)
+
+async def prewarm(app: FastAPI, urls: List[str] = PREWARM_URLS) -> None:
+    started = time.perf_counter()
+    if USE_ASYNC_DB:
+        connections = await _prewarm_async_connections()
+    else:
+        connections = await run_in_threadpool(_prewarm_connections)
+    schemas = _prewarm_serializers(app)
+    if urls:
+        await _prewarm_urls(app, urls)
+    logger.info(
+        "Запуск: прогрев %.1f мс (соединений %d, схем ответов %d, адресов %d)",
+        (time.perf_counter() - started) * 1000, connections, schemas, len(urls),
+    )
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    await run_in_threadpool(prepare_schema)
+    logger.info("Запуск: схема (%s) %.1f мс", SCHEMA_MODE, (time.perf_counter() - started) * 1000)
+    if STARTUP_PREWARM:
+        await prewarm(app)
+    # Журнал открытий подсказок: дописать сегменты упавших процессов, на остановке — очередь
+    from reveals import REVEAL_LOG
+    await run_in_threadpool(REVEAL_LOG.start)
+    yield
+    await run_in_threadpool(REVEAL_LOG.stop)
+
+if __name__ == "__main__":
+    commands = {"init": init_schema, "check": check_schema}
+    if len(sys.argv) != 2 or sys.argv[1] not in commands:
+        print("Использование: python startup.py init|check")
+        sys.exit(2)
+    try:
+        print(f"Ревизия базы: {commands[sys.argv[1]]()}")
+    except SchemaMismatch as error:
+        print(error)
+        sys.exit(1)
@@ -0,0 +1,67 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, BACKEND_DIR)
+# Движки создаются при импорте database.py: временная база задается до импорта приложения
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+
+from fastapi.testclient import TestClient
+
+"""Общие фикстуры тестов.
+
+Приложение (sync или async стек по `USE_ASYNC_DB`) поднимается один раз
+на временной базе; схему создает lifespan, как при обычном запуске, а
+первыми в базу ложатся тестовые данные init_db (их id известны тестам
+планов запросов). Остальные данные тесты создают через API, поэтому
+снимки и кэши ведут себя так же, как в работе.
+
+Запуск из каталога backend:
+    python -m pytest
+    USE_ASYNC_DB=1 python -m pytest
+"""
+
+@pytest.fixture(scope="session")
+def client():
+    import init_db
+    from main import app
+    with TestClient(app) as test_client:
+        init_db.init_data()
+        yield test_client
+
+def course_document(topics: int, assignments: int, hints: int = 1) -> dict:
+    """Курс с `topics` темами по `assignments` заданий и `hints` подсказок в каждом"""
+    return {
+        "title": f"Курс {topics}x{assignments}",
+        "description": "Описание",
+        "topics": [
+            {
+                "title": f"Тема {t}",
+                "description": "Описание",
+                "content": "Содержание",
+                "order_index": t,
+                "assignments": [
+                    {
+                        "title": f"Задание {t}.{a}",
+                        "description": "Описание",
+                        "instructions": "Шаги",
+                        "hints": [{"text": f"Подсказка {h}", "order_index": h} for h in range(hints)],
+                    }
+                    for a in range(assignments)
+                ],
+            }
+            for t in range(topics)
+        ],
+    }
+
+@pytest.fixture(scope="session")
+def make_course(client):
+    """Загрузить курс через POST /api/courses/import; возвращает дерево ответа"""
+    def make(topics: int = 2, assignments: int = 2, hints: int = 1) -> dict:
+        response = client.post("/api/courses/import", json=course_document(topics, assignments, hints))
+        assert response.status_code == 200, response.text
+        return response.json()
+    return make
@@ -0,0 +1,28 @@
+import asyncio
+
+import pytest
+
+from async_routes import async_router
+from database import get_async_db, get_db
+from routers import assignments, courses, hints, leaderboard, query, reveals, search, topics
+
+"""Асинхронные роутеры строятся из синхронных (`async_routes.py`).
+
+Пути, методы, коды и схемы ответов совпадают с синхронным роутером;
+обработчики с сессией становятся `async def` и получают AsyncSession.
+"""
+
+MODULES = [courses, topics, assignments, hints, search, query, reveals, leaderboard]
+
+def signature(route):
+    return route.path, route.methods, route.status_code, route.response_model, route.name
+
+@pytest.mark.parametrize("module", MODULES, ids=[module.__name__ for module in MODULES])
+def test_async_router_mirrors_sync_router(module):
+    generated = async_router(module.router)
+    assert [signature(route) for route in generated.routes] == [signature(route) for route in module.router.routes]
+    for route in generated.routes:
+        dependencies = {dependency.call for dependency in route.dependant.dependencies}
+        assert get_db not in dependencies, route.path
+        if get_async_db in dependencies:
+            assert asyncio.iscoroutinefunction(route.endpoint), route.path
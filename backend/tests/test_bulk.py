@@ -0,0 +1,46 @@
+"""Пакетный upsert подсказок (POST /api/hints/bulk?upsert=true).
+
+Повтор пары (assignment_id, order_index) в одном теле дает одну строку с
+последним значением, а у существующей подсказки меняются только поля,
+переданные в теле.
+"""
+
+def first_assignment(course: dict) -> int:
+    return course["topics"][0]["assignments"][0]["id"]
+
+def stored_hints(client, assignment_id: int) -> dict:
+    response = client.get(f"/api/hints/assignment/{assignment_id}", headers={"Cache-Control": "no-cache"})
+    assert response.status_code == 200, response.text
+    return {hint["order_index"]: hint for hint in response.json()}
+
+def test_repeated_key_in_body_keeps_last_value(client, make_course):
+    assignment_id = first_assignment(make_course(1, 1))
+    body = [
+        {"assignment_id": assignment_id, "order_index": 50, "text": "a"},
+        {"assignment_id": assignment_id, "order_index": 50, "text": "b"},
+    ]
+    response = client.post("/api/hints/bulk?upsert=true", json=body)
+
+    assert response.status_code == 200, response.text
+    returned = response.json()
+    assert [(hint["order_index"], hint["text"]) for hint in returned] == [(50, "b")]
+    stored = stored_hints(client, assignment_id)[50]
+    assert (stored["id"], stored["text"]) == (returned[0]["id"], "b")
+
+def test_upsert_keeps_omitted_penalty(client, make_course):
+    assignment_id = first_assignment(make_course(1, 1))
+    created = client.post("/api/hints/bulk?upsert=true", json=[
+        {"assignment_id": assignment_id, "order_index": 60, "text": "old", "penalty": 3},
+    ])
+    assert created.status_code == 200, created.text
+
+    response = client.post("/api/hints/bulk?upsert=true", json=[
+        {"assignment_id": assignment_id, "order_index": 60, "text": "new"},
+        {"assignment_id": assignment_id, "order_index": 61, "text": "added"},
+    ])
+
+    assert response.status_code == 200, response.text
+    assert [(hint["text"], hint["penalty"]) for hint in response.json()] == [("new", 3), ("added", 10)]
+    stored = stored_hints(client, assignment_id)
+    assert (stored[60]["text"], stored[60]["penalty"]) == ("new", 3)
+    assert stored[61]["penalty"] == 10
@@ -0,0 +1,59 @@
+import json
+
+from sqlalchemy import func, select
+
+from catalog import import_catalog
+from database import engine, SessionLocal
+from models import Course, CourseSnapshot
+
+"""Загрузка каталога пачками и снимки деревьев курсов.
+
+Чтение курса между пачками строит снимок неполного дерева; следующая
+пачка тем или заданий должна удалить его в своей транзакции, иначе
+GET /api/courses/{id} отдавал бы дерево без загруженных позже тем.
+"""
+
+def catalog_lines(topics: int, assignments: int):
+    rows = [("courses", {"id": 1, "title": "Каталог", "description": "d"})]
+    for t in range(1, topics + 1):
+        rows.append(("topics", {"id": t, "course_id": 1, "title": f"Тема {t}", "description": "d", "content": "c", "order_index": t}))
+    for a in range(1, assignments + 1):
+        rows.append(("assignments", {"id": a, "topic_id": 1 + a % topics, "title": f"Задание {a}", "description": "d", "instructions": "i"}))
+    yield json.dumps({"format": "vibe-catalog", "version": 1}).encode() + b"\n"
+    for table, row in rows:
+        yield json.dumps({"table": table, "row": row}, ensure_ascii=False).encode() + b"\n"
+
+def latest_course_id() -> int:
+    db = SessionLocal()
+    try:
+        return db.scalar(select(func.max(Course.id)))
+    finally:
+        db.close()
+
+def test_read_between_batches_does_not_pin_partial_tree(client):
+    reads = []
+
+    def lines():
+        for number, line in enumerate(catalog_lines(topics=3, assignments=4)):
+            # Строка 3 — вторая тема: курс и первая тема уже зафиксированы пачками по 1 строке
+            if number == 3:
+                course_id = latest_course_id()
+                tree = client.get(f"/api/courses/{course_id}").json()
+                reads.append((course_id, len(tree["topics"])))
+            yield line
+
+    with engine.connect() as connection:
+        result = import_catalog(connection, lines(), batch_size=1)
+    assert result["tables"] == {"courses": 1, "topics": 3, "assignments": 4, "hints": 0}
+    course_id, partial_topics = reads[0]
+    assert partial_topics < 3
+
+    db = SessionLocal()
+    try:
+        assert db.get(CourseSnapshot, course_id) is None
+    finally:
+        db.close()
+    tree = client.get(f"/api/courses/{course_id}").json()
+    assert len(tree["topics"]) == 3
+    assert sum(len(topic["assignments"]) for topic in tree["topics"]) == 4
+    assert len(client.get(f"/api/topics/course/{course_id}").json()) == 3
@@ -0,0 +1,86 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from database import engine
+
+"""DELETE-обработчики под параллельной записью.
+
+Удаление читает строку и удаляет ее с дочерними, поэтому берет блокировку
+записи до чтения (`bulk.begin_write`). Пока базу держит другой писатель,
+запрос должен дождаться его коммита (busy_timeout), а не отвечать 500
+"database is locked"; отсутствующая строка — 404 без удержания блокировки.
+"""
+
+HOLD_SECONDS = 0.3
+
+def hold_write_lock(seconds: float, *statements) -> threading.Thread:
+    """Держать блокировку записи основной базы из отдельного соединения.
+
+    `statements` выполняются в этой транзакции и фиксируются по истечении
+    `seconds`; без них транзакция откатывается.
+    """
+    holder = sqlite3.connect(engine.url.database, check_same_thread=False)
+    holder.execute("BEGIN IMMEDIATE")
+    for statement, parameters in statements:
+        holder.execute(statement, parameters)
+
+    def release():
+        time.sleep(seconds)
+        holder.commit()
+        holder.close()
+
+    thread = threading.Thread(target=release)
+    thread.start()
+    return thread
+
+def tree_ids(course: dict):
+    topic = course["topics"][0]
+    assignment = topic["assignments"][0]
+    return {
+        "courses": course["id"],
+        "topics": topic["id"],
+        "assignments": assignment["id"],
+    }
+
+@pytest.mark.parametrize("collection", ["hints", "assignments", "topics", "courses"])
+def test_delete_waits_for_concurrent_writer(client, make_course, collection):
+    course = make_course(2, 2)
+    if collection == "hints":
+        assignment_id = tree_ids(course)["assignments"]
+        row_id = client.get(f"/api/hints/assignment/{assignment_id}").json()[0]["id"]
+    else:
+        row_id = tree_ids(course)[collection]
+
+    holder = hold_write_lock(HOLD_SECONDS)
+    started = time.perf_counter()
+    response = client.delete(f"/api/{collection}/{row_id}")
+    waited = time.perf_counter() - started
+    holder.join()
+
+    assert response.status_code == 200, response.text
+    assert waited >= HOLD_SECONDS * 0.5
+    assert client.get(f"/api/{collection}/{row_id}").status_code == 404
+
+def test_row_deleted_by_concurrent_writer_is_not_found(client, make_course):
+    assignment_id = tree_ids(make_course(1, 1))["assignments"]
+    hint_id = client.get(f"/api/hints/assignment/{assignment_id}").json()[0]["id"]
+
+    # Без блокировки до чтения запрос увидел бы строку до коммита другого писателя
+    holder = hold_write_lock(HOLD_SECONDS, ("DELETE FROM hints WHERE id = ?", (hint_id,)))
+    response = client.delete(f"/api/hints/{hint_id}")
+    holder.join()
+
+    assert response.status_code == 404, response.text
+
+def test_missing_row_releases_write_lock(client):
+    assert client.delete("/api/topics/999999").status_code == 404
+    # Блокировка отпущена сразу: запись из другого соединения не ждет busy_timeout
+    other = sqlite3.connect(engine.url.database, timeout=0)
+    try:
+        other.execute("BEGIN IMMEDIATE")
+        other.rollback()
+    finally:
+        other.close()
@@ -0,0 +1,49 @@
+from sqlalchemy.exc import IntegrityError
+
+from database import SessionLocal
+import invalidation
+from invalidation import CACHE_TAGS, on_invalidate
+from models import Hint
+
+"""Сбор тегов изменений и откат транзакции (`invalidation.py`).
+
+Откат сессии должен отбрасывать теги незафиксированных изменений, не
+мешая обработчику ошибки: слушатель `after_soft_rollback` вызывается
+SQLAlchemy с сессией и прежней транзакцией.
+"""
+
+def first_assignment(course):
+    return course["topics"][0]["assignments"][0]["id"]
+
+def test_duplicate_hint_in_bulk_returns_409(client, make_course):
+    assignment_id = first_assignment(make_course(topics=1, assignments=1, hints=1))
+    hints_url = f"/api/hints/assignment/{assignment_id}"
+    before = client.get(hints_url).json()
+
+    duplicate = {"assignment_id": assignment_id, "order_index": 0, "text": "Повтор"}
+    response = client.post("/api/hints/bulk", json=[duplicate])
+    assert response.status_code == 409, response.text
+
+    # Откат не оставил частичной записи, следующая запись проходит
+    assert client.get(hints_url).json() == before
+    created = client.post("/api/hints/bulk", json=[{**duplicate, "order_index": 1}])
+    assert created.status_code == 200, created.text
+    assert [hint["order_index"] for hint in client.get(hints_url).json()] == [0, 1]
+
+def test_rollback_discards_pending_tags(client, make_course):
+    assignment_id = first_assignment(make_course(topics=1, assignments=1, hints=1))
+    invalidated = []
+    on_invalidate(invalidated.append)
+    db = SessionLocal()
+    try:
+        db.add(Hint(assignment_id=assignment_id, order_index=0, text="Повтор"))
+        try:
+            db.flush()
+        except IntegrityError:
+            db.rollback()
+        assert CACHE_TAGS not in db.info
+        db.commit()
+    finally:
+        db.close()
+        invalidation._listeners.remove(invalidated.append)
+    assert not any(("assignment", assignment_id) in tags for tags in invalidated)
@@ -0,0 +1,74 @@
+import threading
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from database import engine
+from query_stats import query_budget
+
+"""Бюджеты SQL-запросов горячих endpoint-ов (`query_stats.query_budget`).
+
+Каждый случай загружает свой курс (10 тем по 10 заданий, по 3
+подсказки) и выполняет первое, холодное чтение: кэши ответов и
+агрегатов ETag для новых данных пусты. Бюджет — число запросов такого
+чтения; превышение означает N+1 или лишнюю проверку перед основной
+выборкой, и QueryBudgetExceeded покажет все выполненные запросы.
+"""
+
+def course_tree_query(course):
+    return {
+        "entity": "courses",
+        "ids": [course["id"]],
+        "include": {"topics": {"include": {"assignments": {"include": {"hints": {}}}}}},
+    }
+
+def hints_batch_url(course):
+    ids = [assignment["id"] for topic in course["topics"] for assignment in topic["assignments"]]
+    return "/api/hints/batch?" + "&".join(f"assignment_ids={assignment_id}" for assignment_id in ids)
+
+# (название, метод, url(курс), тело(курс), бюджет запросов)
+BUDGETS = [
+    ("course_tree", "GET", lambda course: f"/api/courses/{course['id']}", None, 2),
+    ("topics_by_course", "GET", lambda course: f"/api/topics/course/{course['id']}", None, 3),
+    ("topic_tree", "GET", lambda course: f"/api/topics/{course['topics'][0]['id']}", None, 3),
+    ("topics_page", "GET", lambda course: "/api/topics/?limit=50", None, 2),
+    ("topics_keyset_page", "GET", lambda course: "/api/topics/?cursor=eyJpZCI6IDB9&limit=50", None, 2),
+    ("assignments_by_topic", "GET", lambda course: f"/api/assignments/topic/{course['topics'][0]['id']}", None, 2),
+    ("hints_batch", "GET", hints_batch_url, None, 2),
+    ("query_course_tree", "POST", lambda course: "/api/query/", course_tree_query, 4),
+]
+
+@pytest.mark.parametrize("name,method,url,body,max_queries", BUDGETS, ids=[case[0] for case in BUDGETS])
+def test_endpoint_query_budget(client, make_course, name, method, url, body, max_queries):
+    course = make_course(topics=10, assignments=10, hints=3)
+    with query_budget(max_queries=max_queries):
+        response = client.request(method, url(course), json=body(course) if body else None)
+    assert response.status_code == 200, response.text
+
+def test_hints_batch_revalidation_reads_only_aggregates(client, make_course):
+    url = hints_batch_url(make_course(topics=2, assignments=3, hints=2))
+    etag = client.get(url).headers["ETag"]
+    # Запись другого курса меняет поколение данных: агрегаты читаются заново
+    make_course(topics=1, assignments=1)
+    with query_budget(max_queries=1) as budget:
+        response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert not any("hints.text" in statement for statement in budget.statements)
+
+def test_budget_counts_queries_from_all_threads_after_failed_statement():
+    with engine.connect() as connection:
+        with pytest.raises(OperationalError):
+            connection.exec_driver_sql("SELECT * FROM no_such_table")
+
+    def run_queries():
+        with engine.connect() as connection:
+            for _ in range(50):
+                connection.exec_driver_sql("SELECT 1")
+
+    threads = [threading.Thread(target=run_queries) for _ in range(4)]
+    with query_budget() as budget:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert budget.count == 200
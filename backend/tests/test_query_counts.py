@@ -0,0 +1,37 @@
+import pytest
+
+from query_stats import query_budget
+
+"""Дерево курса читается постоянным числом запросов.
+
+Курсы растущего размера загружаются через API; для каждого считаются
+запросы холодного (первого после записи) чтения дерева. Число запросов
+не должно зависеть от числа тем и заданий: рост означает ленивую
+загрузку связей (N+1) при сериализации.
+"""
+
+SIZES = [1, 5, 20]
+
+TREE_PATHS = {
+    "course": lambda course: f"/api/courses/{course['id']}",
+    "topic": lambda course: f"/api/topics/{course['topics'][0]['id']}",
+    "course_topics": lambda course: f"/api/topics/course/{course['id']}",
+}
+
+def count_queries(client, path):
+    with query_budget() as budget:
+        response = client.get(path)
+    assert response.status_code == 200, response.text
+    return budget.count, response.json()
+
+@pytest.mark.parametrize("name", TREE_PATHS)
+def test_tree_query_count_does_not_grow(client, make_course, name):
+    counts = []
+    for size in SIZES:
+        course = make_course(topics=size, assignments=size)
+        count, body = count_queries(client, TREE_PATHS[name](course))
+        topics = body["topics"] if name == "course" else body if name == "course_topics" else [body]
+        assert len(topics) == (1 if name == "topic" else size)
+        assert all(len(topic["assignments"]) == size for topic in topics)
+        counts.append(count)
+    assert len(set(counts)) == 1, f"{name}: запросов по размерам {dict(zip(SIZES, counts))}"
@@ -0,0 +1,195 @@
+import re
+
+import pytest
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+
+from database import engine, events_engine, Base, EventsBase
+from main import app
+
+"""Планы всех запросов роутеров через EXPLAIN QUERY PLAN.
+
+Каждый зарегистрированный маршрут вызывается с примерами из REQUESTS,
+все SQL-запросы к основной базе и к базе событий (открытия подсказок и
+итоги рейтинга) перехватываются, и для каждого выполняется EXPLAIN QUERY
+PLAN на его движке. Полный просмотр таблицы (`SCAN <table>`) — регрессия,
+кроме явно разрешенных случаев: offset-пагинации и потоковой выгрузки,
+которые читают таблицу по порядку первичного ключа намеренно. Пакетные
+запросы (executemany) проверяются с первым набором параметров.
+
+Маршрут без примера запроса в REQUESTS тоже считается ошибкой, чтобы
+новые endpoint-ы не оставались без проверки. Примеры выполняются в
+порядке регистрации маршрутов на тестовых данных init_db: PUT и DELETE
+работают с записями, созданными предыдущими POST.
+"""
+
+TOPIC = {"title": "t", "description": "d", "content": "c", "course_id": 1}
+ASSIGNMENT = {"title": "a", "description": "d", "instructions": "i", "topic_id": 1}
+HINT = {"assignment_id": 1, "order_index": 100, "text": "h"}
+COURSE_DOCUMENT = {
+    "title": "c",
+    "description": "d",
+    "topics": [{**TOPIC, "assignments": [{**ASSIGNMENT, "hints": [{"text": "h"}]}]}],
+}
+COURSE_QUERY = {
+    "entity": "courses",
+    "ids": [1],
+    "fields": ["title"],
+    "include": {"topics": {"fields": ["title"], "include": {"assignments": {"include": {"hints": {}}}}}},
+}
+# Файл выгрузки из одной цепочки курс -> тема -> задание -> подсказка (bytes отправляются как multipart)
+CATALOG = b"\n".join([
+    b'{"format": "vibe-catalog", "version": 1}',
+    b'{"table": "courses", "row": {"id": 1, "title": "c", "description": "d"}}',
+    b'{"table": "topics", "row": {"id": 1, "course_id": 1, "title": "t", "description": "d", "content": "c", "order_index": 0}}',
+    b'{"table": "assignments", "row": {"id": 1, "topic_id": 1, "title": "a", "description": "d", "instructions": "i"}}',
+    b'{"table": "hints", "row": {"id": 1, "assignment_id": 1, "order_index": 1, "text": "h"}}',
+])
+
+# (метод, путь маршрута) -> список запросов (url, json, разрешенные SCAN)
+REQUESTS = {
+    ("GET", "/"): [("/", None, set())],
+    ("GET", "/api/health"): [("/api/health", None, set())],
+    ("GET", "/api/metrics"): [("/api/metrics", None, set())],
+    ("GET", "/api/cache/stats"): [("/api/cache/stats", None, set())],
+    ("GET", "/api/courses/"): [
+        ("/api/courses/?skip=0&limit=10", None, {"courses"}),
+        ("/api/courses/?cursor=eyJpZCI6IDB9&limit=10", None, set()),
+        ("/api/courses/?stream=ndjson", None, {"courses"}),
+        ("/api/courses/?limit=10&fields=title", None, {"courses"}),
+    ],
+    ("GET", "/api/courses/{course_id}"): [("/api/courses/1", None, set())],
+    ("POST", "/api/courses/"): [("/api/courses/", {"title": "c", "description": "d"}, set())],
+    ("POST", "/api/courses/import"): [("/api/courses/import", COURSE_DOCUMENT, set())],
+    ("PUT", "/api/courses/{course_id}"): [("/api/courses/2", {"title": "c2"}, set())],
+    ("DELETE", "/api/courses/{course_id}"): [("/api/courses/2", None, set())],
+    ("GET", "/api/topics/"): [
+        ("/api/topics/?skip=0&limit=10", None, {"topics"}),
+        ("/api/topics/?cursor=eyJpZCI6IDB9&limit=10", None, set()),
+        ("/api/topics/?stream=ndjson", None, {"topics"}),
+        ("/api/topics/?limit=10&fields=title,order_index", None, {"topics"}),
+        ("/api/topics/?stream=ndjson&fields=title", None, {"topics"}),
+    ],
+    ("GET", "/api/topics/course/{course_id}"): [
+        ("/api/topics/course/1", None, set()),
+        ("/api/topics/course/1?fields=title,assignments", None, set()),
+    ],
+    ("GET", "/api/topics/{topic_id}"): [("/api/topics/1", None, set())],
+    ("POST", "/api/topics/"): [("/api/topics/", TOPIC, set())],
+    ("POST", "/api/topics/bulk"): [("/api/topics/bulk", [TOPIC, TOPIC], set())],
+    ("PUT", "/api/topics/{topic_id}"): [("/api/topics/2", {"title": "t2"}, set())],
+    ("DELETE", "/api/topics/{topic_id}"): [("/api/topics/2", None, set())],
+    ("GET", "/api/assignments/"): [
+        ("/api/assignments/?skip=0&limit=10", None, {"assignments"}),
+        ("/api/assignments/?cursor=eyJpZCI6IDB9&limit=10", None, set()),
+        ("/api/assignments/?stream=ndjson", None, {"assignments"}),
+        ("/api/assignments/?limit=10&fields=title,is_required", None, {"assignments"}),
+    ],
+    ("GET", "/api/assignments/topic/{topic_id}"): [
+        ("/api/assignments/topic/1", None, set()),
+        ("/api/assignments/topic/1?fields=title", None, set()),
+    ],
+    ("GET", "/api/assignments/{assignment_id}"): [("/api/assignments/1", None, set())],
+    ("POST", "/api/assignments/"): [("/api/assignments/", ASSIGNMENT, set())],
+    ("POST", "/api/assignments/bulk"): [("/api/assignments/bulk", [ASSIGNMENT, ASSIGNMENT], set())],
+    ("PUT", "/api/assignments/{assignment_id}"): [("/api/assignments/2", {"title": "a2"}, set())],
+    ("DELETE", "/api/assignments/{assignment_id}"): [("/api/assignments/2", None, set())],
+    ("GET", "/api/assignments/{assignment_id}/hints"): [("/api/assignments/1/hints", None, set())],
+    ("GET", "/api/assignments/{assignment_id}/hints/{order_index}"): [("/api/assignments/1/hints/0", None, set())],
+    ("GET", "/api/hints/assignment/{assignment_id}"): [("/api/hints/assignment/1", None, set())],
+    ("GET", "/api/hints/batch"): [
+        ("/api/hints/batch?assignment_ids=1&assignment_ids=5", None, set()),
+        ("/api/hints/batch?assignment_ids=1&assignment_ids=5&up_to=1", None, set()),
+    ],
+    ("GET", "/api/hints/{hint_id}"): [("/api/hints/1", None, set())],
+    ("POST", "/api/hints/"): [("/api/hints/", HINT, set())],
+    ("POST", "/api/hints/bulk"): [("/api/hints/bulk?upsert=true", [HINT, {**HINT, "order_index": 101}], set())],
+    ("GET", "/api/search/"): [
+        ("/api/search/?q=FastAPI", None, set()),
+        ("/api/search/?q=Pydantic%20мод&kind=hint&limit=5", None, set()),
+    ],
+    ("POST", "/api/query/"): [
+        ("/api/query/", COURSE_QUERY, set()),
+        ("/api/query/", {"entity": "topics", "limit": 10, "include": {"assignments": {"fields": ["title"]}}}, {"topics"}),
+    ],
+    # Выгрузка читает таблицы целиком по порядку первичного ключа
+    ("GET", "/api/catalog/export"): [("/api/catalog/export", None, {"courses", "topics", "assignments", "hints"})],
+    ("POST", "/api/catalog/import"): [("/api/catalog/import", CATALOG, set())],
+    ("POST", "/api/reveals/"): [("/api/reveals/", {"learner_id": "plans", "hint_id": 1}, set())],
+    ("GET", "/api/reveals/learner/{learner_id}"): [
+        ("/api/reveals/learner/plans", None, set()),
+        ("/api/reveals/learner/plans?assignment_id=1", None, set()),
+    ],
+    ("GET", "/api/leaderboard/"): [("/api/leaderboard/", None, set()), ("/api/leaderboard/?assignment_id=1", None, set())],
+    ("GET", "/api/leaderboard/learner/{learner_id}"): [("/api/leaderboard/learner/plans", None, set())],
+    ("GET", "/api/leaderboard/totals"): [("/api/leaderboard/totals?assignment_id=1", None, set())],
+    ("PUT", "/api/hints/{hint_id}"): [("/api/hints/2", {"text": "h2"}, set())],
+    ("DELETE", "/api/hints/{hint_id}"): [("/api/hints/2", None, set())],
+}
+
+SCAN_PATTERN = re.compile(r"^SCAN (\w+)")
+EXPLAINABLE = ("SELECT", "UPDATE", "DELETE", "WITH")
+ENGINES = [(engine, Base), (events_engine, EventsBase)]
+
+ROUTES = [
+    (method, route.path)
+    for route in app.routes if isinstance(route, APIRoute)
+    for method in sorted(route.methods)
+]
+
+def collect_statements(client, method, url, body):
+    """Ответ и перехваченные запросы [(движок, запрос, параметры)] обоих движков"""
+    statements = []
+
+    def capture(target_engine):
+        def listener(conn, cursor, statement, parameters, context, executemany):
+            # Временные таблицы видны только своему соединению, EXPLAIN на другом их не найдет
+            if "temp." in statement or not statement.lstrip().upper().startswith(EXPLAINABLE):
+                return
+            statements.append((target_engine, statement, parameters[0] if executemany else parameters))
+        return listener
+
+    listeners = [(target_engine, capture(target_engine)) for target_engine, _ in ENGINES]
+    for target_engine, listener in listeners:
+        event.listen(target_engine, "before_cursor_execute", listener)
+    try:
+        if isinstance(body, bytes):
+            response = client.request(method, url, files={"file": ("catalog.ndjson", body)})
+        else:
+            response = client.request(method, url, json=body)
+    finally:
+        for target_engine, listener in listeners:
+            event.remove(target_engine, "before_cursor_execute", listener)
+    return response, statements
+
+def full_scans(target_engine, statement, parameters):
+    tables = set(dict(ENGINES)[target_engine].metadata.tables)
+    connection = target_engine.raw_connection()
+    try:
+        plan = connection.cursor().execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    finally:
+        connection.close()
+    scans = set()
+    for row in plan:
+        match = SCAN_PATTERN.match(row[-1])
+        if match and match.group(1) in tables:
+            scans.add(match.group(1))
+    return scans
+
+def test_every_route_has_sample_requests():
+    missing = [f"{method} {path}" for method, path in ROUTES if (method, path) not in REQUESTS]
+    assert not missing, f"Нет примера запроса в REQUESTS: {missing}"
+
+@pytest.mark.parametrize("method,path", ROUTES, ids=[f"{method} {path}" for method, path in ROUTES])
+def test_route_queries_use_indexes(client, method, path):
+    if (method, path) not in REQUESTS:
+        pytest.skip("нет примера запроса")
+    failures = []
+    for url, body, allowed in REQUESTS[(method, path)]:
+        response, statements = collect_statements(client, method, url, body)
+        assert response.status_code < 400, f"{method} {url}: статус {response.status_code} {response.text}"
+        for target_engine, statement, parameters in statements:
+            unexpected = full_scans(target_engine, statement, parameters) - allowed
+            if unexpected:
+                failures.append(f"{method} {url}: SCAN {sorted(unexpected)}\n    {' '.join(statement.split())}")
+    assert not failures, "\n".join(failures)
@@ -0,0 +1,180 @@
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, func, select
+
+from database import EventsBase, apply_pragmas
+from models import HintReveal, LearnerScore
+from reveals import RevealLog, write_events
+
+"""Надежность журнала открытий подсказок (`reveals.py`).
+
+Каждый тест работает со своей временной базой событий и своим каталогом
+сегментов, поэтому падения процессов и недоступная таблица не задевают
+базу событий приложения. Проверяется, что после падения процесса,
+оборванной строки, повторной записи сегмента и ошибки базы ни одно
+принятое событие не теряется и не записывается дважды.
+"""
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+# Дочерний процесс: принять события и ждать SIGKILL (интервал записи больше времени жизни)
+CRASH_SCRIPT = """
+import sys, time
+from datetime import datetime
+from reveals import RevealLog
+log = RevealLog(directory=sys.argv[1], flush_interval=3600, batch_size=10**9)
+for i in range(int(sys.argv[2])):
+    log.append({"learner_id": "crash", "hint_id": i, "assignment_id": 1, "penalty": 10, "revealed_at": datetime.utcnow()})
+print("ready", flush=True)
+time.sleep(3600)
+"""
+
+@pytest.fixture
+def events_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'events.db'}"
+
+@pytest.fixture
+def events(events_url):
+    engine = create_engine(events_url, connect_args={"check_same_thread": False})
+    apply_pragmas(engine, {"journal_mode": "WAL", "synchronous": "NORMAL", "busy_timeout": 5000})
+    EventsBase.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def directory(tmp_path):
+    path = tmp_path / "reveals"
+    path.mkdir()
+    return str(path)
+
+def event(learner, hint_id):
+    return {"learner_id": learner, "hint_id": hint_id, "assignment_id": 1, "penalty": 10, "revealed_at": datetime.utcnow()}
+
+def stored(engine, learner):
+    """Число записанных событий учащегося и число различных подсказок среди них"""
+    with engine.connect() as connection:
+        return connection.execute(
+            select(func.count(), func.count(HintReveal.hint_id.distinct())).where(HintReveal.learner_id == learner)
+        ).one()
+
+def hints_used(engine, learner):
+    with engine.connect() as connection:
+        return connection.scalar(
+            select(LearnerScore.hints_used).where(LearnerScore.learner_id == learner, LearnerScore.assignment_id == 0)
+        )
+
+def segments(directory):
+    return [name for name in os.listdir(directory) if name.endswith(".ndjson")]
+
+def test_sigkill_loses_no_accepted_events(events, events_url, directory):
+    accepted = 2000
+    process = subprocess.Popen(
+        [sys.executable, "-c", CRASH_SCRIPT, directory, str(accepted)],
+        cwd=BACKEND_DIR, stdout=subprocess.PIPE, env={**os.environ, "EVENTS_DATABASE_URL": events_url},
+    )
+    try:
+        assert process.stdout.readline().strip() == b"ready"
+    finally:
+        os.kill(process.pid, signal.SIGKILL)
+        process.wait()
+        process.stdout.close()
+    assert stored(events, "crash") == (0, 0)
+    # Процесс упал посреди строки
+    with open(os.path.join(directory, segments(directory)[0]), "ab") as segment:
+        segment.write(b'{"learner_id": "crash", "hint_id": ')
+
+    log = RevealLog(engine=events, directory=directory)
+    log.start()
+    log.stop()
+    assert stored(events, "crash") == (accepted, accepted)
+    assert hints_used(events, "crash") == accepted
+    assert not segments(directory)
+
+def test_replayed_segment_adds_no_duplicates(events, directory):
+    written = [event("replay", i) for i in range(100)]
+    write_events(events, written)
+    # Процесс упал между коммитом пачки и удалением ее сегмента
+    path = os.path.join(directory, "0-0.ndjson")
+    with open(path, "w", encoding="utf-8") as segment:
+        segment.writelines(json.dumps(item, default=datetime.isoformat) + "\n" for item in written)
+
+    RevealLog(engine=events, directory=directory).recover()
+    assert stored(events, "replay") == (100, 100)
+    assert hints_used(events, "replay") == 100
+    assert not os.path.exists(path)
+
+def test_live_process_segment_is_not_recovered(events, directory):
+    owner = RevealLog(engine=events, directory=directory, flush_interval=3600)
+    owner.start()
+    try:
+        for i in range(50):
+            owner.append(event("live", i))
+        active = segments(directory)
+        # Сегмент под flock живого процесса: восстановление другим процессом его не трогает
+        assert RevealLog(engine=events, directory=directory).recover() == 0
+        assert segments(directory) == active
+        assert stored(events, "live") == (0, 0)
+    finally:
+        owner.stop()
+    assert stored(events, "live") == (50, 50)
+    assert not segments(directory)
+
+def test_failed_write_keeps_events_queued(events, directory):
+    log = RevealLog(engine=events, directory=directory, flush_interval=3600)
+    log.start()
+    try:
+        for i in range(50):
+            log.append(event("failure", i))
+        HintReveal.__table__.drop(events)
+        with pytest.raises(Exception):
+            log.flush()
+        assert log.pending() == 50
+        HintReveal.__table__.create(events)
+        assert log.flush() == 50
+    finally:
+        log.stop()
+    assert stored(events, "failure") == (50, 50)
+    assert not segments(directory)
+
+def test_full_batch_is_written_without_waiting_and_stop_writes_the_rest(events, directory):
+    log = RevealLog(engine=events, directory=directory, flush_interval=3600, batch_size=100)
+    log.start()
+    try:
+        for i in range(100):
+            log.append(event("batch", i))
+        deadline = time.monotonic() + 5
+        while stored(events, "batch")[0] < 100 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert stored(events, "batch") == (100, 100)
+        for i in range(100, 130):
+            log.append(event("batch", i))
+    finally:
+        log.stop()
+    assert stored(events, "batch") == (130, 130)
+    assert not segments(directory)
+
+def test_write_is_retried_while_events_database_is_locked(events_url):
+    # busy_timeout короче блокировки: первая попытка получает "database is locked"
+    engine = create_engine(events_url, connect_args={"check_same_thread": False})
+    apply_pragmas(engine, {"journal_mode": "WAL", "busy_timeout": 10})
+    EventsBase.metadata.create_all(bind=engine)
+    holder = engine.raw_connection()
+    try:
+        holder.execute("BEGIN IMMEDIATE")
+        release = threading.Timer(0.03, holder.rollback)
+        release.start()
+        write_events(engine, [event("locked", i) for i in range(10)])
+        release.join()
+    finally:
+        holder.close()
+    assert stored(engine, "locked") == (10, 10)
+    assert hints_used(engine, "locked") == 10
+    engine.dispose()
@@ -0,0 +1,18 @@
+import pytest
+
+"""Границы пагинации поиска (GET /api/search/).
+
+`LIMIT -1` в SQLite означает выборку без ограничения, поэтому `skip` и
+`limit` проверяются до запроса: ошибка валидации, а не весь индекс.
+"""
+
+@pytest.mark.parametrize("params", ["limit=-1", "limit=0", "limit=101", "skip=-1"])
+def test_out_of_range_paging_is_rejected(client, params):
+    response = client.get(f"/api/search/?q=Python&{params}")
+    assert response.status_code == 422, response.text
+
+def test_limit_caps_results(client, make_course):
+    make_course(3, 3, 2)
+    response = client.get("/api/search/?q=Подсказка&limit=2")
+    assert response.status_code == 200, response.text
+    assert len(response.json()) == 2
@@ -0,0 +1,25 @@
+import selection
+
+"""Ограничение размера вложенной выборки (POST /api/query/).
+
+`limit` и `ids` ограничивают только корневой уровень; строки вложенных
+уровней считаются вместе с корнем и ограничены `MAX_TOTAL_ROWS`.
+"""
+
+TREE = {"include": {"topics": {"include": {"assignments": {"fields": ["title"]}}}}}
+
+def query_course(client, course_id):
+    return client.post("/api/query/", json={"entity": "courses", "ids": [course_id], "fields": ["title"], **TREE})
+
+def test_nested_rows_count_towards_total_cap(client, make_course, monkeypatch):
+    course = make_course(topics=3, assignments=3)
+    # Курс, 3 темы и 9 заданий
+    monkeypatch.setattr(selection, "MAX_TOTAL_ROWS", 13)
+    response = query_course(client, course["id"])
+    assert response.status_code == 200, response.text
+    assert sum(len(topic["assignments"]) for topic in response.json()[0]["topics"]) == 9
+
+    monkeypatch.setattr(selection, "MAX_TOTAL_ROWS", 12)
+    response = query_course(client, course["id"])
+    assert response.status_code == 400, response.text
+    assert "12" in response.json()["detail"]
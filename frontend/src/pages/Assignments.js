@@ -2,6 +2,16 @@ import React, { useState, useEffect } from 'react';
 import axios from 'axios';
 import './Assignments.css';
 
+// Идентификатор учащегося для учета открытых подсказок на сервере
+const getLearnerId = () => {
+  let learnerId = localStorage.getItem('learnerId');
+  if (!learnerId) {
+    learnerId = `learner-${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`;
+    localStorage.setItem('learnerId', learnerId);
+  }
+  return learnerId;
+};
+
 const Assignments = () => {
   const [assignments, setAssignments] = useState([]);
   const [loading, setLoading] = useState(true);
@@ -81,6 +91,35 @@ const Assignments = () => {
     setIsDetailsOpen(true);
     setNoMoreHints(false);
     setHints([]);
+    // все подсказки задания загружаются одним запросом, раскрытие — локальное;
+    // уже открытые учащимся подсказки восстанавливаются из журнала открытий
+    setIsLoadingHint(true);
+    try {
+      const [{ data }, revealedIds] = await Promise.all([
+        axios.get('/api/hints/batch', {
+          params: { assignment_ids: assignment.id },
+        }),
+        axios.get(`/api/reveals/learner/${encodeURIComponent(getLearnerId())}`, {
+          params: { assignment_id: assignment.id },
+        })
+          .then(({ data: reveals }) => new Set(reveals.map((r) => r.hint_id)))
+          .catch((e) => {
+            console.warn('Не удалось загрузить открытые подсказки', e);
+            return new Set();
+          }),
+      ]);
+      const loaded = data.length ? data[0].hints : [];
+      // подсказки открываются по порядку: открыто всё до последней открытой
+      const revealed = loaded.reduce((count, h, i) => (revealedIds.has(h.id) ? i + 1 : count), 0);
+      setHints(loaded);
+      setRevealedHints(revealed);
+      setNoMoreHints(revealed >= loaded.length);
+    } catch (e) {
+      console.warn('Не удалось загрузить подсказки', e);
+      setNoMoreHints(true);
+    } finally {
+      setIsLoadingHint(false);
+    }
   };
 
   const closeDetails = () => {
@@ -88,24 +127,19 @@ const Assignments = () => {
     setActiveAssignment(null);
   };
 
-  const revealNextHint = async () => {
+  const revealNextHint = () => {
     if (!activeAssignment || isLoadingHint || noMoreHints) return;
-    const nextIndex = revealedHints; // 0-based order_index
-    setIsLoadingHint(true);
-    try {
-      const { data } = await axios.get(`/api/assignments/${activeAssignment.id}/hints/${nextIndex}`);
-      // добавляем, если ещё не добавлена
-      setHints((prev) => {
-        const exists = prev.some((h) => h.order_index === data.order_index);
-        return exists ? prev : [...prev, data].sort((a, b) => a.order_index - b.order_index);
-      });
-      setRevealedHints((prev) => prev + 1);
-    } catch (e) {
-      // если подсказок больше нет — блокируем кнопку
-      console.warn('Подсказка недоступна или закончились', e);
+    const next = revealedHints + 1;
+    setRevealedHints(next);
+    // сервер принимает открытие сразу (202), в базу оно пишется в фоне
+    const hint = hints[next - 1];
+    if (hint) {
+      axios.post('/api/reveals/', { learner_id: getLearnerId(), hint_id: hint.id })
+        .catch((e) => console.warn('Не удалось отметить открытие подсказки', e));
+    }
+    // если подсказок больше нет — блокируем кнопку
+    if (next >= hints.length) {
       setNoMoreHints(true);
-    } finally {
-      setIsLoadingHint(false);
     }
   };
 
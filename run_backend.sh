@@ -47,7 +47,18 @@ alembic upgrade head || {
 echo "🗄️ Инициализация и наполнение базы..."
 python init_db.py
 
-# Запускаем сервер
-echo "🌟 Запуск FastAPI сервера..."
-uvicorn main:app --host 0.0.0.0 --port 8000 --reload
+# Запускаем сервер: WORKERS=N поднимает N процессов без --reload.
+# Кэши воркеров согласуются через PRAGMA data_version (invalidation.py),
+# профиль production включает WAL, чтобы воркеры не блокировали друг друга.
+# Одновременных запросов воркера не больше, чем соединений в его пуле
+# (database.production_pool_options), лишние получают 503
+WORKERS=${WORKERS:-1}
+if [ "$WORKERS" -gt 1 ]; then
+    LIMIT_CONCURRENCY=${LIMIT_CONCURRENCY:-$(( ${DB_POOL_SIZE:-40} + ${DB_MAX_OVERFLOW:-24} ))}
+    echo "🌟 Запуск FastAPI сервера ($WORKERS воркеров)..."
+    DB_PROFILE=${DB_PROFILE:-production} uvicorn main:app --host 0.0.0.0 --port 8000 --workers "$WORKERS" --limit-concurrency "$LIMIT_CONCURRENCY"
+else
+    echo "🌟 Запуск FastAPI сервера..."
+    uvicorn main:app --host 0.0.0.0 --port 8000 --reload
+fi
 